@@ -297,7 +297,7 @@ class InstanceMetadata():
             return self._handle_content(path_tokens)
         return self._route_configuration().handle_path(path_tokens)
 
-    def _metadata_as_json(self, version, path):
+    def _metadata(self):
         metadata = {'uuid': self.uuid}
         if self.launch_metadata:
             metadata['meta'] = self.launch_metadata
@@ -315,7 +315,10 @@ class InstanceMetadata():
         metadata['name'] = self.instance['display_name']
         metadata['launch_index'] = self.instance['launch_index']
         metadata['availability_zone'] = self.availability_zone
+        return metadata
 
+    def _metadata_as_json(self, version, path):
+        metadata = self._metadata()
         if self._check_os_version(GRIZZLY, version):
             metadata['random_seed'] = base64.b64encode(os.urandom(512))
 
@@ -409,6 +412,30 @@ class InstanceMetadata():
 
         return data
 
+    def get_document(self):
+        """Return the metadata of the instance as primitives.
+
+        InstanceMetadataDocument serves the metadata from the document without
+        collecting it again, so the document can be cached and shared by the
+        metadata API workers.  The parts that depend on the address of the
+        request are left out, as are the user data in the EC2 metadata.
+        """
+        address, self.address = self.address, None
+        try:
+            ec2 = dict((version, self.get_ec2_metadata(version)['meta-data'])
+                       for version in VERSIONS)
+        finally:
+            self.address = address
+
+        return {'uuid': self.uuid,
+                'project_id': self.instance['project_id'],
+                'password': self.password,
+                'userdata_raw': self.userdata_raw,
+                'content': self.content,
+                'ec2': ec2,
+                'metadata': self._metadata(),
+                'vendor_data': self.vddriver.get()}
+
     def metadata_for_config_drive(self):
         """Yields (path, value) tuples for metadata elements."""
         # EC2 style metadata
@@ -447,6 +474,47 @@ class InstanceMetadata():
             yield ('%s/%s/%s' % ("openstack", CONTENT_DIR, cid), content)
 
 
+class InstanceMetadataDocument(InstanceMetadata):
+    """Instance metadata served from InstanceMetadata.get_document()."""
+
+    def __init__(self, document, address=None):
+        self.document = document
+        self.address = address
+        self.uuid = document['uuid']
+        # Only what the metadata handler checks of the instance.
+        self.instance = {'uuid': document['uuid'],
+                         'project_id': document['project_id']}
+        self.password = document['password']
+        self.userdata_raw = document['userdata_raw']
+        self.content = document['content']
+        self.route_configuration = None
+
+    def get_ec2_metadata(self, version):
+        if version == "latest":
+            version = VERSIONS[-1]
+
+        if version not in VERSIONS:
+            raise InvalidMetadataVersion(version)
+
+        meta_data = self.document['ec2'][version]
+        if self.address:
+            meta_data = dict(meta_data, **{'local-ipv4': self.address})
+
+        data = {'meta-data': meta_data}
+        if self.userdata_raw is not None:
+            data['user-data'] = self.userdata_raw
+
+        return data
+
+    def _metadata(self):
+        return dict(self.document['metadata'])
+
+    def _vendor_data(self, version, path):
+        if self._check_os_version(HAVANA, version):
+            return json.dumps(self.document['vendor_data'])
+        raise KeyError(path)
+
+
 class RouteConfiguration(object):
     """Routes metadata paths to request handlers."""
 
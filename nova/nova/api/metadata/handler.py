@@ -27,14 +27,12 @@ import webob.exc
 from nova.api.metadata import base
 from nova import conductor
 from nova import exception
+from nova import metadata_cache
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
-from nova.openstack.common import memorycache
 from nova import utils
 from nova import wsgi
 
-CACHE_EXPIRATION = 15  # in seconds
-
 CONF = cfg.CONF
 CONF.import_opt('use_forwarded_for', 'nova.api.auth')
 
@@ -59,30 +57,35 @@ class MetadataRequestHandler(wsgi.Application):
     """Serve metadata."""
 
     def __init__(self):
-        self._cache = memorycache.get_client()
         self.conductor_api = conductor.API()
 
+    def _get_cached_metadata(self, instance_id, address):
+        document = metadata_cache.get_document(instance_id)
+        if document:
+            return base.InstanceMetadataDocument(document, address)
+
     def get_metadata_by_remote_address(self, address):
         if not address:
             raise exception.FixedIpNotFoundForAddress(address=address)
 
-        cache_key = 'metadata-%s' % address
-        data = self._cache.get(cache_key)
-        if data:
-            return data
+        instance_id = metadata_cache.get_instance_uuid(address)
+        if instance_id:
+            data = self._get_cached_metadata(instance_id, address)
+            if data:
+                return data
 
         try:
             data = base.get_metadata_by_address(self.conductor_api, address)
         except exception.NotFound:
             return None
 
-        self._cache.set(cache_key, data, CACHE_EXPIRATION)
+        metadata_cache.set_instance_uuid(address, data.uuid)
+        metadata_cache.set_document(data.uuid, data.get_document())
 
         return data
 
     def get_metadata_by_instance_id(self, instance_id, address):
-        cache_key = 'metadata-%s' % instance_id
-        data = self._cache.get(cache_key)
+        data = self._get_cached_metadata(instance_id, address)
         if data:
             return data
 
@@ -92,7 +95,7 @@ class MetadataRequestHandler(wsgi.Application):
         except exception.NotFound:
             return None
 
-        self._cache.set(cache_key, data, CACHE_EXPIRATION)
+        metadata_cache.set_document(data.uuid, data.get_document())
 
         return data
 
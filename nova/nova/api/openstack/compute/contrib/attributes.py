@@ -14,7 +14,6 @@
 #    under the License.
 
 """Attribute management extension."""
-import traceback
 import webob
 import webob.exc
 
@@ -25,8 +24,11 @@ from nova.api.openstack import xmlutil
 from nova.compute import api as compute_api
 from nova import exception
 from nova.openstack.common.gettextutils import _
+from nova.openstack.common import log as logging
 
 
+LOG = logging.getLogger(__name__)
+
 authorize = extensions.extension_authorizer('compute', 'attributes')
 soft_authorize = extensions.soft_extension_authorizer('compute', 'attributes')
 
@@ -107,7 +109,6 @@ class AttributeController(object):
             name (required) - string
             public_key (optional) - string
         """
-        traceback.print_stack()
         context = req.environ['nova.context']
         #authorize(context, action='create')
         '''
@@ -140,6 +141,52 @@ class AttributeController(object):
             raise webob.exc.HTTPNotFound()
         return webob.Response(status_int=202)
 
+    @wsgi.serializers(xml=AttributesTemplate)
+    def bulk_create(self, req, body):
+        """Create several attributes in a single transaction.
+
+        params: attributes - list of attribute objects with:
+            name (required) - string
+        """
+        context = req.environ['nova.context']
+        authorize(context, action='create')
+
+        try:
+            names = [params['name'] for params in body['attributes']]
+        except (KeyError, TypeError):
+            msg = _("Invalid request body")
+            raise webob.exc.HTTPBadRequest(explanation=msg)
+        if not names:
+            msg = _("No attributes given")
+            raise webob.exc.HTTPBadRequest(explanation=msg)
+
+        try:
+            attributes = self.api.create_attributes(context, names)
+        except exception.AttributeExists as exc:
+            raise webob.exc.HTTPConflict(explanation=exc.format_message())
+        return {'attributes': [{'id': att.id, 'name': att.name}
+                               for att in attributes]}
+
+    def bulk_delete(self, req, body):
+        """Delete several attributes in a single transaction.
+
+        params: ids - list of attribute ids
+        """
+        context = req.environ['nova.context']
+        authorize(context, action='delete')
+
+        try:
+            ids = list(body['ids'])
+        except (KeyError, TypeError):
+            msg = _("Invalid request body")
+            raise webob.exc.HTTPBadRequest(explanation=msg)
+
+        try:
+            self.api.delete_attributes(context, ids)
+        except exception.AttributeNotFound:
+            raise webob.exc.HTTPNotFound()
+        return webob.Response(status_int=202)
+
     @wsgi.serializers(xml=AttributeTemplate)
     def show(self, req, id):
         """Return data for the given key name."""
@@ -172,7 +219,7 @@ class AttributeController(object):
               for att in attlist: 
                 attribute.append({'id': att.id,
                            'name': att.name})
-	      print attribute 
+              LOG.debug(_("Listing %d attributes"), len(attribute))
               return {'attribute': attribute}	
 	
 
@@ -236,7 +283,6 @@ class Controller(servers.Controller):
 
 class Attributes(extensions.ExtensionDescriptor):
     """Attribute Support."""
-    traceback.print_stack()
     name = "Attributes"
     alias = "os-attributes"
     namespace = "http://docs.openstack.org/compute/ext/attributes/api/v1.1"
@@ -247,7 +293,9 @@ class Attributes(extensions.ExtensionDescriptor):
 
         res = extensions.ResourceExtension(
                 'os-attributes',
-                AttributeController())
+                AttributeController(),
+                collection_actions={'bulk_create': 'POST',
+                                    'bulk_delete': 'POST'})
         resources.append(res)
         return resources
 
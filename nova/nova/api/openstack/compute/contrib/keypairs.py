@@ -14,7 +14,6 @@
 #    under the License.
 
 """Keypair management extension."""
-import traceback
 import webob
 import webob.exc
 
@@ -192,7 +191,6 @@ class Controller(servers.Controller):
 
 class Keypairs(extensions.ExtensionDescriptor):
     """Keypair Support."""
-    traceback.print_stack()
     name = "Keypairs"
     alias = "os-keypairs"
     namespace = "http://docs.openstack.org/compute/ext/keypairs/api/v1.1"
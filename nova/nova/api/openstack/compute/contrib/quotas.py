@@ -204,6 +204,7 @@ class QuotaSetsController(wsgi.Controller):
                                 user_id=user_id)
             except exception.AdminRequired:
                 raise webob.exc.HTTPForbidden()
+            QUOTAS.invalidate_limits(project_id=project_id)
         return {'quota_set': self._get_quotas(context, id, user_id=user_id)}
 
     @wsgi.serializers(xml=QuotaTemplate)
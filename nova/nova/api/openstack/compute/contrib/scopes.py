@@ -14,7 +14,6 @@
 #    under the License.
 
 """Scope management extension."""
-import traceback
 import webob
 import webob.exc
 
@@ -25,8 +24,11 @@ from nova.api.openstack import xmlutil
 from nova.compute import api as compute_api
 from nova import exception
 from nova.openstack.common.gettextutils import _
+from nova.openstack.common import log as logging
 
 
+LOG = logging.getLogger(__name__)
+
 authorize = extensions.extension_authorizer('compute', 'scopes')
 soft_authorize = extensions.soft_extension_authorizer('compute', 'scopes')
 
@@ -84,20 +86,18 @@ class ScopeController(object):
             params = body['scope']
             name = params['name']
             value = params['value']
-	    print name,value
-	    attribute_list =  self.attribute_api.list(context)
-	    attname = [att.name for att in attribute_list]
         except KeyError:
             msg = _("Invalid request body")
             raise webob.exc.HTTPBadRequest(explanation=msg)
-	
-	if name in attname:
-	   scope=self.api.create_scope(context,name,value)
-	   #return {'scope',scope}
-	   #print "yes"
-        else:    
-	    msg = _("Attribute Not there")
+
+        if not self.attribute_api.attribute_exists(context, name):
+            msg = _("Attribute Not there")
             raise webob.exc.HTTPBadRequest(explanation=msg)
+
+        try:
+            scope = self.api.create_scope(context, name, value)
+        except exception.ScopeExists as exc:
+            raise webob.exc.HTTPConflict(explanation=exc.format_message())
         #try:
               #attribute=self.api.create_attribute(context, name)
 
@@ -131,11 +131,64 @@ class ScopeController(object):
             raise webob.exc.HTTPConflict(explanation=exc.format_message())
         '''
     def delete(self, req, id):
-        """Delete a scope with a given name."""
+        """Delete a scope with a given id."""
         context = req.environ['nova.context']
         authorize(context, action='delete')
         try:
-            self.api.delete_key_pair(context, context.user_id, id)
+            self.api.delete_scope(context, id)
+        except exception.ScopeNotFound:
+            raise webob.exc.HTTPNotFound()
+        return webob.Response(status_int=202)
+
+    @wsgi.serializers(xml=ScopesTemplate)
+    def bulk_create(self, req, body):
+        """Create several scopes in a single transaction.
+
+        params: scopes - list of scope objects with:
+            name (required) - string, an existing attribute
+            value (required) - string
+        """
+        context = req.environ['nova.context']
+        authorize(context, action='create')
+
+        try:
+            scopes = [(params['name'], params['value'])
+                      for params in body['scopes']]
+        except (KeyError, TypeError):
+            msg = _("Invalid request body")
+            raise webob.exc.HTTPBadRequest(explanation=msg)
+        if not scopes:
+            msg = _("No scopes given")
+            raise webob.exc.HTTPBadRequest(explanation=msg)
+
+        for name in set(name for name, value in scopes):
+            if not self.attribute_api.attribute_exists(context, name):
+                msg = _("Attribute %s Not there") % name
+                raise webob.exc.HTTPBadRequest(explanation=msg)
+
+        try:
+            created = self.api.create_scopes(context, scopes)
+        except exception.ScopeExists as exc:
+            raise webob.exc.HTTPConflict(explanation=exc.format_message())
+        return {'scopes': [{'id': sc.id, 'name': sc.name, 'value': sc.value}
+                           for sc in created]}
+
+    def bulk_delete(self, req, body):
+        """Delete several scopes in a single transaction.
+
+        params: ids - list of scope ids
+        """
+        context = req.environ['nova.context']
+        authorize(context, action='delete')
+
+        try:
+            ids = list(body['ids'])
+        except (KeyError, TypeError):
+            msg = _("Invalid request body")
+            raise webob.exc.HTTPBadRequest(explanation=msg)
+
+        try:
+            self.api.delete_scopes(context, ids)
         except exception.ScopeNotFound:
             raise webob.exc.HTTPNotFound()
         return webob.Response(status_int=202)
@@ -165,7 +218,7 @@ class ScopeController(object):
                 scope.append({'id': sc.id,
 			   'name': sc.name,
                            'value': sc.value})
-              print scope
+              LOG.debug(_("Listing %d scopes"), len(scope))
               return {'scope': scope}
 
 
@@ -220,7 +273,6 @@ class Controller(servers.Controller):
 
 class Scopes(extensions.ExtensionDescriptor):
     """Scope Support."""
-    traceback.print_stack()
     name = "Scopes"
     alias = "os-scopes"
     namespace = "http://docs.openstack.org/compute/ext/scopes/api/v1.1"
@@ -231,7 +283,9 @@ class Scopes(extensions.ExtensionDescriptor):
 
         res = extensions.ResourceExtension(
                 'os-scopes',
-                ScopeController())
+                ScopeController(),
+                collection_actions={'bulk_create': 'POST',
+                                    'bulk_delete': 'POST'})
         resources.append(res)
         return resources
 
@@ -24,6 +24,7 @@ from nova.api.openstack import xmlutil
 from nova import compute
 from nova import db
 from nova import exception
+from nova import metadata_cache
 
 
 authorize = extensions.extension_authorizer('compute', 'server_password')
@@ -64,6 +65,7 @@ class ServerPasswordController(object):
         meta = password.convert_password(context, None)
         db.instance_system_metadata_update(context, instance['uuid'],
                                            meta, False)
+        metadata_cache.invalidate(instance['uuid'])
 
 
 class Server_password(extensions.ExtensionDescriptor):
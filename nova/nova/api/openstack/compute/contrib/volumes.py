@@ -418,6 +418,8 @@ class VolumeAttachmentController(wsgi.Controller):
             raise exc.HTTPNotFound()
         except exception.InstanceIsLocked as e:
             raise exc.HTTPConflict(explanation=e.format_message())
+        except exception.AttachConstraintViolation as e:
+            raise exc.HTTPForbidden(explanation=e.format_message())
         except exception.InstanceInvalidState as state_error:
             common.raise_http_conflict_for_instance_invalid_state(state_error,
                     'attach_volume')
@@ -263,6 +263,7 @@ class ProjectCommands(object):
                 except exception.QuotaExists:
                     db.quota_update(ctxt, project_id, key, value,
                                     user_id=user_id)
+                QUOTAS.invalidate_limits(project_id=project_id)
             else:
                 print(_('%(key)s is not a valid quota key. Valid options are: '
                         '%(options)s.') % {'key': key,
@@ -18,7 +18,6 @@
 
 """Handles all requests relating to compute resources (e.g. guest VMs,
 networking and storage of VMs, and compute hosts on which they run)."""
-import traceback
 import base64
 import functools
 import re
@@ -31,6 +30,7 @@ import six
 from nova import availability_zones
 from nova import block_device
 from nova.cells import opts as cells_opts
+from nova.compute import cvrm
 from nova.compute import flavors
 from nova.compute import instance_actions
 from nova.compute import power_state
@@ -44,6 +44,7 @@ from nova.db import base
 from nova import exception
 from nova import hooks
 from nova.image import glance
+from nova import metadata_cache
 from nova import network
 from nova.network import model as network_model
 from nova.network.security_group import openstack_driver
@@ -1371,6 +1372,7 @@ class API(base.Base):
         # if task or vm state changed
         old_ref, instance_ref = self.db.instance_update_and_get_original(
                                   context, instance['uuid'], kwargs)
+        metadata_cache.instance_updated(instance['uuid'], kwargs)
         notifications.send_update(context, old_ref,
                                   instance_ref, service="api")
 
@@ -2760,6 +2762,14 @@ class API(base.Base):
         """Inject network info for the instance."""
         self.compute_rpcapi.inject_network_info(context, instance=instance)
 
+    def _check_attach_constraints(self, context, instance, volume):
+        """Enforce the project's CVRM constraints on a volume attach."""
+        if not CONF.cvrm_enforce_attach_constraints:
+            return
+        if not cvrm.get_engine().permits_attach(context, instance, volume):
+            raise exception.AttachConstraintViolation(
+                volume_id=volume['id'], instance_uuid=instance['uuid'])
+
     def _attach_volume(self, context, instance, volume_id, device,
                        disk_bus, device_type):
         """Attach an existing volume to an existing instance.
@@ -2779,6 +2789,7 @@ class API(base.Base):
             context, volume_id)
         try:
             volume = self.volume_api.get(context, volume_id)
+            self._check_attach_constraints(context, instance, volume)
             self.volume_api.check_attach(context, volume, instance=instance)
             self.volume_api.reserve_volume(context, volume_id)
             self.compute_rpcapi.attach_volume(context, instance=instance,
@@ -3465,81 +3476,118 @@ class AggregateAPI(base.Base):
 
 ##############MY Change###############
 class AttributeAPI(base.Base):
-    """Subset of the Compute Manager API for managing key pairs."""
+    """Subset of the Compute Manager API for managing CVRM attributes."""
 
     get_notifier = functools.partial(rpc.get_notifier, service='api')
     wrap_exception = functools.partial(exception.wrap_exception,
                                        get_notifier=get_notifier)
 
+    def _notify(self, context, event_suffix, names):
+        payload = {
+            'tenant_id': context.project_id,
+            'user_id': context.user_id,
+            'names': names,
+        }
+        notify = self.get_notifier()
+        notify.info(context, 'attribute.%s' % event_suffix, payload)
 
     @wrap_exception()
     def create_attribute(self, context, attname):
-        """Create a new key pair."""
-	attribute = attribute_obj.Attribute()
-	print "in create_attribute",attname
+        """Create a new attribute."""
+        LOG.debug(_("Creating attribute %s"), attname)
+        attribute = attribute_obj.Attribute()
         attribute.name = attname
-	attribute.project_id = context.project_id
-	#print context.project_id
-        return  attribute.create(context)
-        #return keypair, private_key
-    
+        attribute.project_id = context.project_id
+        return attribute.create(context)
+
+    @wrap_exception()
+    def create_attributes(self, context, attnames):
+        """Create several attributes in a single transaction."""
+        attributes = attribute_obj.Attribute.create_all(
+            context, context.project_id, attnames)
+        self._notify(context, 'create.bulk', attnames)
+        return attributes
 
     @wrap_exception()
     def list(self, context):
-        #self.ensure_default(context)
-        attribute=attribute_obj.Attribute()
-	return attribute.list(context)
+        attribute = attribute_obj.Attribute()
+        return attribute.list(context)
+
+    def attribute_exists(self, context, attname):
+        """Check whether the caller's project defines an attribute."""
+        return attribute_obj.Attribute.exists(context, context.project_id,
+                                              attname)
 
     @wrap_exception()
-    def delete_attribute(self, context,id):
-        """Delete a keypair by name."""
-	#print ("delete an attribute")
-	attribute=attribute_obj.Attribute()
-        #self._notify(context, 'delete.start', key_name)
-        attribute.delete(context,id)
-        #self._notify(context, 'delete.end', key_name)
+    def delete_attribute(self, context, id):
+        """Delete an attribute by id."""
+        LOG.debug(_("Deleting attribute %s"), id)
+        attribute = attribute_obj.Attribute()
+        attribute.delete(context, id)
+
+    @wrap_exception()
+    def delete_attributes(self, context, ids):
+        """Delete several attributes in a single transaction."""
+        attribute_obj.Attribute.delete_all(context, ids)
+        self._notify(context, 'delete.bulk', ids)
+
 
 class ScopeAPI(base.Base):
-    """Subset of the Compute Manager API for managing key pairs."""
+    """Subset of the Compute Manager API for managing attribute values."""
 
     get_notifier = functools.partial(rpc.get_notifier, service='api')
     wrap_exception = functools.partial(exception.wrap_exception,
                                        get_notifier=get_notifier)
 
+    def _notify(self, context, event_suffix, scopes):
+        payload = {
+            'tenant_id': context.project_id,
+            'user_id': context.user_id,
+            'scopes': scopes,
+        }
+        notify = self.get_notifier()
+        notify.info(context, 'scope.%s' % event_suffix, payload)
 
-    def create_scope(self, context, name,value):
-        """Create a new key pair."""
+    def create_scope(self, context, name, value):
+        """Create a new value for an attribute."""
+        LOG.debug(_("Creating scope %(name)s=%(value)s"),
+                  {'name': name, 'value': value})
         scope = scope_obj.Scope()
-	traceback.print_stack()
-        print "in create_scope"
         scope.name = name
         scope.project_id = context.project_id
-	scope.value = value
-        print context.project_id
-        return  scope.create(context)
-        #return keypair, private_key
+        scope.value = value
+        return scope.create(context)
+
+    @wrap_exception()
+    def create_scopes(self, context, scopes):
+        """Create several (name, value) scopes in a single transaction."""
+        scopes = list(scopes)
+        created = scope_obj.Scope.create_all(context, context.project_id,
+                                             scopes)
+        self._notify(context, 'create.bulk',
+                     [{'name': name, 'value': value}
+                      for name, value in scopes])
+        return created
 
     @wrap_exception()
     def list(self, context):
-        #self.ensure_default(context)
-        scope=scope_obj.Scope()
+        scope = scope_obj.Scope()
         return scope.list(context)
 
     @wrap_exception()
-    def delete_scope(self, context,id):
-        """Delete a keypair by name."""
-        #print ("delete an attribute")
-        scope=scope_obj.Scope()
-        #self._notify(context, 'delete.start', key_name)
-        scope.delete(context,id)
-        #self._notify(context, 'delete.end', key_name)   
-    '''
+    def delete_scope(self, context, id):
+        """Delete an attribute value by id."""
+        LOG.debug(_("Deleting scope %s"), id)
+        scope = scope_obj.Scope()
+        scope.delete(context, id)
+
     @wrap_exception()
-    def list(self, context):
-        #self.ensure_default(context)
-        scopee=scope_obj.Scopee()
-        return scope.list(context)
-    '''
+    def delete_scopes(self, context, ids):
+        """Delete several scopes in a single transaction."""
+        scope_obj.Scope.delete_all(context, ids)
+        self._notify(context, 'delete.bulk', ids)
+
+
 class KeypairAPI(base.Base):
     """Subset of the Compute Manager API for managing key pairs."""
 
@@ -0,0 +1,111 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Digest of the images cached on a compute host.
+
+A compute host reports the images in its local cache in its stats under
+STATS_KEY, and the scheduler reads them back to prefer hosts that do not
+need to download the image of an instance.  Images are identified by their
+cache name, the SHA1 hex digest of the image id.
+
+The digest is either a comma separated list of the cache names or, when a
+number of bits is given, a Bloom filter 'bloom:<hashes>:<base64 bits>'.
+The Bloom filter has a fixed size whatever the number of images, at the
+cost of false positives.
+"""
+
+import base64
+import hashlib
+import math
+
+STATS_KEY = 'cached_images'
+
+BLOOM_PREFIX = 'bloom:'
+
+# Each hash is taken from 8 hex digits of the cache name.
+MAX_HASHES = 5
+
+
+def cache_name(image_id):
+    """Return the cache name of an image id."""
+    return hashlib.sha1(str(image_id)).hexdigest()
+
+
+class BloomFilter(object):
+    """A Bloom filter of image cache names.
+
+    As cache names are already SHA1 digests, the positions of a name are
+    slices of its hex digits rather than further hashes.
+    """
+
+    def __init__(self, bits, hashes, data=None):
+        # Whole bytes are encoded, so use all their bits.
+        self.data = data or bytearray((bits + 7) // 8)
+        self.bits = len(self.data) * 8
+        self.hashes = hashes
+
+    @classmethod
+    def for_names(cls, names, bits):
+        """Return a filter of bits bits holding names, with the number of
+        hashes giving the fewest false positives for that many names.
+        """
+        hashes = int(round(float(bits) / max(len(names), 1) * math.log(2)))
+        bloom = cls(bits, max(1, min(hashes, MAX_HASHES)))
+        for name in names:
+            bloom.add(name)
+        return bloom
+
+    def _positions(self, name):
+        for i in xrange(self.hashes):
+            yield int(name[i * 8:(i + 1) * 8], 16) % self.bits
+
+    def add(self, name):
+        for pos in self._positions(name):
+            self.data[pos // 8] |= 1 << (pos % 8)
+
+    def __contains__(self, name):
+        return all(self.data[pos // 8] & (1 << (pos % 8))
+                   for pos in self._positions(name))
+
+    def encode(self):
+        return '%s%d:%s' % (BLOOM_PREFIX, self.hashes,
+                            base64.b64encode(str(self.data)))
+
+    @classmethod
+    def decode(cls, value):
+        hashes, data = value[len(BLOOM_PREFIX):].split(':', 1)
+        data = bytearray(base64.b64decode(data))
+        return cls(0, int(hashes), data)
+
+
+def encode(names, bits=0):
+    """Return the digest of a list of cache names.
+
+    :param bits: size of the Bloom filter to encode the names in, 0 to
+                 encode them as a list
+    """
+    if bits > 0:
+        return BloomFilter.for_names(names, bits).encode()
+    return ','.join(sorted(names))
+
+
+def decode(value):
+    """Return a container of the cache names in a digest.
+
+    Testing a name on the result may give false positives if the digest
+    is a Bloom filter.
+    """
+    if not value:
+        return set()
+    if value.startswith(BLOOM_PREFIX):
+        return BloomFilter.decode(value)
+    return set(value.split(','))
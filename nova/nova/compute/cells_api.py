@@ -416,6 +416,7 @@ class ComputeCellsAPI(compute_api.API):
                        disk_bus, device_type):
         """Attach an existing volume to an existing instance."""
         volume = self.volume_api.get(context, volume_id)
+        self._check_attach_constraints(context, instance, volume)
         self.volume_api.check_attach(context, volume, instance=instance)
 
         return self._call_to_cells(context, instance, 'attach_volume',
@@ -0,0 +1,164 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compiled CVRM constraint evaluation.
+
+A project's attributes and their allowed values (scopes) are compiled into a
+decision table that assigns one bit to every (attribute, value) pair.  A VM
+or volume is then described by the bitset of the attribute values it carries
+in its metadata, and an attach decision is a comparison of two integers.
+
+A volume may be attached to a VM when, for every attribute of the project
+that either of them carries, both carry the same value and that value is one
+of the attribute's scopes.  Metadata keys that are not attributes of the
+project are ignored.
+"""
+
+import weakref
+
+from oslo.config import cfg
+
+from nova.objects import attribute as attribute_obj
+from nova.objects import scope as scope_obj
+from nova.openstack.common.gettextutils import _
+from nova.openstack.common import log as logging
+from nova.openstack.common import timeutils
+from nova import utils
+
+cvrm_opts = [
+    cfg.BoolOpt('cvrm_enforce_attach_constraints',
+                default=False,
+                help='Refuse to attach a volume to an instance when their '
+                     'CVRM attribute values do not satisfy the project\'s '
+                     'constraints'),
+    ]
+
+CONF = cfg.CONF
+CONF.register_opts(cvrm_opts)
+
+LOG = logging.getLogger(__name__)
+
+# Bitset used for a resource that carries a value outside of its attribute's
+# scopes.  It never equals the encoding of another resource, so any attach
+# involving it is refused.
+INVALID = -1
+
+
+class ProjectPolicy(object):
+    """Decision table compiled from one project's attributes and scopes."""
+
+    def __init__(self, project_id, attributes, scopes):
+        self.project_id = project_id
+        self.compiled_at = timeutils.utcnow_ts()
+        # attribute name -> {value: bit}
+        self.bits = {}
+        bit = 1
+        for name in sorted(attributes):
+            values = {}
+            for value in sorted(scopes.get(name, {})):
+                values[value] = bit
+                bit <<= 1
+            self.bits[name] = values
+
+    def encode(self, metadata):
+        """Return the bitset describing a resource's attribute values."""
+        if not metadata:
+            return 0
+        code = 0
+        for name, value in metadata.iteritems():
+            values = self.bits.get(name)
+            if values is None:
+                continue
+            value_bit = values.get(value)
+            if value_bit is None:
+                return INVALID
+            code |= value_bit
+        return code
+
+    @staticmethod
+    def permits_codes(instance_code, volume_code):
+        if instance_code == INVALID or volume_code == INVALID:
+            return False
+        return instance_code == volume_code
+
+    def permits(self, instance_metadata, volume_metadata):
+        return self.permits_codes(self.encode(instance_metadata),
+                                  self.encode(volume_metadata))
+
+
+class ConstraintEngine(object):
+    """Per-process cache of compiled project policies.
+
+    Policies are rebuilt lazily: the attribute and scope objects notify the
+    engine whenever a project's definitions change, and a compiled policy is
+    never trusted for longer than the object cache itself would be.
+    """
+
+    def __init__(self):
+        self._policies = {}
+        _ENGINES.add(self)
+
+    def invalidate(self, project_id):
+        self._policies.pop(project_id, None)
+
+    def reset(self):
+        self._policies = {}
+
+    def get_policy(self, context, project_id):
+        policy = self._policies.get(project_id)
+        if (policy is None or timeutils.utcnow_ts() >=
+                policy.compiled_at + attribute_obj.CVRM_CACHE_SECONDS):
+            attributes = attribute_obj.get_project_attributes(context,
+                                                              project_id)
+            scopes = scope_obj.get_project_scopes(context, project_id)
+            policy = ProjectPolicy(project_id, attributes, scopes)
+            self._policies[project_id] = policy
+            LOG.debug(_('Compiled CVRM policy for project %(project)s with '
+                        '%(count)d attributes'),
+                      {'project': project_id, 'count': len(policy.bits)})
+        return policy
+
+    def permits_attach(self, context, instance, volume):
+        """Decide whether a volume may be attached to an instance."""
+        instance_meta = instance.get('metadata') or {}
+        if not isinstance(instance_meta, dict):
+            instance_meta = utils.metadata_to_dict(instance_meta)
+        volume_meta = volume.get('volume_metadata') or {}
+        if not instance_meta and not volume_meta:
+            # Neither side carries attribute values, so nothing to enforce.
+            return True
+        policy = self.get_policy(context, instance['project_id'])
+        return policy.permits(instance_meta, volume_meta)
+
+
+_ENGINE = None
+
+# Engines notified of changes by the single hook registered below, without
+# keeping them alive.
+_ENGINES = weakref.WeakSet()
+
+
+def _invalidate_engines(project_id):
+    for engine in list(_ENGINES):
+        engine.invalidate(project_id)
+
+
+attribute_obj.register_invalidation_hook(_invalidate_engines)
+
+
+def get_engine():
+    global _ENGINE
+
+    if _ENGINE is None:
+        _ENGINE = ConstraintEngine()
+
+    return _ENGINE
@@ -139,6 +139,11 @@ interval_opts = [
                default=60,
                help="Number of seconds between instance info_cache self "
                     "healing updates"),
+    cfg.IntOpt("heal_instance_info_cache_batch_size",
+               default=1,
+               help="Number of instances whose info_cache is healed on each "
+                    "update.  Above 1, the network API refreshes them in "
+                    "one bulk request"),
     cfg.IntOpt('reclaim_instance_interval',
                default=0,
                help='Interval in seconds for reclaiming deleted instances'),
@@ -626,13 +631,19 @@ class ComputeManager(manager.Manager):
         instance_ref = self.conductor_api.instance_update(context,
                                                           instance_uuid,
                                                           **kwargs)
-        if (instance_ref['host'] == self.host and
-                self.driver.node_is_available(instance_ref['node'])):
-            rt = self._get_resource_tracker(instance_ref.get('node'))
-            rt.update_usage(context, instance_ref)
+        self._update_resource_tracker(context, instance_ref)
 
         return instance_ref
 
+    def _update_resource_tracker(self, context, instance):
+        """Let the resource tracker apply the usage change of an instance
+        hosted on this node.
+        """
+        if (instance['host'] == self.host and
+                self.driver.node_is_available(instance['node'])):
+            rt = self._get_resource_tracker(instance.get('node'))
+            rt.update_usage(context, instance)
+
     def _set_instance_error_state(self, context, instance_uuid):
         try:
             self._instance_update(context, instance_uuid,
@@ -2252,6 +2263,9 @@ class ComputeManager(manager.Manager):
             with excutils.save_and_reraise_exception():
                 quotas.rollback()
 
+        # NOTE: free the usage now rather than waiting for the next full
+        # audit of the resource tracker.
+        self._update_resource_tracker(context, instance)
         self._complete_deletion(context,
                                 instance,
                                 bdms,
@@ -4832,8 +4846,9 @@ class ComputeManager(manager.Manager):
         calling to the network manager.
 
         This is implemented by keeping a cache of uuids of instances
-        that live on this host.  On each call, we pop one off of a
-        list, pull the DB record, and try the call to the network API.
+        that live on this host.  On each call, we pop
+        heal_instance_info_cache_batch_size of them off of a list, pull
+        their DB records, and try the call to the network API.
         If anything errors don't fail, as it's possible the instance
         has been deleted, etc.
         """
@@ -4841,8 +4856,9 @@ class ComputeManager(manager.Manager):
         if not heal_interval:
             return
 
+        batch_size = max(1, CONF.heal_instance_info_cache_batch_size)
         instance_uuids = getattr(self, '_instance_uuids_to_heal', [])
-        instance = None
+        instances = []
 
         LOG.debug(_('Starting heal instance info cache'))
 
@@ -4865,17 +4881,17 @@ class ComputeManager(manager.Manager):
                                 'because it is being deleted.'), instance=inst)
                     continue
 
-                if not instance:
-                    # Save the first one we find so we don't
-                    # have to get it again
-                    instance = inst
+                if len(instances) < batch_size:
+                    # Save the first ones we find so we don't
+                    # have to get them again
+                    instances.append(inst)
                 else:
                     instance_uuids.append(inst['uuid'])
 
             self._instance_uuids_to_heal = instance_uuids
         else:
-            # Find the next valid instance on the list
-            while instance_uuids:
+            # Find the next valid instances on the list
+            while instance_uuids and len(instances) < batch_size:
                 try:
                     inst = instance_obj.Instance.get_by_uuid(
                             context, instance_uuids.pop(0),
@@ -4895,11 +4911,20 @@ class ComputeManager(manager.Manager):
                     LOG.debug(_('Skipping network cache update for instance '
                                 'because it is being deleted.'), instance=inst)
                 else:
-                    instance = inst
-                    break
+                    instances.append(inst)
 
-        if instance:
+        if len(instances) > 1:
+            try:
+                self.network_api.get_instance_nw_info_bulk(context, instances,
+                                                           use_slave=True)
+                LOG.debug(_('Updated the network info_cache for %d '
+                            'instances'), len(instances))
+            except Exception:
+                LOG.error(_('An error occurred while refreshing the network '
+                            'cache.'), exc_info=True)
+        elif instances:
             # We have an instance now to refresh
+            instance = instances[0]
             try:
                 # Call to network API to get instance info.. this will
                 # force an update to the instance's info_cache
@@ -5239,12 +5264,21 @@ class ComputeManager(manager.Manager):
         number of virtual machines known by the database, we proceed in a lazy
         loop, one database record at a time, checking if the hypervisor has the
         same power state as is in the database.
+
+        If the driver can list the power states of all its instances at once,
+        only the records whose power state differs from the hypervisor, or
+        does not fit their vm_state, are refreshed and synced.
         """
         db_instances = instance_obj.InstanceList.get_by_host(context,
                                                              self.host,
                                                              use_slave=True)
 
-        num_vm_instances = self.driver.get_num_instances()
+        try:
+            vm_power_states = self.driver.list_instance_power_states()
+            num_vm_instances = len(vm_power_states)
+        except NotImplementedError:
+            vm_power_states = None
+            num_vm_instances = self.driver.get_num_instances()
         num_db_instances = len(db_instances)
 
         if num_vm_instances != num_db_instances:
@@ -5262,11 +5296,20 @@ class ComputeManager(manager.Manager):
                 continue
             # No pending tasks. Now try to figure out the real vm_power_state.
             try:
-                try:
-                    vm_instance = self.driver.get_info(db_instance)
-                    vm_power_state = vm_instance['state']
-                except exception.InstanceNotFound:
-                    vm_power_state = power_state.NOSTATE
+                if vm_power_states is not None:
+                    vm_power_state = vm_power_states.get(db_instance['name'],
+                                                         power_state.NOSTATE)
+                    if (vm_power_state == db_instance['power_state'] and
+                            self._power_state_fits_vm_state(
+                                db_instance['vm_state'], vm_power_state)):
+                        # Nothing to sync, don't go back to the database
+                        continue
+                else:
+                    try:
+                        vm_instance = self.driver.get_info(db_instance)
+                        vm_power_state = vm_instance['state']
+                    except exception.InstanceNotFound:
+                        vm_power_state = power_state.NOSTATE
                 # Note(maoy): the above get_info call might take a long time,
                 # for example, because of a broken libvirt driver.
                 try:
@@ -5283,6 +5326,26 @@ class ComputeManager(manager.Manager):
                                 "while processing an instance."),
                                 instance=db_instance)
 
+    @staticmethod
+    def _power_state_fits_vm_state(vm_state, vm_power_state):
+        """Returns True if _sync_instance_power_state() has nothing to do
+        for an instance in vm_state whose recorded power state already is
+        vm_power_state.
+        """
+        if vm_state == vm_states.ACTIVE:
+            return vm_power_state == power_state.RUNNING
+        elif vm_state == vm_states.STOPPED:
+            return vm_power_state in (power_state.NOSTATE,
+                                      power_state.SHUTDOWN,
+                                      power_state.CRASHED)
+        elif vm_state == vm_states.PAUSED:
+            return vm_power_state not in (power_state.SHUTDOWN,
+                                          power_state.CRASHED)
+        elif vm_state in (vm_states.SOFT_DELETED, vm_states.DELETED):
+            return vm_power_state in (power_state.NOSTATE,
+                                      power_state.SHUTDOWN)
+        return True
+
     def _sync_instance_power_state(self, context, db_instance, vm_power_state,
                                    use_slave=False):
         """Align instance power state between the database and hypervisor.
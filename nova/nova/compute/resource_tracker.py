@@ -19,8 +19,11 @@ scheduler with useful information about availability through the ComputeNode
 model.
 """
 
+import hashlib
+
 from oslo.config import cfg
 
+from nova.compute import cached_images
 from nova.compute import claims
 from nova.compute import flavors
 from nova.compute import monitors
@@ -37,6 +40,7 @@ from nova.openstack.common.gettextutils import _
 from nova.openstack.common import importutils
 from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
+from nova.openstack.common import timeutils
 from nova.pci import pci_manager
 from nova import rpc
 from nova import utils
@@ -48,7 +52,29 @@ resource_tracker_opts = [
                help='Amount of memory in MB to reserve for the host'),
     cfg.StrOpt('compute_stats_class',
                default='nova.compute.stats.Stats',
-               help='Class that will manage stats for the local compute host')
+               help='Class that will manage stats for the local compute host'),
+    cfg.IntOpt('resource_tracker_full_audit_interval', default=0,
+               help='Seconds between full audits of the resources of the '
+                    'compute host against the hypervisor and the database. '
+                    'In between, the periodic task only reports changed '
+                    'metrics and the usage kept up to date by the claim, '
+                    'abort and migration events. 0 audits on every run'),
+    cfg.IntOpt('resource_tracker_claim_grace_period', default=300,
+               help='Seconds the scheduler claims on the compute node '
+                    'record are kept between full audits before the '
+                    'resource tracker releases them by writing its own '
+                    'usage.  This should cover the time an instance takes '
+                    'to reach the host once scheduled'),
+    cfg.BoolOpt('report_cached_images', default=False,
+                help='Report the images cached on the compute host in its '
+                     'stats, so that the scheduler can prefer hosts that '
+                     'do not need to download the image of an instance'),
+    cfg.IntOpt('cached_images_bloom_bits', default=0,
+               help='Report the cached images as a Bloom filter of this '
+                    'many bits rather than as a list of their names.  The '
+                    'size of the filter does not grow with the number of '
+                    'images, but the scheduler may take a host for one '
+                    'caching an image it does not have.  0 reports a list'),
 ]
 
 CONF = cfg.CONF
@@ -59,6 +85,16 @@ COMPUTE_RESOURCE_SEMAPHORE = "compute_resources"
 
 CONF.import_opt('my_ip', 'nova.netconf')
 
+# Compute node columns that scheduler claims update directly.  The tracker
+# writes changes of its own usage of them as deltas, which keeps the claims,
+# and only sets them when it releases the claims.
+CLAIMED_FIELDS = ('memory_mb_used', 'free_ram_mb', 'vcpus_used',
+                  'local_gb_used', 'free_disk_gb', 'disk_available_least')
+
+
+def _digest(value):
+    return hashlib.sha1(jsonutils.dumps(value)).hexdigest()
+
 
 class ResourceTracker(object):
     """Compute helper class for keeping track of resource usage as instances
@@ -74,6 +110,18 @@ class ResourceTracker(object):
         self.stats = importutils.import_object(CONF.compute_stats_class)
         self.tracked_instances = {}
         self.tracked_migrations = {}
+        # Digests of the compute node values as last written to the DB:
+        self.reported = {}
+        # The tracker's own usage of CLAIMED_FIELDS as last written:
+        self.reported_usage = {}
+        self.write_stats = {'writes': 0, 'skipped': 0, 'heartbeats': 0,
+                            'bytes': 0}
+        self.last_write_stats = None
+        self.last_full_audit = None
+        # Last generation of the compute node seen by the tracker, and when
+        # it last saw new scheduler claims on it:
+        self.generation_seen = None
+        self.claims_seen = None
         self.conductor_api = conductor.API()
         monitor_handler = monitors.ResourceMonitorHandler()
         self.monitors = monitor_handler.choose_monitors(self)
@@ -288,7 +336,21 @@ class ResourceTracker(object):
         Add in resource claims in progress to account for operations that have
         declared a need for resources, but not necessarily retrieved them from
         the hypervisor layer yet.
+
+        The full audit only runs every resource_tracker_full_audit_interval
+        seconds.  In between, usage is maintained by the claim and usage
+        events and only the host metrics are refreshed.  Scheduler claims
+        older than resource_tracker_claim_grace_period are released then.
         """
+        if not self._full_audit_due():
+            metrics = self._get_host_metrics(context, self.nodename)
+            self.compute_node['metrics'] = jsonutils.dumps(metrics)
+            self._update_cached_images(self.compute_node)
+            self._update(context, self.compute_node)
+            self._release_claims(context)
+            self._end_write_period()
+            return
+
         LOG.audit(_("Auditing locally available compute resources"))
         resources = self.driver.get_available_resource(self.nodename)
 
@@ -329,6 +391,8 @@ class ResourceTracker(object):
         orphans = self._find_orphaned_instances()
         self._update_usage_from_orphans(resources, orphans)
 
+        self._update_cached_images(resources)
+
         # NOTE(yjiang5): Because pci device tracker status is not cleared in
         # this periodic task, and also because the resource tracker is not
         # notified when instances are deleted, we need remove all usages
@@ -344,6 +408,67 @@ class ResourceTracker(object):
         metrics = self._get_host_metrics(context, self.nodename)
         resources['metrics'] = jsonutils.dumps(metrics)
         self._sync_compute_node(context, resources)
+        if self.compute_node:
+            self._release_claims(context)
+        self.last_full_audit = timeutils.utcnow()
+        self._end_write_period()
+
+    def _update_cached_images(self, resources):
+        """Add a digest of the images cached on the host to its stats."""
+        if not CONF.report_cached_images:
+            return
+        self.stats[cached_images.STATS_KEY] = cached_images.encode(
+            self.driver.get_cached_images(), CONF.cached_images_bloom_bits)
+        resources['stats'] = jsonutils.dumps(self.stats)
+
+    def _end_write_period(self):
+        """Log and keep the compute node writes since the last period."""
+        self.last_write_stats = self.write_stats
+        self.write_stats = {'writes': 0, 'skipped': 0, 'heartbeats': 0,
+                            'bytes': 0}
+        LOG.debug(_("Compute node writes for %(node)s: %(writes)d written "
+                    "(%(bytes)d bytes), %(skipped)d skipped, %(heartbeats)d "
+                    "of them bumping updated_at only"),
+                  dict(self.last_write_stats, node=self.nodename))
+
+    def _release_claims(self, context):
+        """Overwrite the scheduler's claims once their grace period passed.
+
+        Claims bump the generation of the compute node past the one the
+        tracker last saw.  New claims restart the grace period, and the
+        write only applies if no claim landed since.  This releases the
+        claims of instances that were rescheduled, failed or deleted before
+        claiming here.
+        """
+        generation = None
+        service = self._get_service(context)
+        for cn in (service or {}).get('compute_node') or []:
+            if cn.get('id') == self.compute_node.get('id'):
+                generation = cn.get('generation')
+
+        if generation is None:
+            return
+        if generation != self.generation_seen:
+            self.generation_seen = generation
+            self.claims_seen = timeutils.utcnow()
+            return
+        if self.claims_seen is None or not timeutils.is_older_than(
+                self.claims_seen, CONF.resource_tracker_claim_grace_period):
+            return
+
+        try:
+            self._update(context, self.compute_node, force=True,
+                         generation=generation)
+        except exception.ComputeNodeClaimConflict:
+            # The new claims are seen, and get their grace period, next run.
+            LOG.debug(_("Scheduler claimed %s while releasing claims"),
+                      self.nodename)
+
+    def _full_audit_due(self):
+        interval = CONF.resource_tracker_full_audit_interval
+        if self.disabled or interval <= 0 or self.last_full_audit is None:
+            return True
+        return timeutils.is_older_than(self.last_full_audit, interval)
 
     def _sync_compute_node(self, context, resources):
         """Create or update the compute node DB record."""
@@ -359,6 +484,7 @@ class ResourceTracker(object):
                 for cn in compute_node_refs:
                     if cn.get('hypervisor_hostname') == self.nodename:
                         self.compute_node = cn
+                        self.reported_usage = self._usage(cn)
                         if self.pci_tracker:
                             self.pci_tracker.set_compute_node_id(cn['id'])
                         break
@@ -373,7 +499,8 @@ class ResourceTracker(object):
                     % {'host': self.host, 'node': self.nodename})
 
         else:
-            # just update the record:
+            # just update the record, keeping whatever the scheduler claimed
+            # since the last audit:
             self._update(context, resources)
             LOG.info(_('Compute_service record updated for %(host)s:%(node)s')
                     % {'host': self.host, 'node': self.nodename})
@@ -383,6 +510,9 @@ class ResourceTracker(object):
         # initialize load stats from existing instances:
         self.compute_node = self.conductor_api.compute_node_create(context,
                                                                    values)
+        self.reported = self._digests(self.compute_node)
+        self.reported_usage = self._usage(self.compute_node)
+        self.generation_seen = self.compute_node.get('generation')
 
     def _get_service(self, context):
         try:
@@ -441,14 +571,95 @@ class ResourceTracker(object):
         if 'pci_devices' in resources:
             LOG.audit(_("Free PCI devices: %s") % resources['pci_devices'])
 
-    def _update(self, context, values):
-        """Persist the compute node updates to the DB."""
+    @staticmethod
+    def _usage(values):
+        return dict((key, values[key]) for key in CLAIMED_FIELDS
+                    if key in values)
+
+    def _digests(self, values):
+        return dict((key, _digest(value))
+                    for key, value in values.iteritems())
+
+    def _update(self, context, values, force=False, generation=None):
+        """Persist the compute node updates to the DB.
+
+        Only the values that changed since the last update are written.  If
+        none did, only updated_at is bumped, as the scheduler ignores records
+        older than the state it consumed on the host.  Changes of CLAIMED_FIELDS are
+        written as deltas, so that the scheduler's claims on the record are
+        kept.  With force set, CLAIMED_FIELDS are set instead, even if they
+        did not change, to overwrite the scheduler's claims.  With a
+        generation, the write only applies if the compute node still is at
+        that generation, otherwise ComputeNodeClaimConflict is raised.
+
+        The record returned may include the scheduler's claims, so the
+        tracker keeps its own view of CLAIMED_FIELDS and only takes the
+        other values from it.
+        """
         if "service" in self.compute_node:
             del self.compute_node['service']
-        self.compute_node = self.conductor_api.compute_node_update(
-            context, self.compute_node, values)
+        # PCI devices are saved apart from the compute node record, so
+        # they are saved even when no compute node value changed.
         if self.pci_tracker:
             self.pci_tracker.save(context)
+        values = dict((key, value) for key, value in values.iteritems()
+                      if key != 'service' and
+                      ((force and key in CLAIMED_FIELDS) or
+                       self.reported.get(key) != _digest(value)))
+        if not values:
+            self.write_stats['skipped'] += 1
+            self._heartbeat(context)
+            return
+        usage = self._usage(self.compute_node)
+        usage.update(self._usage(values))
+        if not force:
+            deltas = {}
+            for key in CLAIMED_FIELDS:
+                old = self.reported_usage.get(key)
+                if (key in values and old is not None and
+                        values[key] is not None):
+                    deltas[key] = values.pop(key) - old
+            if deltas:
+                values['usage_deltas'] = deltas
+        if generation is not None:
+            values['generation'] = generation
+        size = len(jsonutils.dumps(values))
+        compute_node = self.conductor_api.compute_node_update(
+            context, self.compute_node, values)
+        self.write_stats['writes'] += 1
+        self.write_stats['bytes'] += size
+        self.compute_node = dict(compute_node)
+        self.compute_node.update(usage)
+        self.reported = self._digests(self.compute_node)
+        self.reported_usage = usage
+        self._note_generation(self.compute_node.get('generation'), force)
+
+    def _heartbeat(self, context):
+        """Bump updated_at on the compute node without changing values."""
+        compute_node = self.conductor_api.compute_node_update(
+            context, self.compute_node, {})
+        self.write_stats['heartbeats'] += 1
+        for key in ('updated_at', 'generation'):
+            if key in compute_node:
+                self.compute_node[key] = compute_node[key]
+        self.reported = self._digests(self.compute_node)
+        self._note_generation(compute_node.get('generation'), False)
+
+    def _note_generation(self, generation, released):
+        """Note the generation of the compute node after a write.
+
+        A write that did not release the claims keeps them on the record.
+        If the record was past the generation the tracker last saw, claims
+        landed that the tracker did not see yet.
+        """
+        if generation is None:
+            return
+        if released:
+            self.claims_seen = None
+        elif (self.generation_seen is not None and
+                generation - 1 != self.generation_seen):
+            self.claims_seen = timeutils.utcnow()
+        self.generation_seen = generation
 
     def _update_usage(self, resources, usage, sign=1):
         mem_usage = usage['memory_mb']
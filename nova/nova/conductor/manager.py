@@ -30,6 +30,7 @@ from nova.db import base
 from nova import exception
 from nova.image import glance
 from nova import manager
+from nova import metadata_cache
 from nova import network
 from nova.network.security_group import openstack_driver
 from nova import notifications
@@ -128,6 +129,7 @@ class ConductorManager(manager.Manager):
 
         old_ref, instance_ref = self.db.instance_update_and_get_original(
             context, instance_uuid, updates)
+        metadata_cache.instance_updated(instance_uuid, updates)
         notifications.send_update(context, old_ref, instance_ref, service)
         return jsonutils.to_primitive(instance_ref)
 
@@ -469,6 +471,7 @@ class ConductorManager(manager.Manager):
         result = self.db.compute_node_create(context, values)
         return jsonutils.to_primitive(result)
 
+    @messaging.expected_exceptions(exception.ComputeNodeClaimConflict)
     def compute_node_update(self, context, node, values, prune_stats=False):
         # NOTE(belliott) prune_stats is no longer relevant and will be
         # ignored
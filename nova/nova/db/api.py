@@ -26,7 +26,6 @@ implement a dictionary interface. However, a future goal is to have all of
 these objects be simple dictionaries.
 
 """
-import traceback
 from oslo.config import cfg
 
 from nova.cells import rpcapi as cells_rpcapi
@@ -194,6 +193,21 @@ def compute_node_get_all(context, no_date_fields=False):
     return IMPL.compute_node_get_all(context, no_date_fields)
 
 
+def compute_node_get_all_changed_since(context, changed_since):
+    """Get the computeNodes created, updated or deleted since a given time.
+
+    :param context: The security context
+    :param changed_since: datetime; rows whose created_at, updated_at or
+                          deleted_at is at or after it are returned,
+                          including deleted ones
+
+    :returns: Dictionary with 'compute_nodes', a list of dictionaries each
+              containing compute node properties including corresponding
+              service, and 'services', a list of all nova-compute services
+    """
+    return IMPL.compute_node_get_all_changed_since(context, changed_since)
+
+
 def compute_node_search_by_hypervisor(context, hypervisor_match):
     """Get compute nodes by hypervisor hostname.
 
@@ -229,10 +243,28 @@ def compute_node_update(context, compute_id, values):
               compute node, including its corresponding service and statistics
 
     Raises ComputeHostNotFound if compute node with the given ID doesn't exist.
+    If values include a generation, the update only applies if the compute
+    node still is at that generation, otherwise ComputeNodeClaimConflict is
+    raised.  If they include usage_deltas, a dict of column names to
+    amounts, those columns are incremented by the amounts rather than set.
     """
     return IMPL.compute_node_update(context, compute_id, values)
 
 
+def compute_node_claim(context, compute_id, generation, memory_mb, vcpus,
+                       disk_gb):
+    """Claim resources on a computeNode unless it changed.
+
+    The claim only succeeds if the generation of the compute node still is
+    the one the caller last read, otherwise ComputeNodeClaimConflict is
+    raised.
+
+    :returns: The new generation of the compute node
+    """
+    return IMPL.compute_node_claim(context, compute_id, generation,
+                                   memory_mb, vcpus, disk_gb)
+
+
 def compute_node_delete(context, compute_id):
     """Delete a compute node from the database.
 
@@ -883,7 +915,6 @@ def instance_info_cache_delete(context, instance_uuid):
 
 def key_pair_create(context, values):
     """Create a key_pair from the values dictionary."""
-    traceback.print_stack()
     return IMPL.key_pair_create(context, values)
 
 
@@ -1120,6 +1151,30 @@ def reservation_rollback(context, reservations, project_id=None, user_id=None):
                                      user_id=user_id)
 
 
+def quota_reserve_counter(context, resources, quotas, user_quotas, deltas,
+                          expire, max_age, project_id=None, user_id=None):
+    """Check quotas and create reservations without locking usages."""
+    return IMPL.quota_reserve_counter(context, resources, quotas,
+                                      user_quotas, deltas, expire, max_age,
+                                      project_id=project_id, user_id=user_id)
+
+
+def reservation_commit_counter(context, reservations, project_id=None,
+                               user_id=None):
+    """Commit reservations made by quota_reserve_counter()."""
+    return IMPL.reservation_commit_counter(context, reservations,
+                                           project_id=project_id,
+                                           user_id=user_id)
+
+
+def reservation_rollback_counter(context, reservations, project_id=None,
+                                 user_id=None):
+    """Roll back reservations made by quota_reserve_counter()."""
+    return IMPL.reservation_rollback_counter(context, reservations,
+                                             project_id=project_id,
+                                             user_id=user_id)
+
+
 def quota_destroy_all_by_project_and_user(context, project_id, user_id):
     """Destroy all quotas associated with a given project and user."""
     return IMPL.quota_destroy_all_by_project_and_user(context,
@@ -1136,6 +1191,11 @@ def reservation_expire(context):
     return IMPL.reservation_expire(context)
 
 
+def reservation_expire_counter(context):
+    """Roll back expired reservations made by quota_reserve_counter()."""
+    return IMPL.reservation_expire_counter(context)
+
+
 ###################
 
 
@@ -1931,17 +1991,48 @@ def attribute_create(context, values):
     """Create an attribute."""
     return IMPL.attribute_create(context, values)
 
-def attribute_list(context):
-    """Create an attribute."""
-    return IMPL.attribute_list(context)
 
-def attribute_delete(context,id):
-    """Create an attribute."""
-    print (id)
-    return IMPL.attribute_delete(context,id)
+def attribute_create_all(context, values_list):
+    """Create several attributes in a single transaction."""
+    return IMPL.attribute_create_all(context, values_list)
+
+
+def attribute_get_all_by_project(context, project_id):
+    """Get all attributes defined for a project."""
+    return IMPL.attribute_get_all_by_project(context, project_id)
+
+
+def attribute_delete(context, id):
+    """Delete an attribute."""
+    return IMPL.attribute_delete(context, id)
+
+
+def attribute_delete_all(context, ids):
+    """Delete several attributes and their scopes in a single transaction.
+
+    Returns the ids of the projects of the deleted attributes.
+    """
+    return IMPL.attribute_delete_all(context, ids)
+
+
 def scope_create(context, values):
-    """Create an attribute."""
+    """Create an attribute value (scope)."""
     return IMPL.scope_create(context, values)
-def scope_list(context):
-    """Create an attribute."""
-    return IMPL.scope_list(context)
+
+
+def scope_create_all(context, values_list):
+    """Create several scopes in a single transaction."""
+    return IMPL.scope_create_all(context, values_list)
+
+
+def scope_get_all_by_project(context, project_id):
+    """Get all attribute values (scopes) defined for a project."""
+    return IMPL.scope_get_all_by_project(context, project_id)
+
+
+def scope_delete_all(context, ids):
+    """Delete several scopes in a single transaction.
+
+    Returns the ids of the projects of the deleted scopes.
+    """
+    return IMPL.scope_delete_all(context, ids)
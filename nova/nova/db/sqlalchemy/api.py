@@ -16,7 +16,6 @@
 #    under the License.
 
 """Implementation of SQLAlchemy backend."""
-import traceback
 import collections
 import copy
 import datetime
@@ -612,6 +611,44 @@ def compute_node_get_all(context, no_date_fields):
     return compute_nodes
 
 
+@require_admin_context
+def compute_node_get_all_changed_since(context, changed_since):
+    engine = get_engine()
+
+    compute_node = models.ComputeNode.__table__
+    service = models.Service.__table__
+
+    with engine.begin() as conn:
+        # Deleted compute nodes are included so that callers can drop them.
+        compute_node_query = select([compute_node]).\
+                where(or_(compute_node.c.created_at >= changed_since,
+                          compute_node.c.updated_at >= changed_since,
+                          compute_node.c.deleted_at >= changed_since)).\
+                order_by(compute_node.c.service_id)
+        compute_node_rows = conn.execute(compute_node_query).fetchall()
+
+        # Service rows are small but change on every report, so all of them
+        # are returned.
+        service_query = select([service]).\
+                            where((service.c.deleted == 0) &
+                                  (service.c.binary == 'nova-compute')).\
+                            order_by(service.c.id)
+        service_rows = conn.execute(service_query).fetchall()
+
+    services = {}
+    for proxy in service_rows:
+        services[proxy['id']] = dict(proxy.items())
+
+    compute_nodes = []
+    for proxy in compute_node_rows:
+        node = dict(proxy.items())
+        node['service'] = services.get(proxy['service_id'])
+        compute_nodes.append(node)
+
+    return {'compute_nodes': compute_nodes,
+            'services': services.values()}
+
+
 @require_admin_context
 def compute_node_search_by_hypervisor(context, hypervisor_match):
     field = models.ComputeNode.hypervisor_hostname
@@ -643,11 +680,36 @@ def compute_node_update(context, compute_id, values):
 
     session = get_session()
     with session.begin():
+        generation = values.pop('generation', None)
+        if generation is not None:
+            # Only update the generation the caller read, and hold the row
+            # until the other values are written:
+            count = model_query(context, models.ComputeNode, session=session,
+                                read_deleted='no').\
+                        filter_by(id=compute_id).\
+                        filter_by(generation=generation).\
+                        update({'generation': generation + 1},
+                               synchronize_session=False)
+            if not count:
+                raise exception.ComputeNodeClaimConflict(
+                        compute_id=compute_id)
+        usage_deltas = values.pop('usage_deltas', None)
+        if usage_deltas:
+            # Add to the columns rather than set them, like claims do:
+            node = models.ComputeNode
+            model_query(context, node, session=session, read_deleted='no').\
+                    filter_by(id=compute_id).\
+                    update(dict((key, getattr(node, key) + delta)
+                                for key, delta in usage_deltas.iteritems()),
+                           synchronize_session=False)
         compute_ref = _compute_node_get(context, compute_id, session=session)
         # Always update this, even if there's going to be no other
         # changes in data.  This ensures that we invalidate the
         # scheduler cache of compute node data in case of races.
         values['updated_at'] = timeutils.utcnow()
+        # Refuse scheduler claims made against the previous state.
+        if generation is None:
+            values['generation'] = (compute_ref.generation or 0) + 1
         datetime_keys = ('created_at', 'deleted_at', 'updated_at')
         convert_objects_related_datetimes(values, *datetime_keys)
         compute_ref.update(values)
@@ -655,6 +717,33 @@ def compute_node_update(context, compute_id, values):
     return compute_ref
 
 
+@require_admin_context
+def compute_node_claim(context, compute_id, generation, memory_mb, vcpus,
+                       disk_gb):
+    node = models.ComputeNode
+    values = {'memory_mb_used': node.memory_mb_used + memory_mb,
+              'free_ram_mb': node.free_ram_mb - memory_mb,
+              'vcpus_used': node.vcpus_used + vcpus,
+              'local_gb_used': node.local_gb_used + disk_gb,
+              'free_disk_gb': node.free_disk_gb - disk_gb,
+              'disk_available_least': node.disk_available_least - disk_gb,
+              'generation': generation + 1,
+              'updated_at': timeutils.utcnow()}
+
+    session = get_session()
+    with session.begin():
+        count = model_query(context, node, session=session,
+                            read_deleted='no').\
+                    filter_by(id=compute_id).\
+                    filter_by(generation=generation).\
+                    update(values, synchronize_session=False)
+
+    if not count:
+        raise exception.ComputeNodeClaimConflict(compute_id=compute_id)
+
+    return generation + 1
+
+
 @require_admin_context
 def compute_node_delete(context, compute_id):
     """Delete a ComputeNode record."""
@@ -3028,13 +3117,14 @@ def _reservation_create(context, uuid, usage, project_id, user_id, resource,
 # on reservations.
 
 def _get_project_user_quota_usages(context, session, project_id,
-                                   user_id):
-    rows = model_query(context, models.QuotaUsage,
-                       read_deleted="no",
-                       session=session).\
-                   filter_by(project_id=project_id).\
-                   with_lockmode('update').\
-                   all()
+                                   user_id, lock=True):
+    query = model_query(context, models.QuotaUsage,
+                        read_deleted="no",
+                        session=session).\
+                    filter_by(project_id=project_id)
+    if lock:
+        query = query.with_lockmode('update')
+    rows = query.all()
     proj_result = dict()
     user_result = dict()
     # Get the total count of in_use,reserved
@@ -3049,6 +3139,102 @@ def _get_project_user_quota_usages(context, session, project_id,
     return proj_result, user_result
 
 
+def _quota_usage_refresh(elevated, session, resources, resource,
+                         project_id, user_id, user_usages, until_refresh):
+    """Refresh the usage of resource from its sync routine.
+
+    Returns the names of all the resources refreshed by that routine.
+    """
+    # Grab the sync routine
+    sync = QUOTA_SYNC_FUNCTIONS[resources[resource].sync]
+
+    refreshed = set()
+    updates = sync(elevated, project_id, user_id, session)
+    for res, in_use in updates.items():
+        # Make sure we have a destination for the usage!
+        if ((res not in PER_PROJECT_QUOTAS) and
+                (res not in user_usages)):
+            user_usages[res] = _quota_usage_create(elevated,
+                                                   project_id,
+                                                   user_id,
+                                                   res,
+                                                   0, 0,
+                                                   until_refresh or None,
+                                                   session=session)
+        if ((res in PER_PROJECT_QUOTAS) and
+                (res not in user_usages)):
+            user_usages[res] = _quota_usage_create(elevated,
+                                                   project_id,
+                                                   None,
+                                                   res,
+                                                   0, 0,
+                                                   until_refresh or None,
+                                                   session=session)
+
+        if user_usages[res].in_use != in_use:
+            LOG.debug(_('quota_usages out of sync, updating. '
+                        'project_id: %(project_id)s, '
+                        'user_id: %(user_id)s, '
+                        'resource: %(res)s, '
+                        'tracked usage: %(tracked_use)s, '
+                        'actual usage: %(in_use)s'),
+                {'project_id': project_id,
+                 'user_id': user_id,
+                 'res': res,
+                 'tracked_use': user_usages[res].in_use,
+                 'in_use': in_use})
+
+        # Update the usage
+        user_usages[res].in_use = in_use
+        user_usages[res].until_refresh = until_refresh or None
+
+        # Because more than one resource may be refreshed by the call to
+        # the sync routine, and we don't want to double-sync, we report
+        # all the refreshed resources.
+        refreshed.add(res)
+
+        # NOTE(Vek): We make the assumption that the sync
+        #            routine actually refreshes the
+        #            resources that it is the sync routine
+        #            for.  We don't check, because this is
+        #            a best-effort mechanism.
+    return refreshed
+
+
+def _over_quota_error(overs, deltas, project_quotas, user_quotas,
+                      project_usages, user_usages):
+    """Return the OverQuota exception for the resources in overs."""
+    if project_quotas == user_quotas:
+        usages = project_usages
+    else:
+        usages = user_usages
+    usages = dict((k, dict(in_use=v['in_use'], reserved=v['reserved']))
+                  for k, v in usages.items())
+    headroom = dict((res, user_quotas[res] -
+                         (usages[res]['in_use'] + usages[res]['reserved']))
+                    for res in user_quotas.keys())
+
+    # If quota_cores is unlimited [-1]:
+    # - set cores headroom based on instances headroom:
+    if user_quotas.get('cores') == -1:
+        if deltas['cores']:
+            hc = headroom['instances'] * deltas['cores']
+            headroom['cores'] = hc / deltas['instances']
+        else:
+            headroom['cores'] = headroom['instances']
+
+    # If quota_ram is unlimited [-1]:
+    # - set ram headroom based on instances headroom:
+    if user_quotas.get('ram') == -1:
+        if deltas['ram']:
+            hr = headroom['instances'] * deltas['ram']
+            headroom['ram'] = hr / deltas['instances']
+        else:
+            headroom['ram'] = headroom['instances']
+    return exception.OverQuota(overs=sorted(overs), quotas=user_quotas,
+                               usages=usages, headroom=headroom)
+
+
 @require_context
 @_retry_on_deadlock
 def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
@@ -3108,59 +3294,9 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
 
             # OK, refresh the usage
             if refresh:
-                # Grab the sync routine
-                sync = QUOTA_SYNC_FUNCTIONS[resources[resource].sync]
-
-                updates = sync(elevated, project_id, user_id, session)
-                for res, in_use in updates.items():
-                    # Make sure we have a destination for the usage!
-                    if ((res not in PER_PROJECT_QUOTAS) and
-                            (res not in user_usages)):
-                        user_usages[res] = _quota_usage_create(elevated,
-                                                         project_id,
-                                                         user_id,
-                                                         res,
-                                                         0, 0,
-                                                         until_refresh or None,
-                                                         session=session)
-                    if ((res in PER_PROJECT_QUOTAS) and
-                            (res not in user_usages)):
-                        user_usages[res] = _quota_usage_create(elevated,
-                                                         project_id,
-                                                         None,
-                                                         res,
-                                                         0, 0,
-                                                         until_refresh or None,
-                                                         session=session)
-
-                    if user_usages[res].in_use != in_use:
-                        LOG.debug(_('quota_usages out of sync, updating. '
-                                    'project_id: %(project_id)s, '
-                                    'user_id: %(user_id)s, '
-                                    'resource: %(res)s, '
-                                    'tracked usage: %(tracked_use)s, '
-                                    'actual usage: %(in_use)s'),
-                            {'project_id': project_id,
-                             'user_id': user_id,
-                             'res': res,
-                             'tracked_use': user_usages[res].in_use,
-                             'in_use': in_use})
-
-                    # Update the usage
-                    user_usages[res].in_use = in_use
-                    user_usages[res].until_refresh = until_refresh or None
-
-                    # Because more than one resource may be refreshed
-                    # by the call to the sync routine, and we don't
-                    # want to double-sync, we make sure all refreshed
-                    # resources are dropped from the work set.
-                    work.discard(res)
-
-                    # NOTE(Vek): We make the assumption that the sync
-                    #            routine actually refreshes the
-                    #            resources that it is the sync routine
-                    #            for.  We don't check, because this is
-                    #            a best-effort mechanism.
+                work -= _quota_usage_refresh(elevated, session, resources,
+                                             resource, project_id, user_id,
+                                             user_usages, until_refresh)
 
         # Check for deltas that would go negative
         unders = [res for res, delta in deltas.items()
@@ -3225,35 +3361,8 @@ def quota_reserve(context, resources, project_quotas, user_quotas, deltas,
         LOG.warning(_("Change will make usage less than 0 for the following "
                       "resources: %s"), unders)
     if overs:
-        if project_quotas == user_quotas:
-            usages = project_usages
-        else:
-            usages = user_usages
-        usages = dict((k, dict(in_use=v['in_use'], reserved=v['reserved']))
-                      for k, v in usages.items())
-        headroom = dict((res, user_quotas[res] -
-                             (usages[res]['in_use'] + usages[res]['reserved']))
-                        for res in user_quotas.keys())
-
-        # If quota_cores is unlimited [-1]:
-        # - set cores headroom based on instances headroom:
-        if user_quotas.get('cores') == -1:
-            if deltas['cores']:
-                hc = headroom['instances'] * deltas['cores']
-                headroom['cores'] = hc / deltas['instances']
-            else:
-                headroom['cores'] = headroom['instances']
-
-        # If quota_ram is unlimited [-1]:
-        # - set ram headroom based on instances headroom:
-        if user_quotas.get('ram') == -1:
-            if deltas['ram']:
-                hr = headroom['instances'] * deltas['ram']
-                headroom['ram'] = hr / deltas['instances']
-            else:
-                headroom['ram'] = headroom['instances']
-        raise exception.OverQuota(overs=sorted(overs), quotas=user_quotas,
-                                  usages=usages, headroom=headroom)
+        raise _over_quota_error(overs, deltas, project_quotas, user_quotas,
+                                project_usages, user_usages)
 
     return reservations
 
@@ -3371,6 +3480,210 @@ def reservation_expire(context):
 ###################
 
 
+# NOTE: The counter based quota functions below never lock the usages of a
+# project.  Reservations are counted with conditional UPDATE statements on
+# single quota_usages rows, and reservations are committed or rolled back
+# by relative UPDATEs, so concurrent reservers in one project do not
+# serialize on row locks.  Usages are only locked, created and synced when
+# one is missing or must be refreshed.
+
+def _quota_usage_is_current(usage, max_age):
+    if usage is None or usage.in_use < 0:
+        return False
+    return not (max_age and timeutils.is_older_than(usage.updated_at,
+                                                    max_age))
+
+
+def _get_counter_quota_usages(elevated, resources, deltas, max_age,
+                              project_id, user_id):
+    """Return the usages of a user the deltas are counted on."""
+    _project_usages, user_usages = _get_project_user_quota_usages(
+            elevated, get_session(), project_id, user_id, lock=False)
+    if all(_quota_usage_is_current(user_usages.get(res), max_age)
+           for res in deltas):
+        return user_usages
+
+    session = get_session()
+    with session.begin():
+        _project_usages, user_usages = _get_project_user_quota_usages(
+                elevated, session, project_id, user_id)
+        work = set(deltas.keys())
+        while work:
+            resource = work.pop()
+            if _quota_usage_is_current(user_usages.get(resource), max_age):
+                continue
+            if resource not in user_usages:
+                usage_user_id = (None if resource in PER_PROJECT_QUOTAS
+                                 else user_id)
+                user_usages[resource] = _quota_usage_create(
+                        elevated, project_id, usage_user_id, resource,
+                        0, 0, None, session=session)
+            work -= _quota_usage_refresh(elevated, session, resources,
+                                         resource, project_id, user_id,
+                                         user_usages, None)
+    return user_usages
+
+
+@_retry_on_deadlock
+def _quota_usage_add_reserved(context, usage_id, delta, limit=-1):
+    """Add delta to the reserved count of a usage, if under limit.
+
+    Returns whether the usage was updated.
+    """
+    query = model_query(context, models.QuotaUsage, read_deleted="no").\
+                    filter_by(id=usage_id)
+    if limit >= 0:
+        query = query.filter(models.QuotaUsage.in_use +
+                             models.QuotaUsage.reserved + delta <= limit)
+    return bool(query.update({'reserved': models.QuotaUsage.reserved + delta},
+                             synchronize_session=False))
+
+
+def _quota_usage_project_total(context, project_id, resource):
+    total = model_query(context,
+                        func.sum(models.QuotaUsage.in_use +
+                                 models.QuotaUsage.reserved),
+                        base_model=models.QuotaUsage, read_deleted="no").\
+                    filter_by(project_id=project_id).\
+                    filter_by(resource=resource).\
+                    scalar()
+    return total or 0
+
+
+@require_context
+def quota_reserve_counter(context, resources, project_quotas, user_quotas,
+                          deltas, expire, max_age, project_id=None,
+                          user_id=None):
+    elevated = context.elevated()
+    if project_id is None:
+        project_id = context.project_id
+    if user_id is None:
+        user_id = context.user_id
+
+    user_usages = _get_counter_quota_usages(elevated, resources, deltas,
+                                            max_age, project_id, user_id)
+
+    # Check for deltas that would go negative
+    unders = [res for res, delta in deltas.items()
+              if delta < 0 and
+              delta + user_usages[res].in_use < 0]
+
+    # NOTE: As in quota_reserve(), only positive increments are checked
+    # and counted as reserved.  The user limit is checked by the UPDATE
+    # itself.  The project limit spans the usages of all the users, so it
+    # is checked once this reservation is counted: of two reservers racing
+    # for the last of the project quota, at least the second one sees both
+    # reservations and backs out.
+    reserved = []
+    overs = []
+    reservations = []
+    try:
+        for res, delta in sorted(deltas.items()):
+            if delta <= 0:
+                continue
+            usage = user_usages[res]
+            if not _quota_usage_add_reserved(elevated, usage.id, delta,
+                                             user_quotas[res]):
+                overs.append(res)
+                continue
+            reserved.append((usage.id, delta))
+            if (user_quotas[res] >= 0 and project_quotas[res] >= 0 and
+                    project_quotas[res] < _quota_usage_project_total(
+                        elevated, project_id, res)):
+                overs.append(res)
+
+        if not overs:
+            session = get_session()
+            with session.begin():
+                for res, delta in deltas.items():
+                    reservation = _reservation_create(elevated,
+                                                      str(uuid.uuid4()),
+                                                      user_usages[res],
+                                                      project_id,
+                                                      user_id,
+                                                      res, delta, expire,
+                                                      session=session)
+                    reservations.append(reservation.uuid)
+    except Exception:
+        with excutils.save_and_reraise_exception():
+            for usage_id, delta in reserved:
+                _quota_usage_add_reserved(elevated, usage_id, -delta)
+
+    if unders:
+        LOG.warning(_("Change will make usage less than 0 for the following "
+                      "resources: %s"), unders)
+    if overs:
+        for usage_id, delta in reserved:
+            _quota_usage_add_reserved(elevated, usage_id, -delta)
+        project_usages, user_usages = _get_project_user_quota_usages(
+                elevated, get_session(), project_id, user_id, lock=False)
+        raise _over_quota_error(overs, deltas, project_quotas, user_quotas,
+                                project_usages, user_usages)
+
+    return reservations
+
+
+@_retry_on_deadlock
+def _reservation_release(context, reservation, commit):
+    """Remove a reservation from the reserved count of its usage.
+
+    The reservation is soft deleted first, so that it is released once
+    even when several callers race to commit, roll back or expire it.
+    """
+    session = get_session()
+    with session.begin():
+        released = model_query(context, models.Reservation,
+                               session=session, read_deleted="no").\
+                           filter_by(id=reservation.id).\
+                           soft_delete(synchronize_session=False)
+        if not released:
+            return
+        updates = {}
+        if reservation.delta >= 0:
+            updates['reserved'] = (models.QuotaUsage.reserved -
+                                   reservation.delta)
+        if commit:
+            updates['in_use'] = models.QuotaUsage.in_use + reservation.delta
+        if updates:
+            model_query(context, models.QuotaUsage, session=session,
+                        read_deleted="no").\
+                    filter_by(id=reservation.usage_id).\
+                    update(updates, synchronize_session=False)
+
+
+@require_context
+def reservation_commit_counter(context, reservations, project_id=None,
+                               user_id=None):
+    reservation_query = model_query(context, models.Reservation,
+                                    read_deleted="no").\
+                        filter(models.Reservation.uuid.in_(reservations))
+    for reservation in reservation_query.all():
+        _reservation_release(context, reservation, commit=True)
+
+
+@require_context
+def reservation_rollback_counter(context, reservations, project_id=None,
+                                 user_id=None):
+    reservation_query = model_query(context, models.Reservation,
+                                    read_deleted="no").\
+                        filter(models.Reservation.uuid.in_(reservations))
+    for reservation in reservation_query.all():
+        _reservation_release(context, reservation, commit=False)
+
+
+@require_admin_context
+def reservation_expire_counter(context):
+    current_time = timeutils.utcnow()
+    reservation_query = model_query(context, models.Reservation,
+                                    read_deleted="no").\
+                        filter(models.Reservation.expire < current_time)
+    for reservation in reservation_query.all():
+        _reservation_release(context, reservation, commit=False)
+
+
+###################
+
+
 def _ec2_volume_get_query(context, session=None):
     return model_query(context, models.VolumeIdMapping,
                        session=session, read_deleted='yes')
@@ -6069,57 +6382,112 @@ def pci_device_update(context, node_id, address, values):
     return device
 
 ################MY Edit######################
+@require_context
 def attribute_create(context, values):
-    #try:
-	traceback.print_stack()
-	print context
-	print values,"asdasdasdasdasdasd"
-        attribute_ref = models.Attribute()
-        attribute_ref.update(values)
-        attribute_ref.save()
-        return attribute_ref
-    #except db_exc.DBDuplicateEntry:
-       # raise exception.KeyPairExists(key_name=values['name'])
-def attribute_list(context):
-    #print context.project_id	
-    traceback.print_stack()
+    return attribute_create_all(context, [values])[0]
+
+
+@require_context
+def attribute_create_all(context, values_list):
+    """Create several attributes in a single transaction."""
+    LOG.debug(_('Creating %d attributes'), len(values_list))
     session = get_session()
-    query = session.query(models.Attribute).all()
-    #for q in query:	
-     # print q.name
-    return query		
-    #return model_query(context, models.Attribute, read_deleted="no").all()
+    refs = []
+    with session.begin():
+        for values in values_list:
+            attribute_ref = models.Attribute()
+            attribute_ref.update(values)
+            try:
+                attribute_ref.save(session=session)
+            except db_exc.DBDuplicateEntry:
+                raise exception.AttributeExists(attribute_name=values['name'])
+            refs.append(attribute_ref)
+    return refs
+
+
+@require_context
+def attribute_get_all_by_project(context, project_id):
+    nova.context.authorize_project_context(context, project_id)
+    return model_query(context, models.Attribute, read_deleted="no").\
+                   filter_by(project_id=project_id).\
+                   all()
+
+
 @require_context
 def attribute_delete(context, id):
-    traceback.print_stack()
-    print ("in sql")
-    #nova.context.authorize_user_context(context, user_id)
-    
-    result = model_query(context, models.Attribute).\
-                         filter_by(id=id).\
-                         delete()
-    if not result:
-        raise exception.AttributeNotFound(id=id)
+    return attribute_delete_all(context, [id])
+
+
+@require_context
+def attribute_delete_all(context, ids):
+    """Delete several attributes and their scopes in a single transaction.
+
+    Returns the ids of the projects of the deleted attributes.
+    """
+    LOG.debug(_('Deleting attributes %s'), ids)
+    session = get_session()
+    with session.begin():
+        query = model_query(context, models.Attribute, session=session,
+                            project_only=True).\
+                            filter(models.Attribute.id.in_(ids))
+        attribute_refs = query.all()
+        if len(attribute_refs) != len(set(ids)):
+            raise exception.AttributeNotFound(name=ids)
+        for attribute_ref in attribute_refs:
+            model_query(context, models.Scope, session=session).\
+                        filter_by(project_id=attribute_ref['project_id']).\
+                        filter_by(name=attribute_ref['name']).\
+                        delete(synchronize_session=False)
+        query.delete(synchronize_session=False)
+    return set(attribute_ref['project_id'] for attribute_ref in attribute_refs)
+
 
 @require_context
 def scope_create(context, values):
-    print values
-    print context
-    print values,"asdasdasdasdasdasd"
-    scope_ref = models.Scope()
-    scope_ref.update(values)
-    try:
-        scope_ref.save()
-    except db_exc.DBDuplicateEntry:
-        raise exception.ScopeExists(key_name=values['value']) 
-    return scope_ref
+    return scope_create_all(context, [values])[0]
+
 
-def scope_list(context):
-    #print context.project_id   
-    #traceback.print_stack()
+@require_context
+def scope_create_all(context, values_list):
+    """Create several scopes in a single transaction."""
+    LOG.debug(_('Creating %d scopes'), len(values_list))
     session = get_session()
-    query = session.query(models.Scope).all()
-    #for q in query:    
-     # print q.name
-    return query
+    refs = []
+    with session.begin():
+        for values in values_list:
+            scope_ref = models.Scope()
+            scope_ref.update(values)
+            try:
+                scope_ref.save(session=session)
+            except db_exc.DBDuplicateEntry:
+                raise exception.ScopeExists(name=values['name'],
+                                            value=values['value'])
+            refs.append(scope_ref)
+    return refs
+
+
+@require_context
+def scope_get_all_by_project(context, project_id):
+    nova.context.authorize_project_context(context, project_id)
+    return model_query(context, models.Scope, read_deleted="no").\
+                   filter_by(project_id=project_id).\
+                   all()
+
 
+@require_context
+def scope_delete_all(context, ids):
+    """Delete several scopes in a single transaction.
+
+    Returns the ids of the projects of the deleted scopes.
+    """
+    LOG.debug(_('Deleting scopes %s'), ids)
+    session = get_session()
+    with session.begin():
+        query = model_query(context, models.Scope, session=session,
+                            project_only=True).\
+                            filter(models.Scope.id.in_(ids))
+        scope_refs = query.all()
+        if len(scope_refs) != len(set(ids)):
+            raise exception.ScopeNotFound(id=ids)
+        query.delete(synchronize_session=False)
+    return set(scope_ref['project_id'] for scope_ref in scope_refs)
@@ -0,0 +1,101 @@
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from migrate.changeset import UniqueConstraint
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Integer
+from sqlalchemy import MetaData
+from sqlalchemy import String
+from sqlalchemy import Table
+
+from nova.db.sqlalchemy import utils
+from nova.openstack.common.gettextutils import _
+from nova.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# Based on attribute_get_all_by_project and scope_get_all_by_project
+# from: nova/db/sqlalchemy/api.py
+UNIQUE_CONSTRAINTS = {
+    'attribute': ('uniq_attribute0project_id0name',
+                  ('project_id', 'name')),
+    'scope': ('uniq_scope0project_id0name0value',
+              ('project_id', 'name', 'value')),
+}
+
+
+def _columns(table_name):
+    columns = [
+        Column('created_at', DateTime),
+        Column('updated_at', DateTime),
+        Column('deleted_at', DateTime),
+        Column('deleted', Integer),
+        Column('id', Integer, primary_key=True, nullable=False),
+        Column('name', String(length=255)),
+    ]
+    if table_name == 'scope':
+        columns.append(Column('value', String(length=255)))
+    columns.append(Column('project_id', String(length=255)))
+    return columns
+
+
+def _get_unique_constraint(table, name):
+    for constraint in table.constraints:
+        if getattr(constraint, 'name', None) == name:
+            return constraint
+    for idx in table.indexes:
+        if idx.name == name:
+            return idx
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for table_name, (uc_name, uc_columns) in UNIQUE_CONSTRAINTS.items():
+        # NOTE: the CVRM tables were originally created out of band, so
+        # only create them here when a deployment does not have them yet.
+        for name in (table_name, 'shadow_' + table_name):
+            if not migrate_engine.has_table(name):
+                Table(name, meta, *_columns(table_name),
+                      mysql_engine='InnoDB',
+                      mysql_charset='utf8').create()
+
+        table = Table(table_name, meta, autoload=True)
+        if _get_unique_constraint(table, uc_name):
+            LOG.info(_('Skipped adding %s because an equivalent index '
+                       'already exists.'), uc_name)
+            continue
+        # NOTE: duplicates were never rejected before, so only the newest
+        # of them is kept.
+        utils.drop_old_duplicate_entries_from_table(migrate_engine,
+                                                    table_name, False,
+                                                    *uc_columns)
+        UniqueConstraint(*uc_columns, table=table, name=uc_name).create()
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    # NOTE: the tables themselves may predate this migration, so only the
+    # unique constraints are removed on downgrade.
+    for table_name, (uc_name, uc_columns) in UNIQUE_CONSTRAINTS.items():
+        table = Table(table_name, meta, autoload=True)
+        if not _get_unique_constraint(table, uc_name):
+            LOG.info(_('Skipped removing %s because index does not '
+                       'exist.'), uc_name)
+            continue
+        UniqueConstraint(*uc_columns, table=table, name=uc_name).drop()
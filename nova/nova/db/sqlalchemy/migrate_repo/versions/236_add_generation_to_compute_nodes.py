@@ -0,0 +1,38 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Column
+from sqlalchemy import Integer
+from sqlalchemy import MetaData
+from sqlalchemy import Table
+
+
+def upgrade(engine):
+    meta = MetaData()
+    meta.bind = engine
+
+    # Version counter bumped on every write of a compute node, used by the
+    # scheduler to claim resources optimistically.
+    for table_name in ('compute_nodes', 'shadow_compute_nodes'):
+        table = Table(table_name, meta, autoload=True)
+        generation = Column('generation', Integer, nullable=False,
+                            default=0, server_default='0')
+        table.create_column(generation)
+
+
+def downgrade(engine):
+    meta = MetaData()
+    meta.bind = engine
+
+    for table_name in ('compute_nodes', 'shadow_compute_nodes'):
+        table = Table(table_name, meta, autoload=True)
+        table.drop_column('generation')
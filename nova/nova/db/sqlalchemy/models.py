@@ -131,6 +131,11 @@ class ComputeNode(BASE, NovaBase):
     # json-encode string containing compute node statistics
     stats = Column(Text, default='{}')
 
+    # Bumped on every write, so that schedulers claiming resources on the
+    # node can tell whether it changed since they last read it.
+    generation = Column(Integer, nullable=False, default=0,
+                        server_default='0')
+
 
 class Certificate(BASE, NovaBase):
     """Represents a x509 certificate."""
@@ -1400,7 +1405,10 @@ class PciDevice(BASE, NovaBase):
 class Attribute(BASE, NovaBase):
     """VM attribute in the system"""
     __tablename__ = 'attribute'
-    __table_args__ = ()
+    __table_args__ = (
+        schema.UniqueConstraint("project_id", "name",
+                                name="uniq_attribute0project_id0name"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String(255))
@@ -1409,7 +1417,10 @@ class Attribute(BASE, NovaBase):
 class Scope(BASE, NovaBase):
     """VM attribute in the system"""
     __tablename__ = 'scope'
-    __table_args__ = ()
+    __table_args__ = (
+        schema.UniqueConstraint("project_id", "name", "value",
+                                name="uniq_scope0project_id0name0value"),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String(255))
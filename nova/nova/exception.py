@@ -790,6 +790,10 @@ class ComputeHostNotFound(HostNotFound):
     msg_fmt = _("Compute host %(host)s could not be found.")
 
 
+class ComputeNodeClaimConflict(NovaException):
+    msg_fmt = _("Compute node %(compute_id)s changed while being claimed.")
+
+
 class HostBinaryNotFound(NotFound):
     msg_fmt = _("Could not find binary %(binary)s on host %(host)s.")
 
@@ -1566,3 +1570,18 @@ class AttributeExists(NovaException):
 class AttributeNotFound(NotFound):
     ec2_code = 'InvalidAttribute.NotFound'
     msg_fmt = _("Attribute %(name)s not found")
+
+
+class ScopeExists(NovaException):
+    ec2_code = 'InvalidScope.Duplicate'
+    msg_fmt = _("Value '%(value)s' already exists for attribute '%(name)s'.")
+
+
+class ScopeNotFound(NotFound):
+    ec2_code = 'InvalidScope.NotFound'
+    msg_fmt = _("Scope %(id)s not found")
+
+
+class AttachConstraintViolation(NotAuthorized):
+    msg_fmt = _("Volume %(volume_id)s may not be attached to instance "
+                "%(instance_uuid)s: attribute constraints are not satisfied.")
@@ -17,6 +17,8 @@
 Filter support
 """
 
+import time
+
 from nova import loadables
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
@@ -58,12 +60,93 @@ class BaseFilter(object):
             return True
 
 
+class FilterStats(object):
+    """Running totals of the work done by one filter class."""
+
+    def __init__(self):
+        self.runs = 0
+        self.objects_in = 0
+        self.objects_out = 0
+        self.seconds = 0.0
+
+    def record(self, objects_in, objects_out, seconds):
+        self.runs += 1
+        self.objects_in += objects_in
+        self.objects_out += objects_out
+        self.seconds += seconds
+
+    @property
+    def pass_ratio(self):
+        if not self.objects_in:
+            return 1.0
+        return float(self.objects_out) / self.objects_in
+
+    @property
+    def cost(self):
+        """Average seconds spent on one object."""
+        if not self.objects_in:
+            return 0.0
+        return self.seconds / self.objects_in
+
+    def rank(self):
+        """Lower ranks go first: the cost of the filter per object it
+        rejects.  Filters that never reject anything go last.
+        """
+        rejected = 1.0 - self.pass_ratio
+        if rejected <= 0:
+            return float('inf')
+        return self.cost / rejected
+
+    def to_dict(self):
+        return {'runs': self.runs,
+                'objects_in': self.objects_in,
+                'objects_out': self.objects_out,
+                'seconds': self.seconds,
+                'pass_ratio': self.pass_ratio,
+                'cost': self.cost}
+
+
 class BaseFilterHandler(loadables.BaseLoader):
     """Base class to handle loading filter classes.
 
     This class should be subclassed where one needs to use filters.
     """
 
+    def __init__(self, *args, **kwargs):
+        super(BaseFilterHandler, self).__init__(*args, **kwargs)
+        # filter class name -> FilterStats
+        self.filter_stats = {}
+
+    def get_filter_stats(self):
+        """Return the statistics of every filter run by this handler."""
+        return dict((name, stats.to_dict())
+                    for name, stats in self.filter_stats.iteritems())
+
+    def reset_filter_stats(self):
+        self.filter_stats = {}
+
+    def order_by_cost(self, filter_classes, min_runs=10):
+        """Return filter_classes with the cheapest and most selective
+        filters first.
+
+        Filters are independent of each other, so their order does not
+        change the result, only the number of objects each one has to look
+        at.  The given order is kept until every filter ran min_runs times.
+        """
+        ranked = []
+        for position, filter_cls in enumerate(filter_classes):
+            stats = self.filter_stats.get(filter_cls.__name__)
+            if stats is None or stats.runs < min_runs:
+                return filter_classes
+            ranked.append((stats.rank(), position, filter_cls))
+        return [filter_cls for rank, position, filter_cls in sorted(ranked)]
+
+    def _record_stats(self, cls_name, objects_in, objects_out, seconds):
+        stats = self.filter_stats.get(cls_name)
+        if stats is None:
+            stats = self.filter_stats[cls_name] = FilterStats()
+        stats.record(objects_in, objects_out, seconds)
+
     def get_filtered_objects(self, filter_classes, objs,
             filter_properties, index=0):
         list_objs = list(objs)
@@ -73,13 +156,18 @@ class BaseFilterHandler(loadables.BaseLoader):
             filter = filter_cls()
 
             if filter.run_filter_for_index(index):
+                start = time.time()
                 objs = filter.filter_all(list_objs,
                                                filter_properties)
                 if objs is None:
                     LOG.debug(_("Filter %(cls_name)s says to stop filtering"),
                           {'cls_name': cls_name})
                     return
+                objects_in = len(list_objs)
+                # filter_all() may be a generator, so it only runs here
                 list_objs = list(objs)
+                self._record_stats(cls_name, objects_in, len(list_objs),
+                                   time.time() - start)
                 if not list_objs:
                     LOG.info(_("Filter %s returned 0 hosts"), cls_name)
                     break
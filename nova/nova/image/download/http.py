@@ -0,0 +1,57 @@
+# Copyright 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import urllib2
+
+import nova.image.download.base as xfer_base
+from nova.openstack.common.gettextutils import _
+
+
+LOG = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Seconds to wait for the remote end before giving up on it.
+TIMEOUT = 30
+
+
+class HTTPTransfer(xfer_base.TransferBase):
+    """Streams an image from a plain HTTP(S) server, such as one serving
+    the image cache of another compute host.
+    """
+
+    def download(self, context, url_parts, dst_file, metadata, **kwargs):
+        url = url_parts.geturl()
+        response = urllib2.urlopen(url, timeout=TIMEOUT)
+        try:
+            with open(dst_file, 'wb') as f:
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+        finally:
+            response.close()
+        LOG.info(_('Copied %(url)s using %(module_str)s') %
+                 {'url': url, 'module_str': str(self)})
+
+
+def get_download_handler(**kwargs):
+    return HTTPTransfer()
+
+
+def get_schemes():
+    return ['http', 'https']
@@ -18,6 +18,7 @@
 from __future__ import absolute_import
 
 import copy
+import hashlib
 import itertools
 import json
 import random
@@ -32,6 +33,7 @@ import six.moves.urllib.parse as urlparse
 
 from nova import exception
 import nova.image.download as image_xfers
+from nova.openstack.common import fileutils
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
@@ -67,6 +69,15 @@ glance_opts = [
                 help='A list of url scheme that can be downloaded directly '
                      'via the direct_url.  Currently supported schemes: '
                      '[file].'),
+    cfg.ListOpt('image_peer_urls',
+                default=[],
+                help='A list of URLs of the image caches of other compute '
+                     'hosts, e.g. http://compute2:8080/_base.  An image is '
+                     'looked for as <url>/<sha1 of the image id> in each of '
+                     'them before it is downloaded from glance, and a copy '
+                     'is only used if it matches the checksum of the image '
+                     'in glance.  Currently supported schemes: '
+                     '[file, http, https].'),
     ]
 
 LOG = logging.getLogger(__name__)
@@ -236,18 +247,27 @@ class GlanceImageService(object):
         # space when this python module is loaded because the download module
         # may require configuration options to be parsed.
         self._download_handlers = {}
+        self._peer_handlers = {}
         download_modules = image_xfers.load_transfer_modules()
+        peer_schemes = set(urlparse.urlparse(url).scheme
+                           for url in CONF.image_peer_urls)
 
         for scheme, mod in download_modules.iteritems():
-            if scheme not in CONF.allowed_direct_url_schemes:
+            if (scheme not in CONF.allowed_direct_url_schemes and
+                    scheme not in peer_schemes):
                 continue
 
             try:
-                self._download_handlers[scheme] = mod.get_download_handler()
+                handler = mod.get_download_handler()
             except Exception as ex:
                 fmt = _('When loading the module %(module_str)s the '
                          'following error occurred: %(ex)s')
                 LOG.error(fmt % {'module_str': str(mod), 'ex': ex})
+                continue
+            if scheme in CONF.allowed_direct_url_schemes:
+                self._download_handlers[scheme] = handler
+            if scheme in peer_schemes:
+                self._peer_handlers[scheme] = handler
 
     def detail(self, context, **kwargs):
         """Calls out to Glance for a list of detailed image information."""
@@ -306,8 +326,54 @@ class GlanceImageService(object):
                 "for %(scheme)s") % {'scheme': scheme})
         return
 
+    def _download_from_peers(self, context, image_id, dst_path):
+        """Copies an image from the image cache of another compute host.
+
+        Returns True if one of the image_peer_urls had a copy of the image
+        matching its checksum in glance, False otherwise.
+        """
+        # nova.virt.images imports this module, so its option can only be
+        # imported once both are loaded.
+        CONF.import_opt('force_raw_images', 'nova.virt.images')
+        image_meta = self.show(context, image_id)
+        checksum = image_meta.get('checksum')
+        if not checksum:
+            return False
+        # The peers cache images converted to raw, which never match the
+        # checksum of images in other formats:
+        if image_meta.get('disk_format') != 'raw' and CONF.force_raw_images:
+            return False
+
+        cache_name = hashlib.sha1(str(image_id)).hexdigest()
+        for peer_url in CONF.image_peer_urls:
+            o = urlparse.urlparse('%s/%s' % (peer_url.rstrip('/'),
+                                             cache_name))
+            xfer_mod = self._peer_handlers.get(o.scheme)
+            if not xfer_mod:
+                continue
+            try:
+                xfer_mod.download(context, o, dst_path, {})
+            except Exception as ex:
+                LOG.debug(_("Image %(image_id)s not copied from %(peer)s: "
+                            "%(ex)s"),
+                          {'image_id': image_id, 'peer': peer_url, 'ex': ex})
+                continue
+            if _file_md5(dst_path) == checksum:
+                LOG.info(_("Copied image %(image_id)s from %(peer)s"),
+                         {'image_id': image_id, 'peer': peer_url})
+                return True
+            LOG.warn(_("The copy of image %(image_id)s from %(peer)s does "
+                       "not match its checksum"),
+                     {'image_id': image_id, 'peer': peer_url})
+            fileutils.delete_if_exists(dst_path)
+        return False
+
     def download(self, context, image_id, data=None, dst_path=None):
         """Calls out to Glance for data and writes data."""
+        if (CONF.image_peer_urls and dst_path is not None and
+                self._download_from_peers(context, image_id, dst_path)):
+            return
+
         if CONF.allowed_direct_url_schemes and dst_path is not None:
             locations = self._get_locations(context, image_id)
             for entry in locations:
@@ -452,6 +518,15 @@ def _is_image_available(context, image):
     return str(user_id) == str(context.user_id)
 
 
+def _file_md5(path):
+    """Returns the md5 hex digest of a file, as glance checksums images."""
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), ''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
 def _translate_to_glance(image_meta):
     image_meta = _convert_to_string(image_meta)
     image_meta = _remove_read_only(image_meta)
@@ -0,0 +1,114 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cache of the metadata documents of instances.
+
+The metadata API builds the metadata document of an instance on the first
+request for it and caches it for the following ones.  With memcached_servers
+set, the cache is shared by all the API workers, and the services updating
+instances drop the documents of the instances whose DOCUMENT_FIELDS they
+update.
+"""
+
+from oslo.config import cfg
+
+from nova.openstack.common.gettextutils import _
+from nova.openstack.common import log as logging
+from nova.openstack.common import memorycache
+
+metadata_cache_opts = [
+    cfg.IntOpt('metadata_cache_expiration',
+               default=15,
+               help='Seconds the metadata document of an instance is '
+                    'cached for.  Documents are also dropped on updates of '
+                    'their instance, so this can be raised when '
+                    'memcached_servers is set.  0 disables the cache'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(metadata_cache_opts)
+
+LOG = logging.getLogger(__name__)
+
+# Seconds the instance found at an address is cached for.
+ADDRESS_EXPIRATION = 15
+
+# Fields of an instance its metadata document is built from.
+DOCUMENT_FIELDS = frozenset(['display_name', 'hostname', 'host',
+                             'image_ref', 'kernel_id', 'ramdisk_id',
+                             'root_device_name', 'key_name', 'key_data',
+                             'user_data', 'launch_index', 'reservation_id',
+                             'instance_type_id', 'metadata',
+                             'system_metadata', 'security_groups',
+                             'info_cache'])
+
+_CLIENT = None
+
+
+def _get_client():
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = memorycache.get_client()
+    return _CLIENT
+
+
+def _document_key(instance_uuid):
+    return 'metadata-%s' % instance_uuid
+
+
+def _address_key(address):
+    return 'metadata-address-%s' % address
+
+
+def get_document(instance_uuid):
+    if CONF.metadata_cache_expiration <= 0:
+        return None
+    return _get_client().get(_document_key(instance_uuid))
+
+
+def set_document(instance_uuid, document):
+    if CONF.metadata_cache_expiration <= 0:
+        return
+    _get_client().set(_document_key(instance_uuid), document,
+                      CONF.metadata_cache_expiration)
+
+
+def get_instance_uuid(address):
+    if CONF.metadata_cache_expiration <= 0:
+        return None
+    return _get_client().get(_address_key(address))
+
+
+def set_instance_uuid(address, instance_uuid):
+    if CONF.metadata_cache_expiration <= 0:
+        return
+    _get_client().set(_address_key(address), instance_uuid,
+                      min(ADDRESS_EXPIRATION, CONF.metadata_cache_expiration))
+
+
+def invalidate(instance_uuid):
+    """Drop the cached metadata document of an instance."""
+    if CONF.metadata_cache_expiration <= 0:
+        return
+    try:
+        _get_client().delete(_document_key(instance_uuid))
+    except Exception:
+        LOG.exception(_('Failed to drop the cached metadata of instance %s'),
+                      instance_uuid)
+
+
+def instance_updated(instance_uuid, fields):
+    """Drop the cached metadata document of an instance if any of the
+    updated fields is one it is built from.
+    """
+    if DOCUMENT_FIELDS.intersection(fields):
+        invalidate(instance_uuid)
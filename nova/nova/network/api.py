@@ -428,6 +428,23 @@ class API(base.Base):
                                            result, update_cells=False)
         return result
 
+    def get_instance_nw_info_bulk(self, context, instances, use_slave=False):
+        """Returns the network info of many instances, by instance uuid,
+        and updates their info caches.
+
+        Instances whose network info could not be refreshed are logged and
+        left out of the result.
+        """
+        result = {}
+        for instance in instances:
+            try:
+                result[instance['uuid']] = self.get_instance_nw_info(
+                    context, instance)
+            except Exception:
+                LOG.exception(_('Failed to refresh the network info of '
+                                'instance'), instance=instance)
+        return result
+
     def _get_instance_nw_info(self, context, instance):
         """Returns all network info related to an instance."""
         flavor = flavors.extract_flavor(instance)
@@ -91,6 +91,87 @@ def _update_token(new_token):
         token_store.admin_auth_token = new_token
 
 
+class ClientPool(object):
+    """Neutron clients of this process that are not in use, by the token
+    they authenticate with.
+
+    A client keeps its HTTP connections open and its token between
+    requests, so that reusing one saves setting up both again.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self.clients = {}
+        self.count = 0
+
+    @classmethod
+    def get(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _remove(self, key, index=-1):
+        clients = self.clients[key]
+        client = clients.pop(index)
+        if not clients:
+            del self.clients[key]
+        self.count -= 1
+        return client
+
+    def checkout(self, key, create):
+        """Return an unused client for the token, creating it if none."""
+        with lockutils.lock('neutron_client_pool_lock'):
+            if key in self.clients:
+                return self._remove(key)
+        return create()
+
+    def checkin(self, key, client):
+        """Keep a client that is no longer in use for reuse."""
+        with lockutils.lock('neutron_client_pool_lock'):
+            if self.count >= CONF.neutron_client_pool_size:
+                # Make room by dropping the oldest client of some token.
+                self._remove(next(iter(self.clients)), index=0)
+            self.clients.setdefault(key, []).append(client)
+            self.count += 1
+
+
+class PooledClient(object):
+    """A neutron client whose requests each run on a client checked out of
+    the ClientPool, so that no two requests share a connection at once.
+    """
+
+    def __init__(self, key, create):
+        self.key = key
+        self.create = create
+
+    def __getattr__(self, name):
+        pool = ClientPool.get()
+        client = pool.checkout(self.key, self.create)
+        try:
+            obj = getattr(client, name)
+        except Exception:
+            pool.checkin(self.key, client)
+            raise
+        if not callable(obj):
+            pool.checkin(self.key, client)
+            return obj
+
+        def wrapper(*args, **kwargs):
+            try:
+                return obj(*args, **kwargs)
+            finally:
+                pool.checkin(self.key, client)
+        return wrapper
+
+
+def _get_admin_client():
+    with lockutils.lock('neutron_admin_auth_token_lock'):
+        orig_token = AdminTokenStore.get().admin_auth_token
+    client = _get_client(orig_token, admin=True)
+    return ClientWrapper(client)
+
+
 def get_client(context, admin=False):
     # NOTE(dprince): In the case where no auth_token is present
     # we allow use of neutron admin tenant credentials if
@@ -98,14 +179,16 @@ def get_client(context, admin=False):
     # This is to support some services (metadata API) where
     # an admin context is used without an auth token.
     if admin or (context.is_admin and not context.auth_token):
-        with lockutils.lock('neutron_admin_auth_token_lock'):
-            orig_token = AdminTokenStore.get().admin_auth_token
-        client = _get_client(orig_token, admin=True)
-        return ClientWrapper(client)
+        if CONF.neutron_client_pool_size:
+            return PooledClient(('admin', None), _get_admin_client)
+        return _get_admin_client()
 
     # We got a user token that we can use that as-is
     if context.auth_token:
         token = context.auth_token
+        if CONF.neutron_client_pool_size:
+            return PooledClient(
+                ('user', token), lambda: _get_client(token=token))
         return _get_client(token=token)
 
     # We did not get a user token and we should not be using
@@ -80,6 +80,12 @@ neutron_opts = [
     cfg.StrOpt('neutron_ca_certificates_file',
                 help='Location of CA certificates file to use for '
                      'neutron client requests.'),
+    cfg.IntOpt('neutron_client_pool_size',
+                default=0,
+                help='Number of neutron clients each process keeps open '
+                     'for reuse, so that requests reuse their HTTP '
+                     'connections and tokens. 0 creates a new client for '
+                     'every use'),
    ]
 
 CONF = cfg.CONF
@@ -486,14 +492,49 @@ class API(base.Base):
                                        update_cells=False)
         return result
 
+    def get_instance_nw_info_bulk(self, context, instances, use_slave=False):
+        """Return network information for many instances, by instance uuid,
+           and update their caches.
+
+           The ports of all the instances are listed in one request.
+           Instances whose network information could not be built are
+           logged and left out of the result.
+        """
+        client = neutronv2.get_client(context, admin=True)
+        data = client.list_ports(
+            device_id=[instance['uuid'] for instance in instances])
+        ports_by_device = {}
+        for port in data.get('ports', []):
+            ports_by_device.setdefault(port['device_id'], []).append(port)
+
+        result = {}
+        for instance in instances:
+            neutron_ports = [port for port in
+                             ports_by_device.get(instance['uuid'], [])
+                             if port['tenant_id'] == instance['project_id']]
+            try:
+                with lockutils.lock('refresh_cache-%s' % instance['uuid']):
+                    nw_info = self._get_instance_nw_info(
+                        context, instance, neutron_ports=neutron_ports)
+                    update_instance_info_cache(self, context,
+                                               instance,
+                                               nw_info=nw_info,
+                                               update_cells=False)
+            except Exception:
+                LOG.exception(_('Failed to refresh the network info of '
+                                'instance'), instance=instance)
+                continue
+            result[instance['uuid']] = nw_info
+        return result
+
     def _get_instance_nw_info(self, context, instance, networks=None,
-                              port_ids=None):
+                              port_ids=None, neutron_ports=None):
         # NOTE(danms): This is an inner method intended to be called
         # by other code that updates instance nwinfo. It *must* be
         # called with the refresh_cache-%(instance_uuid) lock held!
         LOG.debug(_('get_instance_nw_info() for %s'), instance['display_name'])
         nw_info = self._build_network_info_model(context, instance, networks,
-                                                 port_ids)
+                                                 port_ids, neutron_ports)
         return network_model.NetworkInfo.hydrate(nw_info)
 
     def _gather_port_ids_and_networks(self, context, instance, networks=None,
@@ -955,21 +996,27 @@ class API(base.Base):
             raise exception.FloatingIpMultipleFoundForAddress(address=address)
         return fips[0]
 
-    def _get_floating_ips_by_fixed_and_port(self, client, fixed_ip, port):
-        """Get floatingips from fixed ip and port."""
+    def _get_floating_ips_by_ports(self, client, port_ids):
+        """Get the floatingips of many ports, keyed by port id and fixed ip
+        address.
+        """
+        if not port_ids:
+            return {}
         try:
-            data = client.list_floatingips(fixed_ip_address=fixed_ip,
-                                           port_id=port)
+            data = client.list_floatingips(port_id=port_ids)
         # If a neutron plugin does not implement the L3 API a 404 from
         # list_floatingips will be raised.
         except neutronv2.exceptions.NeutronClientException as e:
             if e.status_code == 404:
-                return []
+                return {}
             with excutils.save_and_reraise_exception():
-                LOG.exception(_('Unable to access floating IP %(fixed_ip)s '
-                                'for port %(port_id)s'),
-                              {'fixed_ip': fixed_ip, 'port_id': port})
-        return data['floatingips']
+                LOG.exception(_('Unable to access floating IPs for ports '
+                                '%s'), port_ids)
+        floating_ips = {}
+        for fip in data['floatingips']:
+            key = (fip['port_id'], fip['fixed_ip_address'])
+            floating_ips.setdefault(key, []).append(fip)
+        return floating_ips
 
     def release_floating_ip(self, context, address,
                             affect_auto_assigned=False):
@@ -1047,12 +1094,12 @@ class API(base.Base):
         """Force add a network to the project."""
         raise NotImplementedError()
 
-    def _nw_info_get_ips(self, client, port):
+    def _nw_info_get_ips(self, port, floating_ips):
         network_IPs = []
         for fixed_ip in port['fixed_ips']:
             fixed = network_model.FixedIP(address=fixed_ip['ip_address'])
-            floats = self._get_floating_ips_by_fixed_and_port(
-                client, fixed_ip['ip_address'], port['id'])
+            floats = floating_ips.get((port['id'], fixed_ip['ip_address']),
+                                      [])
             for ip in floats:
                 fip = network_model.IP(address=ip['floating_ip_address'],
                                        type='floating')
@@ -1060,8 +1107,8 @@ class API(base.Base):
             network_IPs.append(fixed)
         return network_IPs
 
-    def _nw_info_get_subnets(self, context, port, network_IPs):
-        subnets = self._get_subnets_from_port(context, port)
+    def _nw_info_get_subnets(self, port, network_IPs, ipam_subnets):
+        subnets = self._get_subnets_from_port(port, ipam_subnets)
         for subnet in subnets:
             subnet['ips'] = [fixed_ip for fixed_ip in network_IPs
                              if fixed_ip.is_in_subnet(subnet)]
@@ -1117,7 +1164,7 @@ class API(base.Base):
         return network, ovs_interfaceid
 
     def _build_network_info_model(self, context, instance, networks=None,
-                                  port_ids=None):
+                                  port_ids=None, neutron_ports=None):
         """Return list of ordered VIFs attached to instance.
 
         :param context - request context.
@@ -1129,14 +1176,19 @@ class API(base.Base):
                           instance in order of attachment. If value is None
                           this value will be populated from the existing
                           cached value.
+        :param neutron_ports - List of the instance's ports, as already
+                               listed from neutron. If value is None the
+                               ports are listed here.
         """
 
-        search_opts = {'tenant_id': instance['project_id'],
-                       'device_id': instance['uuid'], }
         client = neutronv2.get_client(context, admin=True)
-        data = client.list_ports(**search_opts)
+        if neutron_ports is None:
+            search_opts = {'tenant_id': instance['project_id'],
+                           'device_id': instance['uuid'], }
+            data = client.list_ports(**search_opts)
+            neutron_ports = data.get('ports', [])
 
-        current_neutron_ports = data.get('ports', [])
+        current_neutron_ports = neutron_ports
         networks, port_ids = self._gather_port_ids_and_networks(
                 context, instance, networks, port_ids)
         nw_info = network_model.NetworkInfo()
@@ -1146,6 +1198,14 @@ class API(base.Base):
             current_neutron_port_map[current_neutron_port['id']] = (
                 current_neutron_port)
 
+        # Look up the floating IPs and subnets of all the ports at once
+        # rather than port by port:
+        ports = [current_neutron_port_map[port_id] for port_id in port_ids
+                 if port_id in current_neutron_port_map]
+        floating_ips = self._get_floating_ips_by_ports(
+            client, [port['id'] for port in ports if port['fixed_ips']])
+        ipam_subnets = self._get_ipam_subnets(context, ports)
+
         for port_id in port_ids:
             current_neutron_port = current_neutron_port_map.get(port_id)
             if current_neutron_port:
@@ -1154,11 +1214,11 @@ class API(base.Base):
                     or current_neutron_port['status'] == 'ACTIVE'):
                     vif_active = True
 
-                network_IPs = self._nw_info_get_ips(client,
-                                                    current_neutron_port)
-                subnets = self._nw_info_get_subnets(context,
-                                                    current_neutron_port,
-                                                    network_IPs)
+                network_IPs = self._nw_info_get_ips(current_neutron_port,
+                                                    floating_ips)
+                subnets = self._nw_info_get_subnets(current_neutron_port,
+                                                    network_IPs,
+                                                    ipam_subnets)
 
                 devname = "tap" + current_neutron_port['id']
                 devname = devname[:network_model.NIC_NAME_LEN]
@@ -1179,39 +1239,54 @@ class API(base.Base):
 
         return nw_info
 
-    def _get_subnets_from_port(self, context, port):
-        """Return the subnets for a given port."""
-
-        fixed_ips = port['fixed_ips']
-        # No fixed_ips for the port means there is no subnet associated
-        # with the network the port is created on.
+    def _get_ipam_subnets(self, context, ports):
+        """Return the subnets of the given ports, as listed from neutron,
+        with the address of their DHCP server if any.
+        """
+        subnet_ids = set(ip['subnet_id'] for port in ports
+                         for ip in port['fixed_ips'])
+        # No fixed_ips for the ports means there is no subnet associated
+        # with the networks the ports are created on.
         # Since list_subnets(id=[]) returns all subnets visible for the
-        # current tenant, returned subnets may contain subnets which is not
-        # related to the port. To avoid this, the method returns here.
-        if not fixed_ips:
+        # current tenant, returned subnets may contain subnets which are not
+        # related to the ports. To avoid this, the method returns here.
+        if not subnet_ids:
             return []
-        search_opts = {'id': [ip['subnet_id'] for ip in fixed_ips]}
-        data = neutronv2.get_client(context).list_subnets(**search_opts)
+        client = neutronv2.get_client(context)
+        data = client.list_subnets(id=list(subnet_ids))
         ipam_subnets = data.get('subnets', [])
+        if not ipam_subnets:
+            return []
+
+        # attempt to populate DHCP server field
+        network_ids = set(subnet['network_id'] for subnet in ipam_subnets)
+        data = client.list_ports(network_id=list(network_ids),
+                                 device_owner='network:dhcp')
+        dhcp_servers = {}
+        for p in data.get('ports', []):
+            for ip_pair in p['fixed_ips']:
+                dhcp_servers[ip_pair['subnet_id']] = ip_pair['ip_address']
+        for subnet in ipam_subnets:
+            if subnet['id'] in dhcp_servers:
+                subnet['dhcp_server'] = dhcp_servers[subnet['id']]
+        return ipam_subnets
+
+    def _get_subnets_from_port(self, port, ipam_subnets):
+        """Return the subnets for a given port."""
+
+        subnet_ids = set(ip['subnet_id'] for ip in port['fixed_ips'])
         subnets = []
 
         for subnet in ipam_subnets:
+            if subnet['id'] not in subnet_ids:
+                continue
             subnet_dict = {'cidr': subnet['cidr'],
                            'gateway': network_model.IP(
                                 address=subnet['gateway_ip'],
                                 type='gateway'),
             }
-
-            # attempt to populate DHCP server field
-            search_opts = {'network_id': subnet['network_id'],
-                           'device_owner': 'network:dhcp'}
-            data = neutronv2.get_client(context).list_ports(**search_opts)
-            dhcp_ports = data.get('ports', [])
-            for p in dhcp_ports:
-                for ip_pair in p['fixed_ips']:
-                    if ip_pair['subnet_id'] == subnet['id']:
-                        subnet_dict['dhcp_server'] = ip_pair['ip_address']
-                        break
+            if 'dhcp_server' in subnet:
+                subnet_dict['dhcp_server'] = subnet['dhcp_server']
 
             subnet_object = network_model.Subnet(**subnet_dict)
             for dns in subnet.get('dns_nameservers', []):
@@ -11,11 +11,92 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
-import traceback
 from nova import db
 from nova import exception
 from nova.objects import base
 from nova.objects import fields
+from nova.openstack.common import memorycache
+from nova.openstack.common import strutils
+
+# NOTE: attributes and scopes are read on every CVRM API call and constraint
+#       check but only change through the os-attributes/os-scopes APIs, which
+#       invalidate the project's entries below.  The timeout only bounds how
+#       long another API worker without a shared memcache can serve a stale
+#       copy.
+CVRM_CACHE_SECONDS = 5 * 60
+MC = None
+_INVALIDATION_HOOKS = []
+
+
+def _get_cache():
+    global MC
+
+    if MC is None:
+        MC = memorycache.get_client()
+
+    return MC
+
+
+def reset_cache():
+    """Reset the cache, mainly for testing purposes."""
+
+    global MC
+
+    MC = None
+
+
+def _make_cache_key(kind, project_id):
+    # Admin contexts may have no project_id.
+    if project_id is not None:
+        project_id = strutils.safe_encode(project_id)
+    return "cvrmcache-%s-%s" % (kind, project_id)
+
+
+def register_invalidation_hook(hook):
+    """Register a callable run with a project_id when its CVRM data changes.
+
+    This lets consumers that derive state from attributes and scopes, such
+    as the compiled constraint engine, rebuild it on change.
+    """
+    _INVALIDATION_HOOKS.append(hook)
+
+
+def invalidate_cache(project_id):
+    """Drop the cached attributes and scopes of a project."""
+    cache = _get_cache()
+    for kind in ('attribute', 'scope'):
+        cache.delete(_make_cache_key(kind, project_id))
+    for hook in _INVALIDATION_HOOKS:
+        hook(project_id)
+
+
+def get_cached(context, kind, project_id, loader):
+    """Return a project's cached CVRM table, loading it on a miss.
+
+    :param kind: 'attribute' or 'scope'
+    :param loader: callable taking (context, project_id) and returning the
+                   value to cache; must be picklable for memcache
+    """
+    cache = _get_cache()
+    cache_key = _make_cache_key(kind, project_id)
+    value = cache.get(cache_key)
+    if value is None:
+        value = loader(context, project_id)
+        cache.set(cache_key, value, CVRM_CACHE_SECONDS)
+    return value
+
+
+def _load_attributes(context, project_id):
+    db_attributes = db.attribute_get_all_by_project(context, project_id)
+    return dict((db_attribute['name'],
+                 dict((key, db_attribute[key]) for key in Attribute.fields))
+                for db_attribute in db_attributes)
+
+
+def get_project_attributes(context, project_id):
+    """Return a dict of attribute name to attribute row for a project."""
+    return get_cached(context, 'attribute', project_id, _load_attributes)
+
 
 class Attribute(base.NovaPersistentObject, base.NovaObject):
 #class KeyPair(base.NovaPersistentObject, base.NovaObject):
@@ -31,36 +112,51 @@ class Attribute(base.NovaPersistentObject, base.NovaObject):
     #    'fingerprint': fields.StringField(nullable=True),
      #   'public_key': fields.StringField(nullable=True),
         }
-    def delete(self, context,id):
-	#traceback.print_stack()
-	print ("in delete ",id)
-	db.attribute_delete(context, id) 
+
+    def delete(self, context, id):
+        self.delete_all(context, [id])
+
+    @classmethod
+    def delete_all(cls, context, ids):
+        # NOTE: an admin may delete the attributes of another project, so
+        #       invalidate the projects the attributes belonged to.
+        for project_id in db.attribute_delete_all(context, ids):
+            invalidate_cache(project_id)
+
     def create(self, context):
         if self.obj_attr_is_set('id'):
            raise exception.ObjectActionError(action='create',
                                               reason='already created')
         updates = self.obj_get_changes()
-	print context
         updates.pop('id', None)
         db_attribute = db.attribute_create(context, updates)
-	print "in create/nova/object/attribute"
-	return db_attribute
-        #self._from_db_object(context, self, db_attribute)
+        invalidate_cache(db_attribute['project_id'])
+        return db_attribute
+
+    @classmethod
+    def create_all(cls, context, project_id, names):
+        """Create attributes for a project in a single transaction."""
+        db_attributes = db.attribute_create_all(
+            context, [{'name': name, 'project_id': project_id}
+                      for name in names])
+        invalidate_cache(project_id)
+        return [cls._from_db_object(context, cls(), db_attribute)
+                for db_attribute in db_attributes]
 
     def list(self, context):
-        #if self.obj_attr_is_set('id'):
-         #  raise exception.ObjectActionError(action='create',
-                                              #reason='already created')
-        #updates = self.obj_get_changes()
-        #updates.pop('id', None)
-        #db_attribute = db.attribute_create(context, updates)
-        #print "in create/nova/object/attribute"
-        return db.attribute_list(context)    
-    
+        attributes = get_project_attributes(context, context.project_id)
+        return [self._from_db_object(context, Attribute(), attributes[name])
+                for name in sorted(attributes,
+                                   key=lambda n: attributes[n]['id'])]
+
+    @classmethod
+    def exists(cls, context, project_id, name):
+        return name in get_project_attributes(context, project_id)
+
     @staticmethod
     def _from_db_object(context, attribute, db_attribute):
-        for id in attribute.id:
-            attribute[id] = db_attribute[id]
+        for key in attribute.fields:
+            attribute[key] = db_attribute[key]
         attribute._context = context
         attribute.obj_reset_changes()
         return attribute
@@ -42,6 +42,122 @@ def get_attrname(name):
     return '_%s' % name
 
 
+# Shared by all the objects without changes, so that those don't each carry
+# an empty set.
+_NO_CHANGES = frozenset()
+
+
+class _LazyObjectPrimitive(object):
+    """Primitive of a child object that has not been hydrated yet.
+
+    Child objects received over RPC are only built the first time their
+    attribute is read, and are sent on unchanged when never read.
+    """
+    __slots__ = ('primitive',)
+
+    def __init__(self, primitive):
+        self.primitive = primitive
+
+    def to_primitive(self):
+        # NOTE: obj_make_compatible() works on the primitive in place, so
+        # never hand out the one this object was built from.
+        primitive = dict(self.primitive)
+        primitive['nova_object.data'] = dict(
+            self.primitive['nova_object.data'])
+        return primitive
+
+    def has_changes(self):
+        return bool(self.primitive.get('nova_object.changes'))
+
+    def __getstate__(self):
+        return self.primitive
+
+    def __setstate__(self, state):
+        self.primitive = state
+
+
+def _field_slots(bases, dict_):
+    """Return the __slots__ of a NovaObject class being created.
+
+    Each field is stored in a slot named after get_attrname(), unless a
+    base class already has a slot for it.  Slots declared by the class
+    itself are kept.
+    """
+    slots = list(dict_.get('__slots__', ()))
+    slotted = set(slots)
+    field_names = set(dict_.get('fields', {}))
+    for base in bases:
+        for cls in base.__mro__:
+            slotted.update(cls.__dict__.get('__slots__', ()))
+            field_names.update(cls.__dict__.get('fields', {}))
+    for name in sorted(field_names):
+        attrname = get_attrname(name)
+        if attrname not in slotted and attrname not in dict_:
+            slots.append(attrname)
+    return tuple(slots)
+
+
+class _ObjectCodec(object):
+    """Converts the field values of one object class to and from primitives.
+
+    Built once per class, so that (de)serializing an object does not have
+    to look up how to convert each of its fields, and values are read and
+    written straight from their slots.
+    """
+
+    def __init__(self, cls):
+        self.to_primitive_fields = []
+        self.from_primitive_fields = {}
+        for name, field in sorted(cls.fields.items()):
+            attrname = get_attrname(name)
+            self.to_primitive_fields.append(
+                (name, attrname, field.get_to_primitive()))
+            self.from_primitive_fields[name] = (
+                attrname, field, isinstance(field, fields.ObjectField),
+                field.has_from_primitive())
+
+    def to_primitive(self, obj):
+        """Return the primitive form of the fields set on obj."""
+        primitive = {}
+        for name, attrname, convert in self.to_primitive_fields:
+            try:
+                value = getattr(obj, attrname)
+            except AttributeError:
+                continue
+            if value is None or convert is None:
+                primitive[name] = value
+            elif value.__class__ is _LazyObjectPrimitive:
+                primitive[name] = value.to_primitive()
+            else:
+                primitive[name] = convert(value)
+        return primitive
+
+    def from_primitive(self, obj, objdata):
+        """Set the fields of obj from their primitive form.
+
+        This does not track the fields as changed.  Child objects are kept
+        as primitives until they are first read.
+        """
+        for name, value in objdata.iteritems():
+            try:
+                attrname, field, is_object, convert = (
+                    self.from_primitive_fields[name])
+            except KeyError:
+                continue
+            if value is not None and is_object:
+                setattr(obj, attrname, _LazyObjectPrimitive(value))
+                continue
+            try:
+                if convert:
+                    value = field.from_primitive(obj, name, value)
+                setattr(obj, attrname, field.coerce(obj, name, value))
+            except Exception:
+                attr = "%s.%s" % (obj.obj_name(), name)
+                LOG.exception(_('Error setting %(attr)s') %
+                              {'attr': attr})
+                raise
+
+
 def make_class_properties(cls):
     # NOTE(danms/comstud): Inherit fields from super classes.
     # mro() returns the current class first and returns 'object' last, so
@@ -61,9 +177,14 @@ def make_class_properties(cls):
             attrname = get_attrname(name)
             if not hasattr(self, attrname):
                 self.obj_load_attr(name)
-            return getattr(self, attrname)
+            value = getattr(self, attrname)
+            if value.__class__ is _LazyObjectPrimitive:
+                value = self._obj_hydrate(name, value)
+            return value
 
         def setter(self, value, name=name, field=field):
+            if not self._changed_fields:
+                self._changed_fields = set()
             self._changed_fields.add(name)
             try:
                 return setattr(self, get_attrname(name),
@@ -84,6 +205,19 @@ class NovaObjectMetaclass(type):
     # remoted. If this is not None, use it to remote things over RPC.
     indirection_api = None
 
+    def __new__(mcs, name, bases, dict_):
+        # NOTE: Field values live in per-class slots rather than in the
+        # instance __dict__, which matters for lists of thousands of
+        # objects.  The __dict__ is kept so that objects can still carry
+        # other attributes.
+        if not any(isinstance(base, NovaObjectMetaclass) for base in bases):
+            dict_['__slots__'] = ('_context', '_changed_fields',
+                                  '__dict__', '__weakref__')
+        else:
+            dict_['__slots__'] = _field_slots(bases, dict_)
+        return super(NovaObjectMetaclass, mcs).__new__(mcs, name, bases,
+                                                       dict_)
+
     def __init__(cls, names, bases, dict_):
         if not hasattr(cls, '_obj_classes'):
             # This will be set in the 'NovaObject' class.
@@ -92,6 +226,11 @@ class NovaObjectMetaclass(type):
             # Add the subclass to NovaObject._obj_classes
             make_class_properties(cls)
             cls._obj_classes[cls.obj_name()].append(cls)
+        cls._obj_codec = _ObjectCodec(cls)
+        cls._obj_slots = tuple(
+            slot for klass in cls.__mro__
+            for slot in klass.__dict__.get('__slots__', ())
+            if slot not in ('__dict__', '__weakref__'))
 
 
 # These are decorators that mark an object's method as remotable.
@@ -180,7 +319,7 @@ class NovaObject(object):
     obj_extra_fields = []
 
     def __init__(self, context=None, **kwargs):
-        self._changed_fields = set()
+        self._changed_fields = _NO_CHANGES
         self._context = context
         for key in kwargs.keys():
             self[key] = kwargs[key]
@@ -227,16 +366,24 @@ class NovaObject(object):
     def _obj_from_primitive(cls, context, objver, primitive):
         self = cls()
         self._context = context
-        self.VERSION = objver
-        objdata = primitive['nova_object.data']
+        if objver != cls.VERSION:
+            self.VERSION = objver
+        cls._obj_codec.from_primitive(self, primitive['nova_object.data'])
+        # NOTE: the changes of the primitive replace any the constructor
+        # made, such as PciDevice setting extra_info.
         changes = primitive.get('nova_object.changes', [])
-        for name, field in self.fields.items():
-            if name in objdata:
-                setattr(self, name, field.from_primitive(self, name,
-                                                         objdata[name]))
-        self._changed_fields = set([x for x in changes if x in self.fields])
+        self._changed_fields = (set([x for x in changes if x in self.fields])
+                                or _NO_CHANGES)
         return self
 
+    def _obj_hydrate(self, name, lazy):
+        """Build the child object held as a primitive in field name."""
+        field = self.fields[name]
+        value = field.coerce(self, name, field.from_primitive(
+            self, name, lazy.primitive))
+        setattr(self, get_attrname(name), value)
+        return value
+
     @classmethod
     def obj_from_primitive(cls, primitive, context=None):
         """Object field-by-field hydration."""
@@ -273,6 +420,21 @@ class NovaObject(object):
         """Create a copy."""
         return copy.deepcopy(self)
 
+    # NOTE: pickle protocols 0 and 1 refuse objects with __slots__ unless
+    # they provide their state themselves.
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for slot in self._obj_slots:
+            try:
+                state[slot] = getattr(self, slot)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.iteritems():
+            setattr(self, name, value)
+
     def obj_make_compatible(self, primitive, target_version):
         """Make an object representation compatible with a target version.
 
@@ -292,21 +454,19 @@ class NovaObject(object):
     def obj_to_primitive(self, target_version=None):
         """Simple base-case dehydration.
 
-        This calls to_primitive() for each item in fields.
+        This converts each item in fields that is set, using the codec of
+        the class.
         """
-        primitive = dict()
-        for name, field in self.fields.items():
-            if self.obj_attr_is_set(name):
-                primitive[name] = field.to_primitive(self, name,
-                                                     getattr(self, name))
+        primitive = self._obj_codec.to_primitive(self)
         if target_version:
             self.obj_make_compatible(primitive, target_version)
         obj = {'nova_object.name': self.obj_name(),
                'nova_object.namespace': 'nova',
                'nova_object.version': target_version or self.VERSION,
                'nova_object.data': primitive}
-        if self.obj_what_changed():
-            obj['nova_object.changes'] = list(self.obj_what_changed())
+        changes = self.obj_what_changed()
+        if changes:
+            obj['nova_object.changes'] = list(changes)
         return obj
 
     def obj_load_attr(self, attrname):
@@ -330,9 +490,14 @@ class NovaObject(object):
         """Returns a set of fields that have been modified."""
         changes = set(self._changed_fields)
         for field in self.fields:
-            if (self.obj_attr_is_set(field) and
-                    isinstance(self[field], NovaObject) and
-                    self[field].obj_what_changed()):
+            if not self.obj_attr_is_set(field):
+                continue
+            value = getattr(self, get_attrname(field))
+            if value.__class__ is _LazyObjectPrimitive:
+                if value.has_changes():
+                    changes.add(field)
+            elif (isinstance(value, NovaObject) and
+                    value.obj_what_changed()):
                 changes.add(field)
         return changes
 
@@ -351,7 +516,7 @@ class NovaObject(object):
         if fields:
             self._changed_fields -= set(fields)
         else:
-            self._changed_fields.clear()
+            self._changed_fields = _NO_CHANGES
 
     def obj_attr_is_set(self, attrname):
         """Test object to see if attrname is present.
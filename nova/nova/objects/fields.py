@@ -111,6 +111,22 @@ class FieldType(AbstractFieldType):
     def describe(self):
         return self.__class__.__name__
 
+    def get_to_primitive(self):
+        """Return a function serializing a value of this type.
+
+        Object codecs look this up once per field instead of calling
+        to_primitive() for each value, so the function does not get the
+        object or attribute name.  Returns None if values are their own
+        primitive form.
+        """
+        if type(self).to_primitive is FieldType.to_primitive:
+            return None
+        return lambda value: self.to_primitive(None, None, value)
+
+    def has_from_primitive(self):
+        """Return True if values need from_primitive() to be deserialized."""
+        return type(self).from_primitive is not FieldType.from_primitive
+
 
 class UnspecifiedDefault(object):
     pass
@@ -199,6 +215,22 @@ class Field(object):
         else:
             return self._type.to_primitive(obj, attr, value)
 
+    def get_to_primitive(self):
+        """Return a function serializing a value of this field.
+
+        This is to_primitive() without the object and attribute name,
+        looked up once by object codecs.  Returns None if values are their
+        own primitive form.
+        """
+        convert = self._type.get_to_primitive()
+        if convert is None:
+            return None
+        return lambda value: None if value is None else convert(value)
+
+    def has_from_primitive(self):
+        """Return True if values need from_primitive() to be deserialized."""
+        return self._type.has_from_primitive()
+
     def describe(self):
         """Return a short string describing the type of this field."""
         name = self._type.describe()
@@ -261,6 +293,9 @@ class DateTime(FieldType):
     def to_primitive(obj, attr, value):
         return timeutils.isotime(value)
 
+    def get_to_primitive(self):
+        return timeutils.isotime
+
 
 class IPAddress(FieldType):
     @staticmethod
@@ -277,6 +312,9 @@ class IPAddress(FieldType):
     def to_primitive(obj, attr, value):
         return str(value)
 
+    def get_to_primitive(self):
+        return str
+
 
 class IPV4Address(IPAddress):
     @staticmethod
@@ -349,6 +387,12 @@ class List(CompoundFieldType):
     def to_primitive(self, obj, attr, value):
         return [self._element_type.to_primitive(obj, attr, x) for x in value]
 
+    def get_to_primitive(self):
+        convert = self._element_type.get_to_primitive()
+        if convert is None:
+            return list
+        return lambda value: [convert(x) for x in value]
+
     def from_primitive(self, obj, attr, value):
         return [self._element_type.from_primitive(obj, attr, x) for x in value]
 
@@ -382,6 +426,13 @@ class Dict(CompoundFieldType):
                 obj, '%s["%s"]' % (attr, key), element)
         return concrete
 
+    def get_to_primitive(self):
+        convert = self._element_type.get_to_primitive()
+        if convert is None:
+            return dict
+        return lambda value: dict((key, convert(element))
+                                  for key, element in value.iteritems())
+
 
 class Object(FieldType):
     def __init__(self, obj_name, **kwargs):
@@ -403,6 +454,9 @@ class Object(FieldType):
     def to_primitive(obj, attr, value):
         return value.obj_to_primitive()
 
+    def get_to_primitive(self):
+        return lambda value: value.obj_to_primitive()
+
     @staticmethod
     def from_primitive(obj, attr, value):
         # FIXME(danms): Avoid circular import from base.py
@@ -17,6 +17,7 @@ from nova.cells import rpcapi as cells_rpcapi
 from nova.compute import flavors
 from nova import db
 from nova import exception
+from nova import metadata_cache
 from nova import notifications
 from nova.objects import base
 from nova.objects import fields
@@ -166,6 +167,8 @@ class Instance(base.NovaPersistentObject, base.NovaObject):
 
     obj_extra_fields = ['name']
 
+    __slots__ = ('_orig_metadata', '_orig_system_metadata')
+
     def __init__(self, *args, **kwargs):
         super(Instance, self).__init__(*args, **kwargs)
         self._reset_metadata_tracking()
@@ -438,6 +441,7 @@ class Instance(base.NovaPersistentObject, base.NovaObject):
                 updates[field] = self[field]
 
         if not updates:
+            metadata_cache.instance_updated(self.uuid, changes)
             if stale_instance:
                 _handle_cell_update_from_api()
             return
@@ -471,6 +475,9 @@ class Instance(base.NovaPersistentObject, base.NovaObject):
         old_ref, inst_ref = db.instance_update_and_get_original(
                 context, self.uuid, updates, update_cells=False,
                 columns_to_join=_expected_cols(expected_attrs))
+        # Only once the update is committed, or a document built from the
+        # old values in between would be cached:
+        metadata_cache.instance_updated(self.uuid, changes)
 
         if stale_instance:
             _handle_cell_update_from_api()
@@ -562,6 +569,7 @@ class Instance(base.NovaPersistentObject, base.NovaObject):
         after completion.
         """
         db.instance_metadata_delete(context, self.uuid, key)
+        metadata_cache.invalidate(self.uuid)
         md_was_changed = 'metadata' in self.obj_what_changed()
         del self.metadata[key]
         self._orig_metadata.pop(key, None)
@@ -14,9 +14,25 @@
 
 from nova import db
 from nova import exception
+from nova.objects import attribute
 from nova.objects import base
 from nova.objects import fields
 
+
+def _load_scopes(context, project_id):
+    scopes = {}
+    for db_scope in db.scope_get_all_by_project(context, project_id):
+        values = scopes.setdefault(db_scope['name'], {})
+        values[db_scope['value']] = dict((key, db_scope[key])
+                                         for key in Scope.fields)
+    return scopes
+
+
+def get_project_scopes(context, project_id):
+    """Return a dict of attribute name to {value: scope row} for a project."""
+    return attribute.get_cached(context, 'scope', project_id, _load_scopes)
+
+
 class Scope(base.NovaPersistentObject, base.NovaObject):
 #class KeyPair(base.NovaPersistentObject, base.NovaObject):
     # Version 1.0: Initial version
@@ -38,30 +54,49 @@ class Scope(base.NovaPersistentObject, base.NovaObject):
            raise exception.ObjectActionError(action='create',
                                               reason='already created')
         updates = self.obj_get_changes()
-	print context
         updates.pop('id', None)
         db_scope = db.scope_create(context, updates)
-	print "in create/nova/object/scope"
-	return db_scope
-        #self._from_db_object(context, self, db_attribute)
+        attribute.invalidate_cache(db_scope['project_id'])
+        return db_scope
+
+    @classmethod
+    def create_all(cls, context, project_id, values):
+        """Create (name, value) scopes for a project in one transaction."""
+        db_scopes = db.scope_create_all(
+            context, [{'name': name, 'value': value, 'project_id': project_id}
+                      for name, value in values])
+        attribute.invalidate_cache(project_id)
+        return [cls._from_db_object(context, cls(), db_scope)
+                for db_scope in db_scopes]
+
+    def delete(self, context, id):
+        self.delete_all(context, [id])
+
+    @classmethod
+    def delete_all(cls, context, ids):
+        for project_id in db.scope_delete_all(context, ids):
+            attribute.invalidate_cache(project_id)
 
     def list(self, context):
-        #if self.obj_attr_is_set('id'):
-         #  raise exception.ObjectActionError(action='create',
-                                              #reason='already created')
-        #updates = self.obj_get_changes()
-        #updates.pop('id', None)
-        #db_attribute = db.attribute_create(context, updates)
-        #print "in create/nova/object/attribute"
-        return db.scope_list(context)    
-    
+        scopes = get_project_scopes(context, context.project_id)
+        db_scopes = [row for values in scopes.values()
+                     for row in values.values()]
+        db_scopes.sort(key=lambda row: row['id'])
+        return [self._from_db_object(context, Scope(), db_scope)
+                for db_scope in db_scopes]
+
+    @classmethod
+    def exists(cls, context, project_id, name, value):
+        scopes = get_project_scopes(context, project_id)
+        return value in scopes.get(name, {})
+
     @staticmethod
-    def _from_db_object(context, attribute, db_attribute):
-        for id in attribute.id:
-            attribute[id] = db_attribute[id]
-        attribute._context = context
-        attribute.obj_reset_changes()
-        return attribute
+    def _from_db_object(context, scope, db_scope):
+        for key in scope.fields:
+            scope[key] = db_scope[key]
+        scope._context = context
+        scope.obj_reset_changes()
+        return scope
     ''''
     @base.remotable_classmethod
     def get_by_name(cls, context, user_id, name):
@@ -21,12 +21,15 @@ import datetime
 from oslo.config import cfg
 import six
 
+from nova import context as nova_context
 from nova import db
 from nova import exception
 from nova.objects import keypair as keypair_obj
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import importutils
 from nova.openstack.common import log as logging
+from nova.openstack.common import memorycache
+from nova.openstack.common import strutils
 from nova.openstack.common import timeutils
 
 LOG = logging.getLogger(__name__)
@@ -81,17 +84,122 @@ quota_opts = [
     cfg.StrOpt('quota_driver',
                default='nova.quota.DbQuotaDriver',
                help='Default driver to use for quota checks'),
+    cfg.IntOpt('quota_limit_cache_seconds',
+               default=0,
+               help='Number of seconds quota limits read from the database '
+                    'are cached for.  Limits changed through the API are '
+                    'dropped from the cache at once, and from the cache of '
+                    'other processes only if memcached_servers is set.  0 '
+                    'disables the cache'),
     ]
 
 CONF = cfg.CONF
 CONF.register_opts(quota_opts)
 
 
+class QuotaLimitCache(object):
+    """Cache of the quota limits read from the database.
+
+    The limits of a project, including those of its users, are kept under
+    one key, so that changing any of them drops them all.  Within it, the
+    project's own limits are named 'project' and those of a user
+    ('user', user_id), which keeps them apart even if user_id is None.
+    Values are only cached while CONF.quota_limit_cache_seconds is set.
+    """
+
+    def __init__(self):
+        self._cache = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = memorycache.get_client()
+        return self._cache
+
+    @staticmethod
+    def _encode(name):
+        # Admin contexts may have no project_id or quota_class.
+        if name is not None:
+            name = strutils.safe_encode(name)
+        return name
+
+    @classmethod
+    def _project_key(cls, project_id):
+        return 'quota-limits-project-%s' % cls._encode(project_id)
+
+    @classmethod
+    def _class_key(cls, quota_class):
+        return 'quota-limits-class-%s' % cls._encode(quota_class)
+
+    def _get(self, key, name, loader):
+        entry = self.cache.get(key)
+        if entry is not None and name in entry:
+            self.hits += 1
+            return dict(entry[name])
+
+        self.misses += 1
+        value = loader()
+        entry = dict(entry or {})
+        entry[name] = value
+        self.cache.set(key, entry, CONF.quota_limit_cache_seconds)
+        return dict(value)
+
+    def get_project_quotas(self, context, project_id):
+        if CONF.quota_limit_cache_seconds <= 0:
+            return db.quota_get_all_by_project(context, project_id)
+        nova_context.authorize_project_context(context, project_id)
+        return self._get(self._project_key(project_id), 'project',
+                         lambda: db.quota_get_all_by_project(context,
+                                                             project_id))
+
+    def get_user_quotas(self, context, project_id, user_id):
+        if CONF.quota_limit_cache_seconds <= 0:
+            return db.quota_get_all_by_project_and_user(context, project_id,
+                                                        user_id)
+        nova_context.authorize_project_context(context, project_id)
+        return self._get(self._project_key(project_id), ('user', user_id),
+                         lambda: db.quota_get_all_by_project_and_user(
+                             context, project_id, user_id))
+
+    def get_class_quotas(self, context, quota_class):
+        if CONF.quota_limit_cache_seconds <= 0:
+            return db.quota_class_get_all_by_name(context, quota_class)
+        nova_context.authorize_quota_class_context(context, quota_class)
+        return self._get(self._class_key(quota_class), None,
+                         lambda: db.quota_class_get_all_by_name(context,
+                                                                quota_class))
+
+    def get_default_quotas(self, context):
+        if CONF.quota_limit_cache_seconds <= 0:
+            return db.quota_class_get_default(context)
+        # NOTE: The default quotas are those of the class named 'default'.
+        return self._get(self._class_key('default'), None,
+                         lambda: db.quota_class_get_default(context))
+
+    def invalidate(self, project_id=None, quota_class=None):
+        """Drop the cached limits of a project and its users or a class."""
+        if project_id is not None:
+            self.cache.delete(self._project_key(project_id))
+        if quota_class is not None:
+            self.cache.delete(self._class_key(quota_class))
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': float(self.hits) / lookups if lookups else 0.0}
+
+
 class DbQuotaDriver(object):
     """Driver to perform necessary checks to enforce quotas and obtain
     quota information.  The default driver utilizes the local
     database.
     """
+
+    def __init__(self):
+        self.limit_cache = QuotaLimitCache()
+
     def get_by_project_and_user(self, context, project_id, user_id, resource):
         """Get a specific quota by project and user."""
 
@@ -117,7 +225,7 @@ class DbQuotaDriver(object):
         """
 
         quotas = {}
-        default_quotas = db.quota_class_get_default(context)
+        default_quotas = self.limit_cache.get_default_quotas(context)
         for resource in resources.values():
             quotas[resource.name] = default_quotas.get(resource.name,
                                                        resource.default)
@@ -158,7 +266,8 @@ class DbQuotaDriver(object):
         if project_id == context.project_id:
             quota_class = context.quota_class
         if quota_class:
-            class_quotas = db.quota_class_get_all_by_name(context, quota_class)
+            class_quotas = self.limit_cache.get_class_quotas(context,
+                                                             quota_class)
         else:
             class_quotas = {}
 
@@ -221,10 +330,10 @@ class DbQuotaDriver(object):
         :param user_quotas: Quotas dictionary for the specified project
                             and user.
         """
-        user_quotas = user_quotas or db.quota_get_all_by_project_and_user(
+        user_quotas = user_quotas or self.limit_cache.get_user_quotas(
             context, project_id, user_id)
         # Use the project quota for default user quota.
-        proj_quotas = project_quotas or db.quota_get_all_by_project(
+        proj_quotas = project_quotas or self.limit_cache.get_project_quotas(
             context, project_id)
         for key, value in proj_quotas.iteritems():
             if key not in user_quotas.keys():
@@ -262,7 +371,7 @@ class DbQuotaDriver(object):
                         will be returned.
         :param project_quotas: Quotas dictionary for the specified project.
         """
-        project_quotas = project_quotas or db.quota_get_all_by_project(
+        project_quotas = project_quotas or self.limit_cache.get_project_quotas(
             context, project_id)
         project_usages = None
         if usages:
@@ -404,7 +513,8 @@ class DbQuotaDriver(object):
             user_id = context.user_id
 
         # Get the applicable quotas
-        project_quotas = db.quota_get_all_by_project(context, project_id)
+        project_quotas = self.limit_cache.get_project_quotas(context,
+                                                             project_id)
         quotas = self._get_quotas(context, resources, values.keys(),
                                   has_sync=False, project_id=project_id,
                                   project_quotas=project_quotas)
@@ -493,7 +603,8 @@ class DbQuotaDriver(object):
         # NOTE(Vek): We're not worried about races at this point.
         #            Yes, the admin may be in the process of reducing
         #            quotas, but that's a pretty rare thing.
-        project_quotas = db.quota_get_all_by_project(context, project_id)
+        project_quotas = self.limit_cache.get_project_quotas(context,
+                                                             project_id)
         quotas = self._get_quotas(context, resources, deltas.keys(),
                                   has_sync=True, project_id=project_id,
                                   project_quotas=project_quotas)
@@ -502,6 +613,12 @@ class DbQuotaDriver(object):
                                        user_id=user_id,
                                        project_quotas=project_quotas)
 
+        return self._reserve(context, resources, quotas, user_quotas,
+                             deltas, expire, project_id, user_id)
+
+    def _reserve(self, context, resources, quotas, user_quotas, deltas,
+                 expire, project_id, user_id):
+        """Reserve deltas in the database, once quotas are known."""
         # NOTE(Vek): Most of the work here has to be done in the DB
         #            API, because we have to do it in a transaction,
         #            which means access to the session.  Since the
@@ -597,6 +714,7 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project_and_user(context, project_id, user_id)
+        self.limit_cache.invalidate(project_id=project_id)
 
     def destroy_all_by_project(self, context, project_id):
         """Destroy all quotas, usages, and reservations associated with a
@@ -607,6 +725,22 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project(context, project_id)
+        self.limit_cache.invalidate(project_id=project_id)
+
+    def invalidate_limits(self, project_id=None, quota_class=None):
+        """Drop the cached limits of a project and its users or of a quota
+        class, after they were changed.
+
+        :param project_id: The ID of the project whose limits changed.
+        :param quota_class: The name of the quota class whose limits
+                            changed.
+        """
+        self.limit_cache.invalidate(project_id=project_id,
+                                    quota_class=quota_class)
+
+    def get_limit_cache_stats(self):
+        """Return the hits, misses and hit rate of the limit cache."""
+        return self.limit_cache.get_stats()
 
     def expire(self, context):
         """Expire reservations.
@@ -620,6 +754,71 @@ class DbQuotaDriver(object):
         db.reservation_expire(context)
 
 
+class CounterQuotaDriver(DbQuotaDriver):
+    """Quota driver that reserves quota without locking usages.
+
+    DbQuotaDriver locks all the quota usages of a project to make a
+    reservation, so concurrent requests in one project serialize on those
+    locks and retry on deadlocks.  This driver counts reservations with
+    conditional updates of single usage rows instead.
+
+    Usages are refreshed from their sync functions when missing, negative
+    or older than max_age.  until_refresh is ignored, as counting it down
+    would need a locked read-modify-write on every reservation.
+    """
+
+    def _reserve(self, context, resources, quotas, user_quotas, deltas,
+                 expire, project_id, user_id):
+        return db.quota_reserve_counter(context, resources, quotas,
+                                        user_quotas, deltas, expire,
+                                        CONF.max_age,
+                                        project_id=project_id,
+                                        user_id=user_id)
+
+    def commit(self, context, reservations, project_id=None, user_id=None):
+        """Commit reservations.
+
+        :param context: The request context, for access checks.
+        :param reservations: A list of the reservation UUIDs, as
+                             returned by the reserve() method.
+        :param project_id: Specify the project_id if current context
+                           is admin and admin wants to impact on
+                           common user's tenant.
+        :param user_id: Specify the user_id if current context
+                        is admin and admin wants to impact on
+                        common user.
+        """
+        db.reservation_commit_counter(context, reservations,
+                                      project_id=project_id, user_id=user_id)
+
+    def rollback(self, context, reservations, project_id=None, user_id=None):
+        """Roll back reservations.
+
+        :param context: The request context, for access checks.
+        :param reservations: A list of the reservation UUIDs, as
+                             returned by the reserve() method.
+        :param project_id: Specify the project_id if current context
+                           is admin and admin wants to impact on
+                           common user's tenant.
+        :param user_id: Specify the user_id if current context
+                        is admin and admin wants to impact on
+                        common user.
+        """
+        db.reservation_rollback_counter(context, reservations,
+                                        project_id=project_id,
+                                        user_id=user_id)
+
+    def expire(self, context):
+        """Expire reservations.
+
+        Explores all currently existing reservations and rolls back
+        any that have expired.
+
+        :param context: The request context, for access checks.
+        """
+        db.reservation_expire_counter(context)
+
+
 class NoopQuotaDriver(object):
     """Driver that turns quotas calls into no-ops and pretends that quotas
     for all resources are unlimited.  This can be used if you do not
@@ -892,6 +1091,19 @@ class NoopQuotaDriver(object):
         """
         pass
 
+    def invalidate_limits(self, project_id=None, quota_class=None):
+        """Drop the cached limits of a project or of a quota class.
+
+        :param project_id: The ID of the project whose limits changed.
+        :param quota_class: The name of the quota class whose limits
+                            changed.
+        """
+        pass
+
+    def get_limit_cache_stats(self):
+        """Return the hits, misses and hit rate of the limit cache."""
+        return {'hits': 0, 'misses': 0, 'hit_rate': 0.0}
+
 
 class BaseResource(object):
     """Describe a single resource for quota checking."""
@@ -1369,6 +1581,23 @@ class QuotaEngine(object):
 
         self._driver.expire(context)
 
+    def invalidate_limits(self, project_id=None, quota_class=None):
+        """Drop the cached limits of a project and its users or of a quota
+        class.  This must be called after changing them.
+
+        :param project_id: The ID of the project whose limits changed.
+        :param quota_class: The name of the quota class whose limits
+                            changed.
+        """
+
+        self._driver.invalidate_limits(project_id=project_id,
+                                       quota_class=quota_class)
+
+    def get_limit_cache_stats(self):
+        """Return the hits, misses and hit rate of the limit cache."""
+
+        return self._driver.get_limit_cache_stats()
+
     @property
     def resources(self):
         return sorted(self._resources.keys())
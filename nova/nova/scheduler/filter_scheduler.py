@@ -19,11 +19,14 @@ You can customize this scheduler by specifying your own Host Filters and
 Weighing Functions.
 """
 
+import heapq
+import math
 import random
 
 from oslo.config import cfg
 
 from nova.compute import rpcapi as compute_rpcapi
+from nova import db
 from nova import exception
 from nova.objects import instance_group as instance_group_obj
 from nova.openstack.common.gettextutils import _
@@ -33,6 +36,7 @@ from nova import rpc
 from nova.scheduler import driver
 from nova.scheduler import scheduler_options
 from nova.scheduler import utils as scheduler_utils
+from nova.scheduler import weights
 
 
 CONF = cfg.CONF
@@ -48,7 +52,37 @@ filter_scheduler_opts = [
                     'chosen from. A value of 1 chooses the '
                     'first host returned by the weighing functions. '
                     'This value must be at least 1. Any value less than 1 '
-                    'will be ignored, and 1 will be used instead')
+                    'will be ignored, and 1 will be used instead'),
+    cfg.BoolOpt('scheduler_optimistic_claims',
+                default=False,
+                help='Claim the resources of each selected instance on its '
+                     'compute node record before returning it.  A claim '
+                     'fails if the compute node changed since the '
+                     'scheduler last read it, for instance because another '
+                     'scheduler claimed it first, in which case the host is '
+                     'reloaded and the selection retried.  This allows '
+                     'running several schedulers without relying on '
+                     'compute side claim failures and retries.  Claims '
+                     'last until the next full audit of the compute host, '
+                     'or resource_tracker_claim_grace_period seconds '
+                     'between full audits'),
+    cfg.IntOpt('scheduler_claim_attempts',
+               default=3,
+               help='Number of hosts an instance may try to claim when '
+                    'scheduler_optimistic_claims is enabled before giving '
+                    'up on it'),
+    cfg.BoolOpt('scheduler_batch_placement',
+                default=False,
+                help='Place all the instances of a multi-instance request '
+                     'after filtering and weighing the hosts once, only '
+                     're-filtering and re-weighing the host chosen for '
+                     'each instance.  The placement is the same as '
+                     'scheduling the instances one at a time as long as '
+                     'every filter and weigher judges each host on its '
+                     'own, which is true for the filters and weighers '
+                     'shipped with nova.  Requests with server group '
+                     'policies or optimistic claims are still scheduled '
+                     'one instance at a time'),
 ]
 
 CONF.register_opts(filter_scheduler_opts)
@@ -321,7 +355,14 @@ class FilterScheduler(driver.Scheduler):
             num_instances = len(instance_uuids)
         else:
             num_instances = request_spec.get('num_instances', 1)
-        for num in xrange(num_instances):
+        first = 0
+        if (CONF.scheduler_batch_placement and num_instances > 1 and
+                not update_group_hosts and
+                not CONF.scheduler_optimistic_claims):
+            selected_hosts, hosts = self._batch_schedule(hosts,
+                    filter_properties, instance_properties, num_instances)
+            first = len(selected_hosts)
+        for num in xrange(first, num_instances):
             # Filter local hosts based on requirements ...
             hosts = self.host_manager.get_filtered_hosts(hosts,
                     filter_properties, index=num)
@@ -342,8 +383,15 @@ class FilterScheduler(driver.Scheduler):
             if scheduler_host_subset_size < 1:
                 scheduler_host_subset_size = 1
 
-            chosen_host = random.choice(
-                weighed_hosts[0:scheduler_host_subset_size])
+            if CONF.scheduler_optimistic_claims:
+                chosen_host = self._claim_host(elevated, weighed_hosts,
+                        scheduler_host_subset_size, filter_properties,
+                        instance_properties, num)
+                if chosen_host is None:
+                    break
+            else:
+                chosen_host = random.choice(
+                    weighed_hosts[0:scheduler_host_subset_size])
             selected_hosts.append(chosen_host)
 
             # Now consume the resources so the filter/weights
@@ -353,6 +401,150 @@ class FilterScheduler(driver.Scheduler):
                 filter_properties['group_hosts'].add(chosen_host.obj.host)
         return selected_hosts
 
+    def _batch_schedule(self, hosts, filter_properties, instance_properties,
+                        num_instances):
+        """Place up to num_instances instances with a single filtering and
+        weighing pass.
+
+        The filtered hosts are kept in a heap ordered by weight.  After an
+        instance is placed, only the chosen host is filtered and weighed
+        again before it goes back into the heap, since consuming resources
+        on one host does not change how the others are judged.
+
+        Weights are normalized over all the hosts, so this only gives the
+        same order as get_weighed_hosts() while at most one weigher tells
+        the hosts apart: the order is then the one of that weigher's raw
+        weight times its multiplier.  The batch stops as soon as a second
+        weigher would start to matter.
+
+        Returns the selected WeighedHosts and the hosts left, which the
+        caller schedules one instance at a time if the batch stopped early.
+        """
+        hosts = self.host_manager.get_filtered_hosts(hosts,
+                filter_properties, index=0)
+        if not hosts:
+            return [], []
+
+        weighers = [cls() for cls in self.host_manager.weight_classes]
+        weighed = [weights.WeighedHost(host, 0.0) for host in hosts]
+        raw_weights = [weigher.weigh_objects(weighed, filter_properties)
+                       for weigher in weighers]
+
+        sort_weigher = None
+        constants = {}
+        for i, weigher in enumerate(weighers):
+            if weigher.weight_multiplier() == 0:
+                continue
+            if len(set(raw_weights[i])) == 1:
+                constants[i] = raw_weights[i][0]
+            elif sort_weigher is None:
+                sort_weigher = i
+            else:
+                LOG.debug(_("More than one weigher tells the hosts apart, "
+                            "not batching the placement"))
+                return [], hosts
+
+        def _sort_weight(values):
+            if sort_weigher is None:
+                return 0.0
+            return (weighers[sort_weigher].weight_multiplier() *
+                    values[sort_weigher])
+
+        # Sorting by weight keeps the order of the hosts with equal
+        # weights, so the position breaks the ties the same way.
+        heap = [(-_sort_weight([w[pos] for w in raw_weights]), pos, host)
+                for pos, host in enumerate(hosts)]
+        heapq.heapify(heap)
+
+        subset_size = CONF.scheduler_host_subset_size
+        selected_hosts = []
+        for num in xrange(num_instances):
+            if not heap:
+                break
+            candidates = [heapq.heappop(heap)
+                          for i in xrange(max(min(subset_size, len(heap)),
+                                              1))]
+            chosen = random.choice(candidates)
+            for candidate in candidates:
+                if candidate is not chosen:
+                    heapq.heappush(heap, candidate)
+
+            neg_weight, pos, host_state = chosen
+            selected_hosts.append(weights.WeighedHost(host_state,
+                                                      -neg_weight))
+            host_state.consume_from_instance(instance_properties)
+            if num + 1 == num_instances:
+                break
+
+            if not self.host_manager.get_filtered_hosts([host_state],
+                    filter_properties, index=num + 1):
+                continue
+            weighed = [weights.WeighedHost(host_state, 0.0)]
+            values = [weigher.weigh_objects(weighed, filter_properties)[0]
+                      for weigher in weighers]
+            changed = [i for i, value in constants.items()
+                       if values[i] != value]
+            if changed and (sort_weigher is not None or len(changed) > 1):
+                LOG.debug(_("Weight of %(host_state)s changed, not batching "
+                            "the rest of the placement"),
+                          {'host_state': host_state})
+                heap.append(chosen)
+                break
+            if changed:
+                # The other hosts still all have the same weight for this
+                # weigher, which from now on orders the hosts.
+                sort_weigher = changed[0]
+                others = (weighers[sort_weigher].weight_multiplier() *
+                          constants.pop(sort_weigher))
+                heap = [(-others, entry[1], entry[2]) for entry in heap]
+                heapq.heapify(heap)
+            heapq.heappush(heap, (-_sort_weight(values), pos, host_state))
+
+        return selected_hosts, [entry[2] for entry in sorted(
+                heap, key=lambda entry: entry[1])]
+
+    def _claim_host(self, context, weighed_hosts, subset_size,
+                    filter_properties, instance_properties, index):
+        """Choose one of the best weighed hosts and claim the resources of
+        the instance on its compute node.
+
+        The claim fails if the compute node was written since this scheduler
+        read it.  The host state is then reloaded and the host only stays a
+        candidate if it still passes the filters.  Returns None if no claim
+        succeeded.
+        """
+        memory_mb = instance_properties['memory_mb']
+        vcpus = instance_properties['vcpus']
+        # Swap is in MB, rounded up to the whole GB the compute node holds:
+        instance_type = filter_properties.get('instance_type') or {}
+        swap_gb = int(math.ceil((instance_type.get('swap') or 0) / 1024.0))
+        disk_gb = (instance_properties['root_gb'] +
+                   instance_properties['ephemeral_gb'] + swap_gb)
+        weighed_hosts = list(weighed_hosts)
+        for attempt in xrange(CONF.scheduler_claim_attempts):
+            if not weighed_hosts:
+                break
+            chosen_host = random.choice(weighed_hosts[0:subset_size])
+            host_state = chosen_host.obj
+            try:
+                host_state.generation = db.compute_node_claim(context,
+                        host_state.compute_node_id, host_state.generation,
+                        memory_mb, vcpus, disk_gb)
+                return chosen_host
+            except exception.ComputeNodeClaimConflict:
+                LOG.debug(_("Claim on %(host_state)s conflicted, "
+                            "reloading it"), {'host_state': host_state})
+
+            try:
+                self.host_manager.refresh_host_state(context, host_state)
+                still_passes = self.host_manager.get_filtered_hosts(
+                        [host_state], filter_properties, index=index)
+            except exception.ComputeHostNotFound:
+                still_passes = False
+            if not still_passes:
+                weighed_hosts.remove(chosen_host)
+        return None
+
     def _get_all_host_states(self, context):
         """Template method, so a subclass can implement caching."""
         return self.host_manager.get_all_host_states(context)
@@ -21,6 +21,7 @@ from nova import db
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.scheduler import filters
+from nova.scheduler import host_columns
 
 LOG = logging.getLogger(__name__)
 
@@ -70,6 +71,29 @@ class CoreFilter(BaseCoreFilter):
     def _get_cpu_allocation_ratio(self, host_state, filter_properties):
         return CONF.cpu_allocation_ratio
 
+    def filter_all(self, filter_obj_list, filter_properties):
+        columns = host_columns.get_columns(filter_obj_list)
+        instance_type = filter_properties.get('instance_type')
+        if columns is None or not instance_type:
+            return super(CoreFilter, self).filter_all(filter_obj_list,
+                                                      filter_properties)
+
+        rows = columns.rows(filter_obj_list)
+        host_vcpus_total = columns['vcpus_total'][rows]
+        unknown = host_vcpus_total == 0
+        if unknown.any():
+            # Fail safe
+            LOG.warning(_("VCPUs not set; assuming CPU collection broken"))
+
+        vcpus_total = host_vcpus_total * CONF.cpu_allocation_ratio
+        passes = unknown | (vcpus_total - columns['vcpus_used'][rows] >=
+                            instance_type['vcpus'])
+        # Only provide a VCPU limit to compute if the virt driver is reporting
+        # an accurate count of installed VCPUs. (XenServer driver does not)
+        limits = host_columns.numpy.where(vcpus_total > 0, vcpus_total,
+                                          host_columns.numpy.nan)
+        return host_columns.select(filter_obj_list, passes, 'vcpu', limits)
+
 
 class AggregateCoreFilter(BaseCoreFilter):
     """AggregateCoreFilter with per-aggregate CPU subscription flag.
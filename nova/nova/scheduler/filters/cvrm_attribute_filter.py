@@ -0,0 +1,72 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from nova import db
+from nova.openstack.common.gettextutils import _
+from nova.openstack.common import log as logging
+from nova.scheduler import filters
+from nova.scheduler import host_attribute_index
+from nova import utils
+
+LOG = logging.getLogger(__name__)
+
+
+class CvrmAttributeFilter(filters.BaseHostFilter):
+    """Keep instances off hosts whose CVRM attributes conflict with theirs.
+
+    Hosts carry attribute values through 'cvrm:<attribute>' aggregate
+    metadata, instances through their own metadata.  The host side is
+    precomputed by the HostManager into a HostAttributeIndex, so each host
+    check is constant time.  Without that index, as when the filter is only
+    requested for some requests, each host's aggregates are read instead.
+    """
+
+    # Aggregate data and instance metadata do not change within a request
+    run_filter_once_per_request = True
+
+    def __init__(self):
+        self._encoded = None
+
+    def _instance_code(self, index, filter_properties):
+        # The instance is encoded once per index, not once per host.
+        if self._encoded is None or self._encoded[0] is not index:
+            spec = filter_properties.get('request_spec', {})
+            instance = spec.get('instance_properties', {})
+            metadata = instance.get('metadata') or {}
+            if not isinstance(metadata, dict):
+                metadata = utils.metadata_to_dict(metadata)
+            self._encoded = (index, index.encode(metadata))
+        return self._encoded[1]
+
+    def _host_index(self, host_state, filter_properties):
+        context = filter_properties['context'].elevated()
+        metadata = db.aggregate_metadata_get_by_host(context,
+                                                     host_state.host)
+        prefix = host_attribute_index.KEY_PREFIX
+        attributes = dict((key[len(prefix):], values)
+                          for key, values in metadata.iteritems()
+                          if key.startswith(prefix))
+        return host_attribute_index.HostAttributeIndex(
+            {host_state.host: attributes})
+
+    def host_passes(self, host_state, filter_properties):
+        index = host_state.attribute_index
+        if index is None:
+            index = self._host_index(host_state, filter_properties)
+        code = self._instance_code(index, filter_properties)
+        if not code:
+            return True
+        if not index.host_passes(host_state.host, code):
+            LOG.debug(_("%(host_state)s fails CVRM attribute constraints"),
+                      {'host_state': host_state})
+            return False
+        return True
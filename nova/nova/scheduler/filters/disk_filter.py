@@ -18,6 +18,7 @@ from oslo.config import cfg
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.scheduler import filters
+from nova.scheduler import host_columns
 
 LOG = logging.getLogger(__name__)
 
@@ -31,12 +32,38 @@ CONF.register_opt(disk_allocation_ratio_opt)
 class DiskFilter(filters.BaseHostFilter):
     """Disk Filter with over subscription flag."""
 
+    @staticmethod
+    def _requested_disk_mb(filter_properties):
+        instance_type = filter_properties.get('instance_type')
+        return (1024 * (instance_type['root_gb'] +
+                        instance_type['ephemeral_gb']) +
+                instance_type['swap'])
+
+    def filter_all(self, filter_obj_list, filter_properties):
+        columns = host_columns.get_columns(filter_obj_list)
+        if columns is None:
+            return super(DiskFilter, self).filter_all(filter_obj_list,
+                                                      filter_properties)
+
+        requested_disk = self._requested_disk_mb(filter_properties)
+        rows = columns.rows(filter_obj_list)
+        total_usable_disk_mb = columns['total_usable_disk_gb'][rows] * 1024
+
+        disk_mb_limit = total_usable_disk_mb * CONF.disk_allocation_ratio
+        used_disk_mb = total_usable_disk_mb - columns['free_disk_mb'][rows]
+        usable_disk_mb = disk_mb_limit - used_disk_mb
+        hosts = host_columns.select(filter_obj_list,
+                                    usable_disk_mb >= requested_disk,
+                                    'disk_gb', disk_mb_limit / 1024)
+        LOG.debug(_("%(count)d host(s) do not have %(requested_disk)s MB "
+                    "usable disk"),
+                  {'count': len(filter_obj_list) - len(hosts),
+                   'requested_disk': requested_disk})
+        return hosts
+
     def host_passes(self, host_state, filter_properties):
         """Filter based on disk usage."""
-        instance_type = filter_properties.get('instance_type')
-        requested_disk = (1024 * (instance_type['root_gb'] +
-                                 instance_type['ephemeral_gb']) +
-                         instance_type['swap'])
+        requested_disk = self._requested_disk_mb(filter_properties)
 
         free_disk_mb = host_state.free_disk_mb
         total_usable_disk_mb = host_state.total_usable_disk_gb * 1024
@@ -20,6 +20,7 @@ from nova import db
 from nova.openstack.common.gettextutils import _
 from nova.openstack.common import log as logging
 from nova.scheduler import filters
+from nova.scheduler import host_columns
 
 LOG = logging.getLogger(__name__)
 
@@ -71,6 +72,29 @@ class RamFilter(BaseRamFilter):
     def _get_ram_allocation_ratio(self, host_state, filter_properties):
         return CONF.ram_allocation_ratio
 
+    def filter_all(self, filter_obj_list, filter_properties):
+        columns = host_columns.get_columns(filter_obj_list)
+        if columns is None:
+            return super(RamFilter, self).filter_all(filter_obj_list,
+                                                     filter_properties)
+
+        instance_type = filter_properties.get('instance_type')
+        requested_ram = instance_type['memory_mb']
+        rows = columns.rows(filter_obj_list)
+        total_usable_ram_mb = columns['total_usable_ram_mb'][rows]
+
+        memory_mb_limit = total_usable_ram_mb * CONF.ram_allocation_ratio
+        used_ram_mb = total_usable_ram_mb - columns['free_ram_mb'][rows]
+        usable_ram = memory_mb_limit - used_ram_mb
+        hosts = host_columns.select(filter_obj_list,
+                                    usable_ram >= requested_ram,
+                                    'memory_mb', memory_mb_limit)
+        LOG.debug(_("%(count)d host(s) do not have %(requested_ram)s MB "
+                    "usable ram"),
+                  {'count': len(filter_obj_list) - len(hosts),
+                   'requested_ram': requested_ram})
+        return hosts
+
 
 class AggregateRamFilter(BaseRamFilter):
     """AggregateRamFilter with per-aggregate ram subscription flag.
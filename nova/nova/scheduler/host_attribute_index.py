@@ -0,0 +1,107 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Precomputed index of the CVRM attribute values carried by each host.
+
+Hosts get attribute values from the metadata of the aggregates they belong
+to, using keys of the form 'cvrm:<attribute>'.  A host in several aggregates
+may carry several values for one attribute.
+
+Every (attribute, value) pair seen on any host is given one bit, plus one
+extra "other value" bit per attribute that no host ever carries.  A host is
+then described by the bitset of its values and a mask of all bits of the
+attributes it carries, and an instance by the bitset of its own values, so
+checking an instance against a host is a couple of integer operations.
+"""
+
+from nova.openstack.common import timeutils
+
+KEY_PREFIX = 'cvrm:'
+
+
+class HostAttributeIndex(object):
+    def __init__(self, host_attributes):
+        """Build the index.
+
+        :param host_attributes: dict of host name to a dict of attribute
+                                name to a set of values carried by the host
+        """
+        self.created_at = timeutils.utcnow_ts()
+        # attribute name -> {value: bit}; None maps to the "other" bit
+        self.bits = {}
+        # attribute name -> mask of all bits of the attribute
+        self.masks = {}
+        # host -> (code, mask)
+        self.hosts = {}
+
+        next_bit = 1
+        for attributes in host_attributes.itervalues():
+            for name, values in attributes.iteritems():
+                name_bits = self.bits.get(name)
+                if name_bits is None:
+                    name_bits = self.bits[name] = {None: next_bit}
+                    self.masks[name] = next_bit
+                    next_bit <<= 1
+                for value in values:
+                    if value not in name_bits:
+                        name_bits[value] = next_bit
+                        self.masks[name] |= next_bit
+                        next_bit <<= 1
+
+        for host, attributes in host_attributes.iteritems():
+            code = 0
+            mask = 0
+            for name, values in attributes.iteritems():
+                mask |= self.masks[name]
+                for value in values:
+                    code |= self.bits[name][value]
+            self.hosts[host] = (code, mask)
+
+    @classmethod
+    def from_aggregates(cls, aggregates):
+        host_attributes = {}
+        for aggregate in aggregates:
+            metadata = aggregate['metadetails']
+            attributes = dict((key[len(KEY_PREFIX):], value)
+                              for key, value in metadata.iteritems()
+                              if key.startswith(KEY_PREFIX))
+            if not attributes:
+                continue
+            for host in aggregate['hosts']:
+                host_values = host_attributes.setdefault(host, {})
+                for name, value in attributes.iteritems():
+                    host_values.setdefault(name, set()).add(value)
+        return cls(host_attributes)
+
+    def encode(self, metadata):
+        """Return the bitset of an instance's attribute values.
+
+        Values of attributes no host carries are ignored, since no host can
+        conflict with them.
+        """
+        code = 0
+        for name, value in (metadata or {}).iteritems():
+            name_bits = self.bits.get(name)
+            if name_bits is None:
+                continue
+            code |= name_bits.get(value, name_bits[None])
+        return code
+
+    def host_passes(self, host, code):
+        """Check an encoded instance against a host.
+
+        For every attribute the host carries, the instance must either not
+        carry it or carry one of the host's values for it.
+        """
+        host_code, host_mask = self.hosts.get(host, (0, 0))
+        return not (code & host_mask & ~host_code)
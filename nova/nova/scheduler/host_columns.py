@@ -0,0 +1,130 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Columnar copy of the consumable resources of a set of HostStates.
+
+When the HostManager runs in columnar mode, it stores the resources of all
+the hosts of a request in NumPy arrays, one per resource, and tells every
+HostState which row of the arrays is its own.  Filters and weighers that
+only look at those resources can then work on whole arrays at once instead
+of calling into Python for every host.  When an instance is consumed from a
+host, only that host's row is updated.
+
+NumPy is optional; without it, filters and weighers fall back to checking
+hosts one at a time.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FIELDS = ('free_ram_mb', 'total_usable_ram_mb', 'free_disk_mb',
+          'total_usable_disk_gb', 'vcpus_total', 'vcpus_used',
+          'num_io_ops', 'num_instances')
+
+
+def available():
+    return numpy is not None
+
+
+class HostColumns(object):
+    def __init__(self, host_states):
+        self.host_states = list(host_states)
+        count = len(self.host_states)
+        self.columns = {}
+        for field in FIELDS:
+            self.columns[field] = numpy.fromiter(
+                    (getattr(host_state, field) or 0
+                     for host_state in self.host_states),
+                    dtype=float, count=count)
+        # metric name -> column, NaN where the host lacks the metric
+        self._metrics = {}
+        for row, host_state in enumerate(self.host_states):
+            host_state.columns = self
+            host_state.column_row = row
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def update_row(self, host_state):
+        """Copy the resources of one host back into its row."""
+        row = host_state.column_row
+        for field in FIELDS:
+            self.columns[field][row] = getattr(host_state, field) or 0
+
+    def metric(self, name):
+        column = self._metrics.get(name)
+        if column is None:
+            column = numpy.fromiter(
+                    (host_state.metrics[name].value
+                     if name in host_state.metrics else numpy.nan
+                     for host_state in self.host_states),
+                    dtype=float, count=len(self.host_states))
+            self._metrics[name] = column
+        return column
+
+    def rows(self, host_states):
+        """Return the row numbers of host_states, in order."""
+        return numpy.fromiter((host_state.column_row
+                               for host_state in host_states),
+                              dtype=int, count=len(host_states))
+
+
+def get_columns(host_states):
+    """Return the HostColumns shared by host_states, or None.
+
+    None is returned when host_states is not a list, is empty or any of its
+    hosts is not in the same columnar copy as the others.
+    """
+    if not isinstance(host_states, list) or not host_states:
+        return None
+    columns = getattr(host_states[0], 'columns', None)
+    if columns is None:
+        return None
+    for host_state in host_states:
+        if getattr(host_state, 'columns', None) is not columns:
+            return None
+    return columns
+
+
+def select(host_states, passes, limit_name=None, limits=None):
+    """Return the host_states for which the boolean array passes is set.
+
+    If limit_name is given, the matching entry of the array limits is saved
+    in the limits of every selected host, except where it is NaN.
+    """
+    # Indexing numpy arrays one element at a time is slow, work on lists.
+    indices = numpy.flatnonzero(passes).tolist()
+    selected = [host_states[i] for i in indices]
+    if limit_name is not None:
+        limits = limits[indices].tolist()
+        for host_state, limit in zip(selected, limits):
+            # NaN is the only value not equal to itself
+            if limit == limit:
+                host_state.limits[limit_name] = limit
+    return selected
+
+
+def record_bounds(weigher, weights):
+    """Widen the minval and maxval of a weigher to cover an array of weights,
+    as BaseWeigher.weigh_objects() does one weight at a time.
+    """
+    if not len(weights):
+        return
+    lowest = float(weights.min())
+    highest = float(weights.max())
+    if weigher.minval is None or lowest < weigher.minval:
+        weigher.minval = lowest
+    if weigher.maxval is None or highest > weigher.maxval:
+        weigher.maxval = highest
@@ -22,6 +22,7 @@ import UserDict
 
 from oslo.config import cfg
 
+from nova.compute import cached_images
 from nova.compute import task_states
 from nova.compute import vm_states
 from nova import db
@@ -33,6 +34,8 @@ from nova.openstack.common import timeutils
 from nova.pci import pci_request
 from nova.pci import pci_stats
 from nova.scheduler import filters
+from nova.scheduler import host_attribute_index
+from nova.scheduler import host_columns
 from nova.scheduler import weights
 
 host_manager_opts = [
@@ -58,6 +61,34 @@ host_manager_opts = [
     cfg.ListOpt('scheduler_weight_classes',
                 default=['nova.scheduler.weights.all_weighers'],
                 help='Which weight class names to use for weighing hosts'),
+    cfg.IntOpt('cvrm_host_index_refresh_interval',
+               default=60,
+               help='Seconds between rebuilds of the host CVRM attribute '
+                    'index used by CvrmAttributeFilter'),
+    cfg.IntOpt('scheduler_host_state_full_refresh_interval',
+               default=0,
+               help='Seconds between full reloads of compute node state by '
+                    'the scheduler.  In between, only the compute nodes '
+                    'created, updated or deleted since the previous load '
+                    'are read from the database, and hosts whose compute '
+                    'service was deleted are dropped.  A full reload also '
+                    'catches rows missed because of clock skew between '
+                    'the hosts writing them, so a compute node row removed '
+                    'without being marked deleted stays schedulable for at '
+                    'most this long.  0 reloads every compute node on '
+                    'every request'),
+    cfg.BoolOpt('scheduler_adaptive_filter_order',
+                default=False,
+                help='Run the scheduler filters in the order of their '
+                     'measured cost per host rejected rather than in the '
+                     'configured order, once every filter has enough '
+                     'statistics'),
+    cfg.BoolOpt('scheduler_columnar_host_states',
+                default=False,
+                help='Keep the consumable resources of all hosts in NumPy '
+                     'arrays so that RamFilter, CoreFilter, DiskFilter and '
+                     'the RAM and metrics weighers process every host at '
+                     'once.  Ignored if NumPy is not installed'),
     ]
 
 CONF = cfg.CONF
@@ -131,6 +162,9 @@ class HostState(object):
         self.num_instances_by_project = {}
         self.num_instances_by_os_type = {}
         self.num_io_ops = 0
+        # Cache names of the images cached on the host, see
+        # nova.compute.cached_images:
+        self.cached_images = set()
 
         # Other information
         self.host_ip = None
@@ -146,6 +180,17 @@ class HostState(object):
         # Generic metrics from compute nodes
         self.metrics = {}
 
+        # Shared HostAttributeIndex, set when CvrmAttributeFilter is enabled
+        self.attribute_index = None
+
+        # Shared HostColumns and this host's row, set in columnar mode
+        self.columns = None
+        self.column_row = None
+
+        # Compute node row and the generation of it last seen
+        self.compute_node_id = None
+        self.generation = None
+
         self.updated = None
 
     def update_capabilities(self, capabilities=None, service=None):
@@ -207,6 +252,8 @@ class HostState(object):
         self.vcpus_total = compute['vcpus']
         self.vcpus_used = compute['vcpus_used']
         self.updated = compute['updated_at']
+        self.compute_node_id = compute.get('id')
+        self.generation = compute.get('generation')
         if 'pci_stats' in compute:
             self.pci_stats = pci_stats.PciDeviceStats(compute['pci_stats'])
         else:
@@ -263,6 +310,9 @@ class HostState(object):
 
         self.num_io_ops = int(self.stats.get('io_workload', 0))
 
+        self.cached_images = cached_images.decode(
+            self.stats.get(cached_images.STATS_KEY))
+
         # update metrics
         self._update_metrics_from_compute_node(compute)
 
@@ -315,6 +365,9 @@ class HostState(object):
                 task_states.IMAGE_BACKUP]:
             self.num_io_ops += 1
 
+        if self.columns is not None:
+            self.columns.update_row(self)
+
     def __repr__(self):
         return ("(%s, %s) ram:%s disk:%s io_ops:%s instances:%s" %
                 (self.host, self.nodename, self.free_ram_mb, self.free_disk_mb,
@@ -337,6 +390,12 @@ class HostManager(object):
         self.weight_handler = weights.HostWeightHandler()
         self.weight_classes = self.weight_handler.get_matching_classes(
                 CONF.scheduler_weight_classes)
+        self.host_attribute_index = None
+        # compute node id -> ((host, hypervisor_hostname), service id)
+        self._compute_nodes = {}
+        # Newest change seen in the compute node rows loaded so far
+        self._host_state_generation = None
+        self._last_full_refresh = None
 
     def _choose_host_filters(self, filter_cls_names):
         """Since the caller may specify which filters to use we need
@@ -432,50 +491,179 @@ class HostManager(object):
                     return name_to_cls_map.values()
             hosts = name_to_cls_map.itervalues()
 
+        if CONF.scheduler_adaptive_filter_order:
+            filter_classes = self.filter_handler.order_by_cost(filter_classes)
         return self.filter_handler.get_filtered_objects(filter_classes,
                 hosts, filter_properties, index)
 
+    def get_filter_stats(self):
+        """Return the pass ratio and run time measured for each filter."""
+        return self.filter_handler.get_filter_stats()
+
     def get_weighed_hosts(self, hosts, weight_properties):
         """Weigh the hosts."""
         return self.weight_handler.get_weighed_objects(self.weight_classes,
                 hosts, weight_properties)
 
+    def _get_host_attribute_index(self, context):
+        """Return the host CVRM attribute index, rebuilding it if stale.
+
+        The index is only maintained when CvrmAttributeFilter is enabled,
+        so that other deployments don't pay for the aggregate query.  When
+        the filter is only requested for some requests, it reads the
+        aggregates of each host itself.
+        """
+        if 'CvrmAttributeFilter' not in CONF.scheduler_default_filters:
+            return None
+        index = self.host_attribute_index
+        if (index is None or timeutils.utcnow_ts() - index.created_at >=
+                CONF.cvrm_host_index_refresh_interval):
+            aggregates = db.aggregate_get_all(context)
+            index = host_attribute_index.HostAttributeIndex.from_aggregates(
+                aggregates)
+            self.host_attribute_index = index
+        return index
+
     def get_all_host_states(self, context):
         """Returns a list of HostStates that represents all the hosts
         the HostManager knows about. Also, each of the consumable resources
         in HostState are pre-populated and adjusted based on data in the db.
         """
 
+        attribute_index = self._get_host_attribute_index(context)
+
+        if self._needs_full_refresh():
+            self._refresh_all_host_states(context)
+        else:
+            self._refresh_changed_host_states(context)
+
+        for host_state in self.host_state_map.itervalues():
+            host_state.attribute_index = attribute_index
+
+        if (CONF.scheduler_columnar_host_states and
+                host_columns.available()):
+            host_columns.HostColumns(self.host_state_map.itervalues())
+
+        return self.host_state_map.itervalues()
+
+    def _needs_full_refresh(self):
+        interval = CONF.scheduler_host_state_full_refresh_interval
+        if interval <= 0 or self._host_state_generation is None:
+            return True
+        return timeutils.utcnow_ts() - self._last_full_refresh >= interval
+
+    @staticmethod
+    def _newest_change(compute_nodes, generation):
+        for compute in compute_nodes:
+            for key in ('created_at', 'updated_at', 'deleted_at'):
+                changed_at = compute.get(key)
+                if changed_at and (generation is None or
+                                   changed_at > generation):
+                    generation = changed_at
+        return generation
+
+    def _update_host_state(self, compute):
+        """Create or update the HostState of a compute node row.
+
+        Returns the state key of the host, or None if the compute node has
+        no service.
+        """
+        service = compute['service']
+        if not service:
+            LOG.warn(_("No service for compute ID %s") % compute['id'])
+            return None
+        host = service['host']
+        node = compute.get('hypervisor_hostname')
+        state_key = (host, node)
+        capabilities = self.service_states.get(state_key, None)
+        host_state = self.host_state_map.get(state_key)
+        if host_state:
+            host_state.update_capabilities(capabilities,
+                                           dict(service.iteritems()))
+        else:
+            host_state = self.host_state_cls(host, node,
+                    capabilities=capabilities,
+                    service=dict(service.iteritems()))
+            self.host_state_map[state_key] = host_state
+        host_state.update_from_compute_node(compute)
+        self._compute_nodes[compute['id']] = (state_key,
+                                              compute.get('service_id'))
+        return state_key
+
+    def refresh_host_state(self, context, host_state):
+        """Reload a host state from its compute node row, even if resources
+        were consumed from it since the row was last written.
+        """
+        compute = db.compute_node_get(context, host_state.compute_node_id)
+        host_state.updated = None
+        host_state.update_from_compute_node(compute)
+        if host_state.columns is not None:
+            host_state.columns.update_row(host_state)
+
+    def _remove_host_state(self, state_key):
+        host, node = state_key
+        LOG.info(_("Removing dead compute node %(host)s:%(node)s "
+                   "from scheduler") % {'host': host, 'node': node})
+        del self.host_state_map[state_key]
+
+    def _remove_compute_node(self, compute_id):
+        entry = self._compute_nodes.pop(compute_id, None)
+        if entry and entry[0] in self.host_state_map:
+            self._remove_host_state(entry[0])
+
+    def _refresh_all_host_states(self, context):
         # Get resource usage across the available compute nodes:
         compute_nodes = db.compute_node_get_all(context)
+        self._compute_nodes = {}
         seen_nodes = set()
         for compute in compute_nodes:
-            service = compute['service']
-            if not service:
-                LOG.warn(_("No service for compute ID %s") % compute['id'])
-                continue
-            host = service['host']
-            node = compute.get('hypervisor_hostname')
-            state_key = (host, node)
-            capabilities = self.service_states.get(state_key, None)
-            host_state = self.host_state_map.get(state_key)
-            if host_state:
-                host_state.update_capabilities(capabilities,
-                                               dict(service.iteritems()))
-            else:
-                host_state = self.host_state_cls(host, node,
-                        capabilities=capabilities,
-                        service=dict(service.iteritems()))
-                self.host_state_map[state_key] = host_state
-            host_state.update_from_compute_node(compute)
-            seen_nodes.add(state_key)
+            state_key = self._update_host_state(compute)
+            if state_key:
+                seen_nodes.add(state_key)
 
         # remove compute nodes from host_state_map if they are not active
         dead_nodes = set(self.host_state_map.keys()) - seen_nodes
         for state_key in dead_nodes:
-            host, node = state_key
-            LOG.info(_("Removing dead compute node %(host)s:%(node)s "
-                       "from scheduler") % {'host': host, 'node': node})
-            del self.host_state_map[state_key]
+            self._remove_host_state(state_key)
 
-        return self.host_state_map.itervalues()
+        self._host_state_generation = self._newest_change(compute_nodes,
+                                                          None)
+        self._last_full_refresh = timeutils.utcnow_ts()
+
+    def _refresh_changed_host_states(self, context):
+        """Apply the compute node rows changed since the last load.
+
+        Hosts whose compute node did not change keep their state, including
+        the resources consumed by instances scheduled to them since then,
+        until the compute node reports again.
+        """
+        changes = db.compute_node_get_all_changed_since(
+                context, self._host_state_generation)
+        compute_nodes = changes['compute_nodes']
+        # Every compute service that is not deleted.
+        services = dict((service['id'], service)
+                        for service in changes['services'])
+
+        # Deleted rows first, a node may have been deleted and recreated.
+        for compute in compute_nodes:
+            if compute['deleted']:
+                self._remove_compute_node(compute['id'])
+        for compute in compute_nodes:
+            if not compute['deleted']:
+                self._update_host_state(compute)
+
+        for compute_id, (state_key, service_id) in \
+                self._compute_nodes.items():
+            service = services.get(service_id)
+            if service is None:
+                self._remove_compute_node(compute_id)
+                continue
+            # Services report far more often than compute nodes are updated.
+            host_state = self.host_state_map.get(state_key)
+            if host_state:
+                host_state.update_capabilities(
+                        self.service_states.get(state_key),
+                        dict(service.iteritems()))
+
+        self._host_state_generation = self._newest_change(
+                compute_nodes, self._host_state_generation)
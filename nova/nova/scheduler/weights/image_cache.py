@@ -0,0 +1,56 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Image Cache Weigher.  Weigh hosts by whether they have the image cached.
+
+Hosts that already hold the image of the instance in their local image cache
+do not need to download it.  This needs the compute hosts to report their
+cached images, see the report_cached_images option.  A negative
+'image_cache_weight_multiplier' prefers hosts without the image instead.
+"""
+
+from oslo.config import cfg
+
+from nova.compute import cached_images
+from nova.scheduler import weights
+
+image_cache_weight_opts = [
+        cfg.FloatOpt('image_cache_weight_multiplier',
+                     default=1.0,
+                     help='Multiplier used for weighing hosts that have the '
+                          'image of the instance cached.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(image_cache_weight_opts)
+
+
+class ImageCacheWeigher(weights.BaseHostWeigher):
+    minval = 0
+    maxval = 1
+
+    def weight_multiplier(self):
+        """Override the weight multiplier."""
+        return CONF.image_cache_weight_multiplier
+
+    def _weigh_object(self, host_state, weight_properties):
+        """Higher weights win.  We want hosts with the image cached."""
+        request_spec = weight_properties.get('request_spec') or {}
+        instance_properties = request_spec.get('instance_properties') or {}
+        image_ref = instance_properties.get('image_ref')
+        if not image_ref:
+            # Booted from a volume.
+            return 0.0
+        if cached_images.cache_name(image_ref) in host_state.cached_images:
+            return 1.0
+        return 0.0
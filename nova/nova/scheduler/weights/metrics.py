@@ -29,6 +29,7 @@ in the configuration file as the followings:
 from oslo.config import cfg
 
 from nova import exception
+from nova.scheduler import host_columns
 from nova.scheduler import utils
 from nova.scheduler import weights
 
@@ -102,3 +103,33 @@ class MetricsWeigher(weights.BaseHostWeigher):
                         return CONF.metrics.weight_of_unavailable
 
         return value
+
+    def weigh_objects(self, weighed_obj_list, weight_properties):
+        host_states = [weighed_obj.obj for weighed_obj in weighed_obj_list]
+        columns = host_columns.get_columns(host_states)
+        if columns is None:
+            return super(MetricsWeigher, self).weigh_objects(
+                    weighed_obj_list, weight_properties)
+
+        numpy = host_columns.numpy
+        rows = columns.rows(host_states)
+        weights = numpy.zeros(len(rows))
+        unavailable = numpy.zeros(len(rows), dtype=bool)
+        for (name, ratio) in self.setting:
+            values = columns.metric(name)[rows]
+            missing = numpy.isnan(values)
+            if missing.any():
+                if CONF.metrics.required:
+                    host_state = host_states[numpy.flatnonzero(missing)[0]]
+                    raise exception.ComputeHostMetricNotFound(
+                            host=host_state.host,
+                            node=host_state.nodename,
+                            name=name)
+                if ratio * self.weight_multiplier() != 0:
+                    unavailable |= missing
+                values = numpy.where(missing, 0.0, values)
+            weights += values * ratio
+        weights[unavailable] = CONF.metrics.weight_of_unavailable
+
+        host_columns.record_bounds(self, weights)
+        return weights.tolist()
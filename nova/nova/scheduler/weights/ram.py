@@ -22,6 +22,7 @@ number and the weighing has the opposite effect of the default.
 
 from oslo.config import cfg
 
+from nova.scheduler import host_columns
 from nova.scheduler import weights
 
 ram_weight_opts = [
@@ -45,3 +46,14 @@ class RAMWeigher(weights.BaseHostWeigher):
     def _weigh_object(self, host_state, weight_properties):
         """Higher weights win.  We want spreading to be the default."""
         return host_state.free_ram_mb
+
+    def weigh_objects(self, weighed_obj_list, weight_properties):
+        host_states = [weighed_obj.obj for weighed_obj in weighed_obj_list]
+        columns = host_columns.get_columns(host_states)
+        if columns is None:
+            return super(RAMWeigher, self).weigh_objects(weighed_obj_list,
+                                                         weight_properties)
+
+        weights = columns['free_ram_mb'][columns.rows(host_states)]
+        host_columns.record_bounds(self, weights)
+        return weights.tolist()
@@ -0,0 +1,117 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import webob
+
+from nova.api.openstack.compute.contrib import attributes
+from nova.api.openstack.compute.contrib import scopes
+from nova.compute import api as compute_api
+from nova import exception
+from nova.objects import attribute as attribute_obj
+from nova.objects import scope as scope_obj
+from nova import test
+from nova.tests.api.openstack import fakes
+
+
+def fake_create_attributes(self, context, names):
+    return [attribute_obj.Attribute(id=i, name=name)
+            for i, name in enumerate(names)]
+
+
+def fake_create_scopes(self, context, values):
+    return [scope_obj.Scope(id=i, name=name, value=value)
+            for i, (name, value) in enumerate(values)]
+
+
+class AttributesBulkTest(test.NoDBTestCase):
+    def setUp(self):
+        super(AttributesBulkTest, self).setUp()
+        self.controller = attributes.AttributeController()
+        self.req = fakes.HTTPRequest.blank('/v2/fake/os-attributes/'
+                                           'bulk_create')
+
+    def test_bulk_create(self):
+        self.stubs.Set(compute_api.AttributeAPI, 'create_attributes',
+                       fake_create_attributes)
+        body = {'attributes': [{'name': 'color'}, {'name': 'level'}]}
+        res = self.controller.bulk_create(self.req, body)
+        self.assertEqual([{'id': 0, 'name': 'color'},
+                          {'id': 1, 'name': 'level'}], res['attributes'])
+
+    def test_bulk_create_invalid_body(self):
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.bulk_create, self.req,
+                          {'attributes': [{'value': 'red'}]})
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.bulk_create, self.req,
+                          {'attributes': []})
+
+    def test_bulk_create_duplicate(self):
+        def fake_create(self, context, names):
+            raise exception.AttributeExists(attribute_name=names[0])
+        self.stubs.Set(compute_api.AttributeAPI, 'create_attributes',
+                       fake_create)
+        self.assertRaises(webob.exc.HTTPConflict,
+                          self.controller.bulk_create, self.req,
+                          {'attributes': [{'name': 'color'}]})
+
+    def test_bulk_delete(self):
+        deleted = []
+        self.stubs.Set(compute_api.AttributeAPI, 'delete_attributes',
+                       lambda s, c, ids: deleted.extend(ids))
+        res = self.controller.bulk_delete(self.req, {'ids': [1, 2]})
+        self.assertEqual(202, res.status_int)
+        self.assertEqual([1, 2], deleted)
+
+    def test_bulk_delete_not_found(self):
+        def fake_delete(self, context, ids):
+            raise exception.AttributeNotFound(name=ids)
+        self.stubs.Set(compute_api.AttributeAPI, 'delete_attributes',
+                       fake_delete)
+        self.assertRaises(webob.exc.HTTPNotFound,
+                          self.controller.bulk_delete, self.req,
+                          {'ids': [1]})
+
+
+class ScopesBulkTest(test.NoDBTestCase):
+    def setUp(self):
+        super(ScopesBulkTest, self).setUp()
+        self.controller = scopes.ScopeController()
+        self.req = fakes.HTTPRequest.blank('/v2/fake/os-scopes/bulk_create')
+        self.stubs.Set(compute_api.AttributeAPI, 'attribute_exists',
+                       lambda s, c, name: name == 'color')
+
+    def test_bulk_create(self):
+        self.stubs.Set(compute_api.ScopeAPI, 'create_scopes',
+                       fake_create_scopes)
+        body = {'scopes': [{'name': 'color', 'value': 'red'},
+                           {'name': 'color', 'value': 'blue'}]}
+        res = self.controller.bulk_create(self.req, body)
+        self.assertEqual([{'id': 0, 'name': 'color', 'value': 'red'},
+                          {'id': 1, 'name': 'color', 'value': 'blue'}],
+                         res['scopes'])
+
+    def test_bulk_create_unknown_attribute(self):
+        self.stubs.Set(compute_api.ScopeAPI, 'create_scopes',
+                       fake_create_scopes)
+        body = {'scopes': [{'name': 'color', 'value': 'red'},
+                           {'name': 'level', 'value': 'high'}]}
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.bulk_create, self.req, body)
+
+    def test_bulk_delete(self):
+        deleted = []
+        self.stubs.Set(compute_api.ScopeAPI, 'delete_scopes',
+                       lambda s, c, ids: deleted.extend(ids))
+        res = self.controller.bulk_delete(self.req, {'ids': [3]})
+        self.assertEqual(202, res.status_int)
+        self.assertEqual([3], deleted)
@@ -105,6 +105,19 @@ class QuotaClassSetsTest(test.TestCase):
 
         self.assertEqual(res_dict, body)
 
+    def test_quotas_update_invalidates_limits(self):
+        invalidated = []
+        self.stubs.Set(quota_classes.QUOTAS, 'invalidate_limits',
+                       lambda **kwargs: invalidated.append(kwargs))
+        body = {'quota_class_set': {'instances': 50}}
+
+        req = fakes.HTTPRequest.blank(
+            '/v2/fake4/os-quota-class-sets/test_class',
+            use_admin_context=True)
+        self.controller.update(req, 'test_class', body)
+
+        self.assertEqual([{'quota_class': 'test_class'}], invalidated)
+
     def test_quotas_update_as_user(self):
         body = {'quota_class_set': {'instances': 50, 'cores': 50,
                                     'ram': 51200, 'floating_ips': 10,
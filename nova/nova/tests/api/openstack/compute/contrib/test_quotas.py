@@ -133,6 +133,21 @@ class QuotaSetsTest(test.TestCase):
 
         self.assertEqual(res_dict, body)
 
+    def test_quotas_update_invalidates_limits(self):
+        self.ext_mgr.is_loaded('os-extended-quotas').AndReturn(True)
+        self.ext_mgr.is_loaded('os-user-quotas').AndReturn(True)
+        self.mox.ReplayAll()
+        invalidated = []
+        self.stubs.Set(quota.QUOTAS, 'invalidate_limits',
+                       lambda **kwargs: invalidated.append(kwargs))
+        body = {'quota_set': {'instances': 50}}
+
+        req = fakes.HTTPRequest.blank('/v2/fake4/os-quota-sets/update_me',
+                                      use_admin_context=True)
+        self.controller.update(req, 'update_me', body)
+
+        self.assertEqual([{'project_id': 'update_me'}], invalidated)
+
     def test_quotas_update_zero_value_as_admin(self):
         self.ext_mgr.is_loaded('os-extended-quotas').AndReturn(True)
         self.ext_mgr.is_loaded('os-user-quotas').AndReturn(True)
@@ -0,0 +1,57 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the digest of cached images."""
+
+from nova.compute import cached_images
+from nova import test
+
+
+class CachedImagesTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(CachedImagesTestCase, self).setUp()
+        self.names = [cached_images.cache_name('image%d' % i)
+                      for i in xrange(50)]
+        self.others = [cached_images.cache_name('other%d' % i)
+                       for i in xrange(1000)]
+
+    def test_cache_name(self):
+        self.assertEqual('356a192b7913b04c54574d18c28d46e6395428ab',
+                         cached_images.cache_name(1))
+
+    def test_list(self):
+        value = cached_images.encode(self.names)
+        self.assertEqual(set(self.names), cached_images.decode(value))
+
+    def test_empty(self):
+        self.assertEqual(set(), cached_images.decode(None))
+        self.assertEqual(set(), cached_images.decode(
+            cached_images.encode([])))
+        bloom = cached_images.decode(cached_images.encode([], 64))
+        self.assertNotIn(self.names[0], bloom)
+
+    def test_bloom(self):
+        value = cached_images.encode(self.names, 1024)
+        self.assertTrue(value.startswith('bloom:'))
+        bloom = cached_images.decode(value)
+        self.assertEqual(1024, bloom.bits)
+        for name in self.names:
+            self.assertIn(name, bloom)
+        false_positives = len([name for name in self.others
+                               if name in bloom])
+        self.assertTrue(false_positives < 100)
+
+    def test_bloom_hashes(self):
+        self.assertEqual(5, cached_images.BloomFilter.for_names(
+            self.names, 4096).hashes)
+        self.assertEqual(1, cached_images.BloomFilter.for_names(
+            self.names, 50).hashes)
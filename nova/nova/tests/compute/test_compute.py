@@ -41,6 +41,7 @@ from nova import availability_zones
 from nova import block_device
 from nova import compute
 from nova.compute import api as compute_api
+from nova.compute import cvrm
 from nova.compute import flavors
 from nova.compute import manager as compute_manager
 from nova.compute import power_state
@@ -5945,6 +5946,50 @@ class ComputeTestCase(BaseTestCase):
         # Stays the same because we didn't find anything to process
         self.assertEqual(3, call_info['get_nw_info'])
 
+    def test_heal_instance_info_cache_bulk(self):
+        self.flags(heal_instance_info_cache_interval=-1,
+                   heal_instance_info_cache_batch_size=3)
+        ctxt = context.get_admin_context()
+
+        instance_map = {}
+        instances = []
+        for x in xrange(5):
+            inst_uuid = 'fake-uuid-%s' % x
+            instance_map[inst_uuid] = fake_instance.fake_db_instance(
+                uuid=inst_uuid, host=CONF.host, created_at=None)
+            instances.append(instance_map[inst_uuid])
+        healed = []
+
+        def fake_instance_get_all_by_host(context, host,
+                                          columns_to_join, use_slave=False):
+            return instances[:]
+
+        def fake_instance_get_by_uuid(context, instance_uuid,
+                                      columns_to_join, use_slave=False):
+            return instance_map[instance_uuid]
+
+        def fake_get_instance_nw_info_bulk(context, instances,
+                                           use_slave=False):
+            healed.append([instance['uuid'] for instance in instances])
+
+        def fake_get_instance_nw_info(context, instance, use_slave=False):
+            healed.append([instance['uuid']])
+
+        self.stubs.Set(db, 'instance_get_all_by_host',
+                fake_instance_get_all_by_host)
+        self.stubs.Set(db, 'instance_get_by_uuid',
+                fake_instance_get_by_uuid)
+        self.stubs.Set(self.compute.network_api, 'get_instance_nw_info_bulk',
+                fake_get_instance_nw_info_bulk)
+        self.stubs.Set(self.compute, '_get_instance_nw_info',
+                fake_get_instance_nw_info)
+
+        self.compute._heal_instance_info_cache(ctxt)
+        self.compute._heal_instance_info_cache(ctxt)
+        self.assertEqual([['fake-uuid-0', 'fake-uuid-1', 'fake-uuid-2'],
+                          ['fake-uuid-3', 'fake-uuid-4']], healed)
+        self.assertEqual(0, len(self.compute._instance_uuids_to_heal))
+
     def test_poll_rescued_instances(self):
         timed_out_time = timeutils.utcnow() - datetime.timedelta(minutes=5)
         not_timed_out_time = timeutils.utcnow()
@@ -6533,9 +6578,13 @@ class ComputeTestCase(BaseTestCase):
         self._create_fake_instance({'host': self.compute.host})
         self._create_fake_instance({'host': self.compute.host})
         self._create_fake_instance({'host': self.compute.host})
+        self.mox.StubOutWithMock(self.compute.driver,
+                                 'list_instance_power_states')
         self.mox.StubOutWithMock(self.compute.driver, 'get_info')
         self.mox.StubOutWithMock(self.compute, '_sync_instance_power_state')
 
+        self.compute.driver.list_instance_power_states().AndRaise(
+            NotImplementedError())
         # Check to make sure task continues on error.
         self.compute.driver.get_info(mox.IgnoreArg()).AndRaise(
             exception.InstanceNotFound(instance_id='fake-uuid'))
@@ -6556,6 +6605,53 @@ class ComputeTestCase(BaseTestCase):
         self.mox.ReplayAll()
         self.compute._sync_power_states(ctxt)
 
+    def test_sync_power_states_bulk(self):
+        ctxt = self.context.elevated()
+        in_sync = self._create_fake_instance(
+            {'host': self.compute.host, 'vm_state': vm_states.ACTIVE,
+             'power_state': power_state.RUNNING})
+        changed = self._create_fake_instance(
+            {'host': self.compute.host, 'vm_state': vm_states.ACTIVE,
+             'power_state': power_state.RUNNING})
+        gone = self._create_fake_instance(
+            {'host': self.compute.host, 'vm_state': vm_states.ACTIVE,
+             'power_state': power_state.RUNNING})
+        self.mox.StubOutWithMock(self.compute.driver,
+                                 'list_instance_power_states')
+        self.mox.StubOutWithMock(self.compute.driver, 'get_info')
+        self.mox.StubOutWithMock(self.compute, '_sync_instance_power_state')
+
+        self.compute.driver.list_instance_power_states().AndReturn(
+            {in_sync['name']: power_state.RUNNING,
+             changed['name']: power_state.SHUTDOWN})
+        self.compute._sync_instance_power_state(ctxt,
+            mox.ContainsKeyValue('uuid', changed['uuid']),
+            power_state.SHUTDOWN, use_slave=True)
+        self.compute._sync_instance_power_state(ctxt,
+            mox.ContainsKeyValue('uuid', gone['uuid']),
+            power_state.NOSTATE, use_slave=True)
+        self.mox.ReplayAll()
+        self.compute._sync_power_states(ctxt)
+
+    def test_sync_power_states_bulk_vm_state_mismatch(self):
+        ctxt = self.context.elevated()
+        instance = self._create_fake_instance(
+            {'host': self.compute.host, 'vm_state': vm_states.STOPPED,
+             'power_state': power_state.RUNNING})
+        self.mox.StubOutWithMock(self.compute.driver,
+                                 'list_instance_power_states')
+        self.mox.StubOutWithMock(self.compute, '_sync_instance_power_state')
+
+        # The power state was already recorded, but the instance should be
+        # stopped.
+        self.compute.driver.list_instance_power_states().AndReturn(
+            {instance['name']: power_state.RUNNING})
+        self.compute._sync_instance_power_state(ctxt,
+            mox.ContainsKeyValue('uuid', instance['uuid']),
+            power_state.RUNNING, use_slave=True)
+        self.mox.ReplayAll()
+        self.compute._sync_power_states(ctxt)
+
     def _test_lifecycle_event(self, lifecycle_event, power_state):
         instance = self._create_fake_instance()
         uuid = instance['uuid']
@@ -8823,6 +8919,35 @@ class ComputeAPITestCase(BaseTestCase):
         self.assertTrue(called.get('fake_rpc_reserve_block_device_name'))
         self.assertTrue(called.get('fake_rpc_attach_volume'))
 
+    def test_attach_volume_constraint_violation(self):
+        self.flags(cvrm_enforce_attach_constraints=True)
+        instance = self._create_fake_instance()
+        fake_volume = {'id': 'fake-volume-id',
+                       'volume_metadata': {'color': 'blue'}}
+        fake_bdm = mock.MagicMock()
+
+        with contextlib.nested(
+            mock.patch.object(cinder.API, 'get', return_value=fake_volume),
+            mock.patch.object(cinder.API, 'check_attach'),
+            mock.patch.object(compute_rpcapi.ComputeAPI,
+                'reserve_block_device_name', return_value='/dev/vdb'),
+            mock.patch.object(block_device_obj.BlockDeviceMapping,
+                'get_by_volume_id', return_value=fake_bdm),
+            mock.patch.object(cvrm.ConstraintEngine, 'permits_attach',
+                return_value=False),
+            mock.patch.object(compute_rpcapi.ComputeAPI, 'attach_volume')
+        ) as (mock_get, mock_check_attach, mock_reserve_bdm, mock_bdm_get,
+                mock_permits, mock_attach):
+            self.assertRaises(exception.AttachConstraintViolation,
+                              self.compute_api.attach_volume,
+                              self.context, instance, 'fake-volume-id',
+                              '/dev/vdb')
+            mock_permits.assert_called_once_with(self.context, instance,
+                                                 fake_volume)
+            self.assertFalse(mock_check_attach.called)
+            self.assertFalse(mock_attach.called)
+            fake_bdm.destroy.assert_called_once_with(self.context)
+
     def test_detach_volume(self):
         # Ensure volume can be detached from instance
         called = {}
@@ -15,6 +15,7 @@
 """
 Tests For Compute w/ Cells
 """
+import contextlib
 import functools
 
 import mock
@@ -23,7 +24,9 @@ from oslo.config import cfg
 from nova.cells import manager
 from nova.compute import api as compute_api
 from nova.compute import cells_api as compute_cells_api
+from nova.compute import cvrm
 from nova import db
+from nova import exception
 from nova.openstack.common import jsonutils
 from nova import quota
 from nova.tests.compute import test_compute
@@ -148,6 +151,30 @@ class CellsComputeAPITestCase(test_compute.ComputeAPITestCase):
     def test_evacuate(self):
         self.skipTest("Test is incompatible with cells.")
 
+    def test_attach_volume_constraint_violation(self):
+        # Cells checks the constraints before any device is reserved.
+        self.flags(cvrm_enforce_attach_constraints=True)
+        instance = self._create_fake_instance()
+        fake_volume = {'id': 'fake-volume-id',
+                       'volume_metadata': {'color': 'blue'}}
+
+        with contextlib.nested(
+            mock.patch.object(self.compute_api.volume_api, 'get',
+                              return_value=fake_volume),
+            mock.patch.object(self.compute_api.volume_api, 'check_attach'),
+            mock.patch.object(cvrm.ConstraintEngine, 'permits_attach',
+                              return_value=False),
+            mock.patch.object(self.compute_api, '_call_to_cells')
+        ) as (mock_get, mock_check_attach, mock_permits, mock_call):
+            self.assertRaises(exception.AttachConstraintViolation,
+                              self.compute_api.attach_volume,
+                              self.context, instance, 'fake-volume-id',
+                              '/dev/vdb')
+            mock_permits.assert_called_once_with(self.context, instance,
+                                                 fake_volume)
+            self.assertFalse(mock_check_attach.called)
+            self.assertFalse(mock_call.called)
+
     def test_delete_instance_no_cell(self):
         cells_rpcapi = self.compute_api.cells_rpcapi
         self.mox.StubOutWithMock(cells_rpcapi,
@@ -0,0 +1,100 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the compiled CVRM constraint engine."""
+
+import mock
+
+from nova.compute import cvrm
+from nova import context
+from nova.objects import attribute as attribute_obj
+from nova.objects import scope as scope_obj
+from nova import test
+
+ATTRIBUTES = {'color': {}, 'level': {}}
+SCOPES = {'color': {'red': {}, 'blue': {}},
+          'level': {'high': {}, 'low': {}}}
+
+
+class ProjectPolicyTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(ProjectPolicyTestCase, self).setUp()
+        self.policy = cvrm.ProjectPolicy('fake-project', ATTRIBUTES, SCOPES)
+
+    def test_same_values_permitted(self):
+        self.assertTrue(self.policy.permits({'color': 'red'},
+                                            {'color': 'red'}))
+        self.assertTrue(self.policy.permits(
+            {'color': 'red', 'level': 'low'},
+            {'level': 'low', 'color': 'red'}))
+
+    def test_different_values_refused(self):
+        self.assertFalse(self.policy.permits({'color': 'red'},
+                                             {'color': 'blue'}))
+
+    def test_one_sided_attribute_refused(self):
+        self.assertFalse(self.policy.permits({'color': 'red'}, {}))
+        self.assertFalse(self.policy.permits(
+            {'color': 'red'}, {'color': 'red', 'level': 'high'}))
+
+    def test_value_outside_scope_refused(self):
+        self.assertFalse(self.policy.permits({'color': 'green'},
+                                             {'color': 'green'}))
+
+    def test_unknown_keys_ignored(self):
+        self.assertTrue(self.policy.permits({'owner': 'a'}, {'owner': 'b'}))
+        self.assertEqual(0, self.policy.encode(None))
+
+
+class ConstraintEngineTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(ConstraintEngineTestCase, self).setUp()
+        self.context = context.RequestContext('fake-user', 'fake-project')
+        self.engine = cvrm.ConstraintEngine()
+        self.instance = {'project_id': 'fake-project',
+                         'metadata': {'color': 'red'}}
+
+    @mock.patch.object(scope_obj, 'get_project_scopes', return_value=SCOPES)
+    @mock.patch.object(attribute_obj, 'get_project_attributes',
+                       return_value=ATTRIBUTES)
+    def test_policy_compiled_once(self, mock_attributes, mock_scopes):
+        for i in range(3):
+            self.assertTrue(self.engine.permits_attach(
+                self.context, self.instance,
+                {'volume_metadata': {'color': 'red'}}))
+        self.assertEqual(1, mock_attributes.call_count)
+        self.assertEqual(1, mock_scopes.call_count)
+
+    @mock.patch.object(scope_obj, 'get_project_scopes', return_value=SCOPES)
+    @mock.patch.object(attribute_obj, 'get_project_attributes',
+                       return_value=ATTRIBUTES)
+    def test_rebuilt_on_invalidation(self, mock_attributes, mock_scopes):
+        self.engine.get_policy(self.context, 'fake-project')
+        attribute_obj.invalidate_cache('fake-project')
+        self.engine.get_policy(self.context, 'fake-project')
+        self.assertEqual(2, mock_attributes.call_count)
+
+    def test_engines_share_one_hook(self):
+        hooks = list(attribute_obj._INVALIDATION_HOOKS)
+        engine = cvrm.ConstraintEngine()
+        self.assertEqual(hooks, attribute_obj._INVALIDATION_HOOKS)
+        self.assertIn(engine, cvrm._ENGINES)
+        count = len(cvrm._ENGINES)
+        del engine
+        self.assertEqual(count - 1, len(cvrm._ENGINES))
+
+    @mock.patch.object(attribute_obj, 'get_project_attributes')
+    def test_no_metadata_skips_policy(self, mock_attributes):
+        self.assertTrue(self.engine.permits_attach(
+            self.context, {'project_id': 'fake-project', 'metadata': []},
+            {'id': 'fake-volume'}))
+        self.assertFalse(mock_attributes.called)
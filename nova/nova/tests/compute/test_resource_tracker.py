@@ -15,17 +15,20 @@
 
 """Tests for compute resource tracking."""
 
+import datetime
 import mock
 import uuid
 
 from oslo.config import cfg
 
+from nova.compute import cached_images
 from nova.compute import flavors
 from nova.compute import resource_tracker
 from nova.compute import task_states
 from nova.compute import vm_states
 from nova import context
 from nova import db
+from nova import exception
 from nova.objects import base as obj_base
 from nova.objects import migration as migration_obj
 from nova.openstack.common import jsonutils
@@ -421,6 +424,7 @@ class BaseTrackerTestCase(BaseTestCase):
 
         self.updated = False
         self.deleted = False
+        self.compute = None
 
         self.tracker = self._tracker()
         self._migrations = {}
@@ -440,15 +444,21 @@ class BaseTrackerTestCase(BaseTestCase):
         self.limits = self._limits()
 
     def _fake_service_get_by_compute_host(self, ctx, host):
-        self.compute = self._create_compute_node()
-        self.service = self._create_service(host, compute=self.compute)
+        # The tracker reads the service again to check for claims, so the
+        # compute node record must persist between calls:
+        if self.compute is None:
+            self.compute = self._create_compute_node()
+            self.service = self._create_service(host, compute=self.compute)
         return self.service
 
     def _fake_compute_node_update(self, ctx, compute_node_id, values,
             prune_stats=False):
         self.updated = True
+        self.updated_values = dict(values)
         values['stats'] = [{"key": "num_instances", "value": "1"}]
 
+        for key, delta in values.pop('usage_deltas', {}).iteritems():
+            self.compute[key] += delta
         self.compute.update(values)
         return self.compute
 
@@ -519,6 +529,241 @@ class TrackerTestCase(BaseTrackerTestCase):
         self.assertFalse(self.tracker.disabled)
         self.assertTrue(self.updated)
 
+    def test_update_skips_unchanged_compute_node(self):
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertEqual({}, self.updated_values)
+
+    def test_update_skipped_still_saves_pci(self):
+        self.tracker.pci_tracker = mock.Mock()
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertEqual({}, self.updated_values)
+        self.tracker.pci_tracker.save.assert_called_once_with(self.context)
+
+    def test_update_skipped_bumps_updated_at(self):
+        updated_at = timeutils.utcnow()
+
+        def fake_update(ctx, compute_node_id, values, prune_stats=False):
+            self.updated_values = dict(values)
+            self.compute['updated_at'] = updated_at
+            return self.compute
+
+        self.stubs.Set(db, 'compute_node_update', fake_update)
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertEqual({}, self.updated_values)
+        self.assertEqual(jsonutils.to_primitive(updated_at),
+                         self.tracker.compute_node['updated_at'])
+
+        # The new updated_at is not written back as a change:
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertEqual({}, self.updated_values)
+
+    def test_update_only_changed_values(self):
+        self.tracker.compute_node['current_workload'] = 3
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertEqual({'current_workload': 3}, self.updated_values)
+
+    def test_forced_update_writes_claimed_fields(self):
+        self.tracker._update(self.context, self.tracker.compute_node,
+                             force=True)
+        self.assertEqual(set(resource_tracker.CLAIMED_FIELDS) &
+                         set(self.tracker.compute_node),
+                         set(self.updated_values))
+
+    def test_write_stats(self):
+        self.flags(resource_tracker_full_audit_interval=600)
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.tracker.compute_node['current_workload'] = 3
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.tracker.update_available_resource(self.context)
+
+        stats = self.tracker.last_write_stats
+        self.assertEqual(1, stats['writes'])
+        self.assertEqual(2, stats['skipped'])
+        self.assertEqual(2, stats['heartbeats'])
+        self.assertEqual(len(jsonutils.dumps({'current_workload': 3})),
+                         stats['bytes'])
+        self.assertEqual({'writes': 0, 'skipped': 0, 'heartbeats': 0,
+                          'bytes': 0},
+                         self.tracker.write_stats)
+
+    def test_report_cached_images(self):
+        self.flags(report_cached_images=True)
+        cached_images = ['bb', 'aa']
+        self.stubs.Set(self.tracker.driver, 'get_cached_images',
+                       lambda: cached_images)
+
+        self.tracker.update_available_resource(self.context)
+        stats = jsonutils.loads(self.updated_values['stats'])
+        self.assertEqual('aa,bb', stats['cached_images'])
+
+        # Between full audits too:
+        self.flags(resource_tracker_full_audit_interval=600)
+        cached_images.append('cc')
+        self.tracker.update_available_resource(self.context)
+        stats = jsonutils.loads(self.updated_values['stats'])
+        self.assertEqual('aa,bb,cc', stats['cached_images'])
+
+    def test_report_cached_images_bloom(self):
+        self.flags(report_cached_images=True, cached_images_bloom_bits=64)
+        name = cached_images.cache_name('image')
+        self.stubs.Set(self.tracker.driver, 'get_cached_images',
+                       lambda: [name])
+
+        self.tracker.update_available_resource(self.context)
+        stats = jsonutils.loads(self.updated_values['stats'])
+        self.assertIn(name, cached_images.decode(stats['cached_images']))
+
+    def test_update_keeps_own_usage(self):
+        # The scheduler claims an instance on the compute node record:
+        self.compute['memory_mb_used'] += 3
+        self.compute['free_ram_mb'] -= 3
+
+        self.tracker.compute_node['metrics'] = jsonutils.dumps(
+            [{'name': 'cpu.frequency', 'value': 800}])
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertEqual(jsonutils.dumps(
+            [{'name': 'cpu.frequency', 'value': 800}]),
+            self.tracker.compute_node['metrics'])
+        self._assert(0, 'memory_mb_used')
+
+        instance = self._fake_instance(memory_mb=3, root_gb=1,
+                                       ephemeral_gb=0)
+        self.tracker.instance_claim(self.context, instance, self.limits)
+        self._assert(3 + FAKE_VIRT_MEMORY_OVERHEAD, 'memory_mb_used')
+        # The scheduler's claim stays on the record until it is released:
+        self.assertEqual(3 + FAKE_VIRT_MEMORY_OVERHEAD + 3,
+                         self.compute['memory_mb_used'])
+        self.assertEqual({'memory_mb_used': 3 + FAKE_VIRT_MEMORY_OVERHEAD,
+                          'free_ram_mb': -3 - FAKE_VIRT_MEMORY_OVERHEAD,
+                          'local_gb_used': 1, 'free_disk_gb': -1,
+                          'vcpus_used': 1},
+                         self.updated_values['usage_deltas'])
+
+    def test_full_audit_keeps_scheduler_claims(self):
+        self.compute['memory_mb_used'] += 3
+        self.compute['free_ram_mb'] -= 3
+
+        self.tracker.update_available_resource(self.context)
+        self._assert(0, 'memory_mb_used')
+        self.assertEqual(3, self.compute['memory_mb_used'])
+        self.assertEqual(FAKE_VIRT_MEMORY_MB - 3, self.compute['free_ram_mb'])
+
+    def _setup_generations(self):
+        self.flags(resource_tracker_full_audit_interval=600,
+                   resource_tracker_claim_grace_period=300)
+        self.compute['generation'] = 1
+        self.tracker.generation_seen = 1
+        self.stubs.Set(db, 'service_get_by_compute_host',
+                       lambda ctx, host: self.service)
+        self.stubs.Set(db, 'compute_node_update',
+                       self._fake_generation_update)
+
+    def _fake_generation_update(self, ctx, compute_node_id, values,
+                                prune_stats=False):
+        generation = values.pop('generation', None)
+        if generation not in (None, self.compute['generation']):
+            raise exception.ComputeNodeClaimConflict(
+                    compute_id=compute_node_id)
+        self.updated_values = dict(values)
+        for key, delta in values.pop('usage_deltas', {}).iteritems():
+            self.compute[key] += delta
+        self.compute.update(values)
+        self.compute['generation'] += 1
+        return self.compute
+
+    def _scheduler_claim(self, memory_mb):
+        # What compute_node_claim does to the record:
+        self.compute['memory_mb_used'] += memory_mb
+        self.compute['free_ram_mb'] -= memory_mb
+        self.compute['generation'] += 1
+
+    def _expire_claims(self):
+        self.tracker.claims_seen = (timeutils.utcnow() -
+                                    datetime.timedelta(seconds=301))
+
+    def test_periodic_update_keeps_recent_claims(self):
+        self._setup_generations()
+        self._scheduler_claim(3)
+
+        self.tracker.update_available_resource(self.context)
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual(3, self.compute['memory_mb_used'])
+        self.assertEqual(1, self.tracker.last_write_stats['skipped'])
+
+    def test_periodic_update_releases_expired_claims(self):
+        self._setup_generations()
+        self._scheduler_claim(3)
+        self.tracker.update_available_resource(self.context)
+
+        self._expire_claims()
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual(0, self.compute['memory_mb_used'])
+        self.assertEqual(FAKE_VIRT_MEMORY_MB, self.compute['free_ram_mb'])
+        self.assertIsNone(self.tracker.claims_seen)
+        self.assertEqual(self.compute['generation'],
+                         self.tracker.generation_seen)
+
+    def test_periodic_update_restarts_grace_period_on_new_claims(self):
+        self._setup_generations()
+        self._scheduler_claim(3)
+        self.tracker.update_available_resource(self.context)
+        self._expire_claims()
+
+        self._scheduler_claim(2)
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual(5, self.compute['memory_mb_used'])
+        self.assertFalse(timeutils.is_older_than(self.tracker.claims_seen,
+                                                 300))
+
+    def test_periodic_update_release_conflict(self):
+        self._setup_generations()
+        self._scheduler_claim(3)
+        self.tracker.update_available_resource(self.context)
+        self._expire_claims()
+
+        def fake_update(ctx, compute_node_id, values, prune_stats=False):
+            # Another claim lands between reading and writing the record:
+            self._scheduler_claim(2)
+            return self._fake_generation_update(ctx, compute_node_id,
+                                                values)
+
+        self.stubs.Set(db, 'compute_node_update', fake_update)
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual(5, self.compute['memory_mb_used'])
+
+        self.stubs.Set(db, 'compute_node_update',
+                       self._fake_generation_update)
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual(5, self.compute['memory_mb_used'])
+        self.assertEqual(self.compute['generation'],
+                         self.tracker.generation_seen)
+
+    def test_update_notes_unseen_claims(self):
+        self._setup_generations()
+        self._scheduler_claim(3)
+
+        self.tracker.compute_node['current_workload'] = 3
+        self.tracker._update(self.context, self.tracker.compute_node)
+        self.assertIsNotNone(self.tracker.claims_seen)
+        self.assertEqual(3, self.tracker.generation_seen)
+
+    def test_full_audit_interval(self):
+        self.flags(resource_tracker_full_audit_interval=600)
+
+        def fake_get_available_resource(nodename):
+            raise test.TestingException()
+
+        self.stubs.Set(self.tracker.driver, 'get_available_resource',
+                       fake_get_available_resource)
+        self.tracker.update_available_resource(self.context)
+        self.assertEqual({}, self.updated_values)
+
+        self.tracker.last_full_audit = (timeutils.utcnow() -
+                                        datetime.timedelta(seconds=601))
+        self.assertRaises(test.TestingException,
+                          self.tracker.update_available_resource,
+                          self.context)
+
     def test_init(self):
         driver = self._driver()
         self._assert(FAKE_VIRT_MEMORY_MB, 'memory_mb')
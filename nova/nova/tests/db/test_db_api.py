@@ -1021,6 +1021,91 @@ class ReservationTestCase(test.TestCase, ModelsObjectComparatorMixin):
                                             self.ctxt, 'project1', 'user1'))
 
 
+class CounterQuotaTestCase(test.TestCase):
+
+    """Tests for the counter based db.api quota and reservation methods."""
+
+    def setUp(self):
+        super(CounterQuotaTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        self.resources = {}
+        for resource in ('instances', 'cores'):
+            self.resources[resource] = quota.ReservableResource(
+                resource, '_sync_counter_%s' % resource)
+        self.stubs.Set(sqlalchemy_api, 'QUOTA_SYNC_FUNCTIONS',
+                       dict(sqlalchemy_api.QUOTA_SYNC_FUNCTIONS))
+        sqlalchemy_api.QUOTA_SYNC_FUNCTIONS['_sync_counter_instances'] = (
+            lambda elevated, project_id, user_id, session: {'instances': 1})
+        sqlalchemy_api.QUOTA_SYNC_FUNCTIONS['_sync_counter_cores'] = (
+            lambda elevated, project_id, user_id, session: {'cores': 2})
+
+    def _reserve(self, user_id, deltas, project_quotas, user_quotas=None,
+                 expire=None):
+        if expire is None:
+            expire = timeutils.utcnow() + datetime.timedelta(days=1)
+        return db.quota_reserve_counter(self.ctxt, self.resources,
+                                        project_quotas,
+                                        user_quotas or project_quotas,
+                                        deltas, expire, 0, 'project1',
+                                        user_id)
+
+    def _usages(self, user_id):
+        usages = db.quota_usage_get_all_by_project_and_user(
+            self.ctxt, 'project1', user_id)
+        return dict((res, usages[res]) for res in self.resources)
+
+    def test_reserve_and_commit(self):
+        reservations = self._reserve('user1', {'instances': 2, 'cores': 4},
+                                     {'instances': 10, 'cores': 10})
+        self.assertEqual({'instances': {'in_use': 1, 'reserved': 2},
+                          'cores': {'in_use': 2, 'reserved': 4}},
+                         self._usages('user1'))
+
+        db.reservation_commit_counter(self.ctxt, reservations)
+        db.reservation_commit_counter(self.ctxt, reservations)
+        self.assertEqual({'instances': {'in_use': 3, 'reserved': 0},
+                          'cores': {'in_use': 6, 'reserved': 0}},
+                         self._usages('user1'))
+
+    def test_reserve_and_rollback(self):
+        reservations = self._reserve('user1', {'instances': 2, 'cores': 4},
+                                     {'instances': 10, 'cores': 10})
+        db.reservation_rollback_counter(self.ctxt, reservations)
+        self.assertEqual({'instances': {'in_use': 1, 'reserved': 0},
+                          'cores': {'in_use': 2, 'reserved': 0}},
+                         self._usages('user1'))
+
+    def test_reserve_over_user_quota(self):
+        self._reserve('user1', {'instances': 1, 'cores': 1},
+                      {'instances': 10, 'cores': 10})
+        exc = self.assertRaises(exception.OverQuota, self._reserve, 'user1',
+                                {'instances': 1, 'cores': 8},
+                                {'instances': 10, 'cores': 10})
+        self.assertEqual(['cores'], exc.kwargs['overs'])
+        self.assertEqual({'instances': {'in_use': 1, 'reserved': 1},
+                          'cores': {'in_use': 2, 'reserved': 1}},
+                         self._usages('user1'))
+
+    def test_reserve_over_project_quota(self):
+        self._reserve('user1', {'instances': 2, 'cores': 2},
+                      {'instances': 5, 'cores': 20})
+        self.assertRaises(exception.OverQuota, self._reserve, 'user2',
+                          {'instances': 2, 'cores': 2},
+                          {'instances': 5, 'cores': 20})
+        self.assertEqual({'instances': {'in_use': 1, 'reserved': 0},
+                          'cores': {'in_use': 2, 'reserved': 0}},
+                         self._usages('user2'))
+
+    def test_reservation_expire(self):
+        self._reserve('user1', {'instances': 2, 'cores': 4},
+                      {'instances': 10, 'cores': 10},
+                      expire=timeutils.utcnow() - datetime.timedelta(days=1))
+        db.reservation_expire_counter(self.ctxt)
+        self.assertEqual({'instances': {'in_use': 1, 'reserved': 0},
+                          'cores': {'in_use': 2, 'reserved': 0}},
+                         self._usages('user1'))
+
+
 class SecurityGroupRuleTestCase(test.TestCase, ModelsObjectComparatorMixin):
     def setUp(self):
         super(SecurityGroupRuleTestCase, self).setUp()
@@ -5494,7 +5579,8 @@ class S3ImageTestCase(test.TestCase):
 
 class ComputeNodeTestCase(test.TestCase, ModelsObjectComparatorMixin):
 
-    _ignored_keys = ['id', 'deleted', 'deleted_at', 'created_at', 'updated_at']
+    _ignored_keys = ['id', 'deleted', 'deleted_at', 'created_at', 'updated_at',
+                     'generation']
 
     def setUp(self):
         super(ComputeNodeTestCase, self).setUp()
@@ -5585,6 +5671,82 @@ class ComputeNodeTestCase(test.TestCase, ModelsObjectComparatorMixin):
             # Clean up the service
             db.service_destroy(self.ctxt, service['id'])
 
+    def test_compute_node_get_all_changed_since(self):
+        created_at = self.item['created_at']
+        later = created_at + datetime.timedelta(seconds=60)
+
+        changes = db.compute_node_get_all_changed_since(self.ctxt, later)
+        self.assertEqual([], changes['compute_nodes'])
+        self.assertEqual([self.service['id']],
+                         [service['id'] for service in changes['services']])
+
+        changes = db.compute_node_get_all_changed_since(self.ctxt,
+                                                        created_at)
+        self.assertEqual(1, len(changes['compute_nodes']))
+        node = changes['compute_nodes'][0]
+        self.assertEqual(self.item['id'], node['id'])
+        self.assertEqual(self.service['id'], node['service']['id'])
+
+        db.compute_node_delete(self.ctxt, self.item['id'])
+        changes = db.compute_node_get_all_changed_since(self.ctxt,
+                                                        created_at)
+        self.assertEqual(1, len(changes['compute_nodes']))
+        self.assertTrue(changes['compute_nodes'][0]['deleted'])
+
+    def test_compute_node_claim(self):
+        generation = self.item['generation']
+        new_generation = db.compute_node_claim(self.ctxt, self.item['id'],
+                                               generation, 512, 1, 10)
+        self.assertEqual(generation + 1, new_generation)
+        node = db.compute_node_get(self.ctxt, self.item['id'])
+        self.assertEqual(new_generation, node['generation'])
+        self.assertEqual(512, node['free_ram_mb'])
+        self.assertEqual(512, node['memory_mb_used'])
+        self.assertEqual(1, node['vcpus_used'])
+        self.assertEqual(2038, node['free_disk_gb'])
+        self.assertEqual(10, node['local_gb_used'])
+        self.assertEqual(90, node['disk_available_least'])
+
+    def test_compute_node_claim_conflict(self):
+        generation = self.item['generation']
+        db.compute_node_update(self.ctxt, self.item['id'], {'vcpus_used': 1})
+        self.assertRaises(exception.ComputeNodeClaimConflict,
+                          db.compute_node_claim, self.ctxt, self.item['id'],
+                          generation, 512, 1, 10)
+        node = db.compute_node_get(self.ctxt, self.item['id'])
+        self.assertEqual(generation + 1, node['generation'])
+        self.assertEqual(1024, node['free_ram_mb'])
+
+    def test_compute_node_update_generation(self):
+        generation = self.item['generation']
+        node = db.compute_node_update(self.ctxt, self.item['id'],
+                                      {'vcpus_used': 1,
+                                       'generation': generation})
+        self.assertEqual(generation + 1, node['generation'])
+        self.assertEqual(1, node['vcpus_used'])
+
+    def test_compute_node_update_generation_conflict(self):
+        generation = self.item['generation']
+        db.compute_node_claim(self.ctxt, self.item['id'], generation,
+                              512, 1, 10)
+        self.assertRaises(exception.ComputeNodeClaimConflict,
+                          db.compute_node_update, self.ctxt, self.item['id'],
+                          {'memory_mb_used': 0, 'generation': generation})
+        node = db.compute_node_get(self.ctxt, self.item['id'])
+        self.assertEqual(generation + 1, node['generation'])
+        self.assertEqual(512, node['memory_mb_used'])
+
+    def test_compute_node_update_usage_deltas(self):
+        db.compute_node_claim(self.ctxt, self.item['id'],
+                              self.item['generation'], 512, 1, 10)
+        node = db.compute_node_update(self.ctxt, self.item['id'],
+                                      {'vcpus': 4,
+                                       'usage_deltas': {'memory_mb_used': 256,
+                                                        'free_ram_mb': -256}})
+        self.assertEqual(4, node['vcpus'])
+        self.assertEqual(768, node['memory_mb_used'])
+        self.assertEqual(256, node['free_ram_mb'])
+
     def test_compute_node_get_all_mult_compute_nodes_one_service_entry(self):
         service_data = self.service_dict.copy()
         service_data['host'] = 'host2'
@@ -7172,3 +7334,117 @@ class RetryOnDeadlockTestCase(test.TestCase):
                 raise db_exc.DBDeadlock("fake exception")
             return True
         self.assertTrue(call_api())
+
+
+class CvrmDBApiTestCase(test.TestCase, ModelsObjectComparatorMixin):
+    def setUp(self):
+        super(CvrmDBApiTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+
+    def test_attribute_get_all_by_project(self):
+        color = db.attribute_create(self.ctxt, {'project_id': 'p1',
+                                                'name': 'color'})
+        level = db.attribute_create(self.ctxt, {'project_id': 'p1',
+                                                'name': 'level'})
+        db.attribute_create(self.ctxt, {'project_id': 'p2', 'name': 'color'})
+        attributes = db.attribute_get_all_by_project(self.ctxt, 'p1')
+        self._assertEqualListsOfObjects([color, level], attributes)
+
+    def test_attribute_create_with_duplicate_name(self):
+        values = {'project_id': 'p1', 'name': 'color'}
+        db.attribute_create(self.ctxt, values)
+        self.assertRaises(exception.AttributeExists,
+                          db.attribute_create, self.ctxt, values)
+
+    def test_attribute_get_all_by_project_not_authorized(self):
+        ctxt = context.RequestContext('user1', 'p1')
+        self.assertRaises(exception.NotAuthorized,
+                          db.attribute_get_all_by_project, ctxt, 'p2')
+
+    def test_scope_get_all_by_project(self):
+        red = db.scope_create(self.ctxt, {'project_id': 'p1',
+                                          'name': 'color', 'value': 'red'})
+        blue = db.scope_create(self.ctxt, {'project_id': 'p1',
+                                           'name': 'color', 'value': 'blue'})
+        db.scope_create(self.ctxt, {'project_id': 'p2', 'name': 'color',
+                                    'value': 'red'})
+        scopes = db.scope_get_all_by_project(self.ctxt, 'p1')
+        self._assertEqualListsOfObjects([red, blue], scopes)
+
+    def test_scope_create_with_duplicate_value(self):
+        values = {'project_id': 'p1', 'name': 'color', 'value': 'red'}
+        db.scope_create(self.ctxt, values)
+        self.assertRaises(exception.ScopeExists,
+                          db.scope_create, self.ctxt, values)
+
+    def test_attribute_create_all(self):
+        values = [{'project_id': 'p1', 'name': 'color'},
+                  {'project_id': 'p1', 'name': 'level'}]
+        refs = db.attribute_create_all(self.ctxt, values)
+        self._assertEqualListsOfObjects(
+            refs, db.attribute_get_all_by_project(self.ctxt, 'p1'))
+
+    def test_attribute_create_all_is_atomic(self):
+        values = [{'project_id': 'p1', 'name': 'color'},
+                  {'project_id': 'p1', 'name': 'color'}]
+        self.assertRaises(exception.AttributeExists,
+                          db.attribute_create_all, self.ctxt, values)
+        self.assertEqual([], db.attribute_get_all_by_project(self.ctxt, 'p1'))
+
+    def test_attribute_delete_all(self):
+        refs = db.attribute_create_all(
+            self.ctxt, [{'project_id': 'p1', 'name': 'color'},
+                        {'project_id': 'p1', 'name': 'level'}])
+        project_ids = db.attribute_delete_all(self.ctxt,
+                                              [ref['id'] for ref in refs])
+        self.assertEqual(set(['p1']), project_ids)
+        self.assertEqual([], db.attribute_get_all_by_project(self.ctxt, 'p1'))
+
+    def test_attribute_delete_all_deletes_scopes(self):
+        color = db.attribute_create(self.ctxt, {'project_id': 'p1',
+                                                'name': 'color'})
+        db.attribute_create(self.ctxt, {'project_id': 'p1', 'name': 'level'})
+        db.scope_create_all(
+            self.ctxt, [{'project_id': 'p1', 'name': 'color', 'value': 'red'},
+                        {'project_id': 'p2', 'name': 'color', 'value': 'red'}])
+        level = db.scope_create(self.ctxt, {'project_id': 'p1',
+                                            'name': 'level', 'value': '1'})
+        db.attribute_delete_all(self.ctxt, [color['id']])
+        self._assertEqualListsOfObjects(
+            [level], db.scope_get_all_by_project(self.ctxt, 'p1'))
+        self.assertEqual(1, len(db.scope_get_all_by_project(self.ctxt, 'p2')))
+
+    def test_attribute_delete_all_missing_is_atomic(self):
+        ref = db.attribute_create(self.ctxt, {'project_id': 'p1',
+                                              'name': 'color'})
+        self.assertRaises(exception.AttributeNotFound,
+                          db.attribute_delete_all, self.ctxt,
+                          [ref['id'], ref['id'] + 1])
+        self.assertEqual(1,
+                         len(db.attribute_get_all_by_project(self.ctxt, 'p1')))
+
+    def test_scope_create_all_and_delete_all(self):
+        refs = db.scope_create_all(
+            self.ctxt, [{'project_id': 'p1', 'name': 'color', 'value': 'red'},
+                        {'project_id': 'p1', 'name': 'color',
+                         'value': 'blue'}])
+        self._assertEqualListsOfObjects(
+            refs, db.scope_get_all_by_project(self.ctxt, 'p1'))
+        project_ids = db.scope_delete_all(self.ctxt,
+                                          [ref['id'] for ref in refs])
+        self.assertEqual(set(['p1']), project_ids)
+        self.assertEqual([], db.scope_get_all_by_project(self.ctxt, 'p1'))
+
+    def test_delete_all_other_project_not_found(self):
+        attribute = db.attribute_create(self.ctxt, {'project_id': 'p2',
+                                                    'name': 'color'})
+        scope = db.scope_create(self.ctxt, {'project_id': 'p2',
+                                            'name': 'color', 'value': 'red'})
+        ctxt = context.RequestContext('user1', 'p1')
+        self.assertRaises(exception.AttributeNotFound,
+                          db.attribute_delete_all, ctxt, [attribute['id']])
+        self.assertRaises(exception.ScopeNotFound,
+                          db.scope_delete_all, ctxt, [scope['id']])
+        self.assertEqual(1,
+                         len(db.attribute_get_all_by_project(self.ctxt, 'p2')))
+        self.assertEqual(1, len(db.scope_get_all_by_project(self.ctxt, 'p2')))
@@ -695,6 +695,76 @@ class TestNovaMigrations(BaseWalkMigrationTestCase, CommonTestsMixIn):
         # confirm compute_node_stats exists
         db_utils.get_table(engine, 'compute_node_stats')
 
+    def _pre_upgrade_235(self, engine):
+        # The CVRM tables may have been created out of band, without
+        # rejecting duplicates:
+        meta = sqlalchemy.MetaData(bind=engine)
+        for table_name in ('attribute', 'scope'):
+            if engine.has_table(table_name):
+                continue
+            columns = [sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+                       sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+                       sqlalchemy.Column('deleted_at', sqlalchemy.DateTime),
+                       sqlalchemy.Column('deleted', sqlalchemy.Integer),
+                       sqlalchemy.Column('id', sqlalchemy.Integer,
+                                         primary_key=True),
+                       sqlalchemy.Column('name', sqlalchemy.String(255)),
+                       sqlalchemy.Column('project_id',
+                                         sqlalchemy.String(255))]
+            if table_name == 'scope':
+                columns.append(sqlalchemy.Column('value',
+                                                 sqlalchemy.String(255)))
+            sqlalchemy.Table(table_name, meta, *columns,
+                             mysql_engine='InnoDB',
+                             mysql_charset='utf8').create()
+
+        attribute = db_utils.get_table(engine, 'attribute')
+        for i in range(2):
+            attribute.insert().execute(project_id='p0', name='color')
+        scope = db_utils.get_table(engine, 'scope')
+        for i in range(2):
+            scope.insert().execute(project_id='p0', name='color',
+                                   value='red')
+
+    def _check_235(self, engine, data):
+        for table_name in ('attribute', 'shadow_attribute',
+                           'scope', 'shadow_scope'):
+            self.assertColumnExists(engine, table_name, 'project_id')
+
+        for table_name in ('attribute', 'scope'):
+            table = db_utils.get_table(engine, table_name)
+            rows = table.select().where(
+                table.c.project_id == 'p0').execute().fetchall()
+            self.assertEqual(1, len(rows))
+
+        attribute = db_utils.get_table(engine, 'attribute')
+        attribute.insert().execute(project_id='p1', name='color')
+        attribute.insert().execute(project_id='p2', name='color')
+        self.assertRaises(sqlalchemy.exc.IntegrityError,
+                          attribute.insert().execute,
+                          project_id='p1', name='color')
+
+        scope = db_utils.get_table(engine, 'scope')
+        scope.insert().execute(project_id='p1', name='color', value='red')
+        scope.insert().execute(project_id='p1', name='color', value='blue')
+        self.assertRaises(sqlalchemy.exc.IntegrityError,
+                          scope.insert().execute,
+                          project_id='p1', name='color', value='red')
+
+    def _post_downgrade_235(self, engine):
+        attribute = db_utils.get_table(engine, 'attribute')
+        attribute.insert().execute(project_id='p1', name='color')
+        scope = db_utils.get_table(engine, 'scope')
+        scope.insert().execute(project_id='p1', name='color', value='red')
+
+    def _check_236(self, engine, data):
+        for table_name in ('compute_nodes', 'shadow_compute_nodes'):
+            self.assertColumnExists(engine, table_name, 'generation')
+
+    def _post_downgrade_236(self, engine):
+        for table_name in ('compute_nodes', 'shadow_compute_nodes'):
+            self.assertColumnNotExists(engine, table_name, 'generation')
+
 
 class TestBaremetalMigrations(BaseWalkMigrationTestCase, CommonTestsMixIn):
     """Test sqlalchemy-migrate migrations."""
@@ -219,6 +219,16 @@ policy_data = """
     "compute_extension:keypairs:show": "",
     "compute_extension:keypairs:create": "",
     "compute_extension:keypairs:delete": "",
+    "compute_extension:attributes": "",
+    "compute_extension:attributes:index": "",
+    "compute_extension:attributes:show": "",
+    "compute_extension:attributes:create": "",
+    "compute_extension:attributes:delete": "",
+    "compute_extension:scopes": "",
+    "compute_extension:scopes:index": "",
+    "compute_extension:scopes:show": "",
+    "compute_extension:scopes:create": "",
+    "compute_extension:scopes:delete": "",
 
     "compute_extension:v3:keypairs": "",
     "compute_extension:v3:keypairs:index": "",
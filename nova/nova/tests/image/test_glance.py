@@ -16,6 +16,7 @@
 
 import datetime
 import filecmp
+import hashlib
 import os
 import random
 import tempfile
@@ -508,6 +509,76 @@ class TestGlanceImageService(test.NoDBTestCase):
 
         self.assertTrue(client.data_called)
 
+    def _setup_peer(self, data, checksum, disk_format='raw'):
+        image_id = 1  # doesn't matter
+        peer_dir = tempfile.mkdtemp(prefix='nova_glance_peer')
+        self.addCleanup(utils.execute, 'rm', '-rf', peer_dir)
+        cache_name = hashlib.sha1(str(image_id)).hexdigest()
+        with open(os.path.join(peer_dir, cache_name), 'wb') as f:
+            f.write(data)
+        _, dst_path = self._get_tempfile()
+
+        class MyGlanceStubClient(glance_stubs.StubGlanceClient):
+            def data(self, image_id):
+                return ['glance data']
+
+        self.flags(image_peer_urls=['file://' + peer_dir])
+        service = self._create_image_service(MyGlanceStubClient())
+        self.stubs.Set(service, 'show',
+                       lambda context, image_id: {'checksum': checksum,
+                                                  'disk_format': disk_format})
+        return service, image_id, dst_path
+
+    def test_download_from_peer(self):
+        service, image_id, dst_path = self._setup_peer(
+            'peer data', hashlib.md5('peer data').hexdigest())
+
+        service.download(self.context, image_id, dst_path=dst_path)
+
+        with open(dst_path) as f:
+            self.assertEqual('peer data', f.read())
+
+    def test_download_from_peer_checksum_mismatch(self):
+        service, image_id, dst_path = self._setup_peer(
+            'corrupt data', hashlib.md5('peer data').hexdigest())
+
+        service.download(self.context, image_id, dst_path=dst_path)
+
+        with open(dst_path) as f:
+            self.assertEqual('glance data', f.read())
+
+    def test_download_from_peer_skipped_for_converted_image(self):
+        self.flags(force_raw_images=True)
+        service, image_id, dst_path = self._setup_peer(
+            'peer data', hashlib.md5('peer data').hexdigest(), 'qcow2')
+        self.mox.StubOutWithMock(glance, '_file_md5')
+        self.mox.ReplayAll()
+
+        service.download(self.context, image_id, dst_path=dst_path)
+
+        with open(dst_path) as f:
+            self.assertEqual('glance data', f.read())
+
+    def test_download_from_peer_unconverted_image(self):
+        self.flags(force_raw_images=False)
+        service, image_id, dst_path = self._setup_peer(
+            'peer data', hashlib.md5('peer data').hexdigest(), 'qcow2')
+
+        service.download(self.context, image_id, dst_path=dst_path)
+
+        with open(dst_path) as f:
+            self.assertEqual('peer data', f.read())
+
+    def test_download_from_missing_peer(self):
+        service, image_id, dst_path = self._setup_peer(
+            'peer data', hashlib.md5('peer data').hexdigest())
+        self.flags(image_peer_urls=['file:///nonexistent/_base'])
+
+        service.download(self.context, image_id, dst_path=dst_path)
+
+        with open(dst_path) as f:
+            self.assertEqual('glance data', f.read())
+
     def test_client_forbidden_converts_to_imagenotauthed(self):
         class MyGlanceStubClient(glance_stubs.StubGlanceClient):
             """A client that raises a Forbidden exception."""
@@ -189,6 +189,56 @@ class TestNeutronClient(test.TestCase):
             self.assertEqual('new_token1', token_store.admin_auth_token)
 
 
+class TestNeutronClientPool(test.TestCase):
+    def setUp(self):
+        super(TestNeutronClientPool, self).setUp()
+        self.flags(neutron_client_pool_size=2)
+        self.stubs.Set(neutronv2.ClientPool, '_instance', None)
+        self.context = context.RequestContext('userid', 'my_tenantid',
+                                              auth_token='token')
+
+    @mock.patch.object(neutronv2, '_get_admin_client')
+    @mock.patch.object(neutronv2, '_get_client')
+    def test_client_reused(self, mock_get_client, mock_get_admin_client):
+        mock_get_client.side_effect = lambda *args, **kwargs: mock.Mock()
+        mock_get_admin_client.side_effect = lambda: mock.Mock()
+        neutronv2.get_client(self.context).list_networks()
+        neutronv2.get_client(self.context).list_ports()
+        mock_get_client.assert_called_once_with(token='token')
+
+        neutronv2.get_client(self.context, admin=True).list_networks()
+        neutronv2.get_client(self.context, admin=True).list_ports()
+        mock_get_admin_client.assert_called_once_with()
+        self.assertEqual(2, neutronv2.ClientPool.get().count)
+
+    @mock.patch.object(neutronv2, '_get_client')
+    def test_client_not_shared_while_in_use(self, mock_get_client):
+        clients = [mock.Mock(), mock.Mock()]
+        mock_get_client.side_effect = lambda *args, **kwargs: clients.pop()
+
+        def list_networks():
+            neutronv2.get_client(self.context).list_ports()
+
+        clients[1].list_networks.side_effect = list_networks
+        neutronv2.get_client(self.context).list_networks()
+        self.assertEqual(2, mock_get_client.call_count)
+        self.assertEqual(2, neutronv2.ClientPool.get().count)
+
+    def test_pool_size(self):
+        pool = neutronv2.ClientPool.get()
+        pool.checkin('key1', 'client1')
+        pool.checkin('key2', 'client2')
+        pool.checkin('key2', 'client3')
+        self.assertEqual(2, pool.count)
+        self.assertEqual('client3', pool.checkout('key2', None))
+
+    def test_pool_disabled(self):
+        self.flags(neutron_client_pool_size=0)
+        self.flags(neutron_url='http://anyhost/')
+        self.assertIsInstance(neutronv2.get_client(self.context),
+                              client.Client)
+
+
 class TestNeutronv2Base(test.TestCase):
 
     def setUp(self):
@@ -499,23 +549,19 @@ class TestNeutronv2Base(test.TestCase):
         nets = number == 1 and self.nets1 or self.nets2
         self.moxed_client.list_networks(
             id=net_ids).AndReturn({'networks': nets})
-        for i in xrange(1, number + 1):
-            float_data = number == 1 and self.float_data1 or self.float_data2
-            for ip in port_data[i - 1]['fixed_ips']:
-                float_data = [x for x in float_data
-                              if x['fixed_ip_address'] == ip['ip_address']]
-                self.moxed_client.list_floatingips(
-                    fixed_ip_address=ip['ip_address'],
-                    port_id=port_data[i - 1]['id']).AndReturn(
-                        {'floatingips': float_data})
-            subnet_data = i == 1 and self.subnet_data1 or self.subnet_data2
-            self.moxed_client.list_subnets(
-                id=mox.SameElementsAs(['my_subid%s' % i])).AndReturn(
-                    {'subnets': subnet_data})
-            self.moxed_client.list_ports(
-                network_id=subnet_data[0]['network_id'],
-                device_owner='network:dhcp').AndReturn(
-                    {'ports': []})
+        float_data = number == 1 and self.float_data1 or self.float_data2
+        self.moxed_client.list_floatingips(
+            port_id=mox.SameElementsAs([port['id'] for port in port_data])
+            ).AndReturn({'floatingips': float_data})
+        subnet_data = self.subnet_data1 + self.subnet_data2[:number - 1]
+        self.moxed_client.list_subnets(
+            id=mox.SameElementsAs(['my_subid%s' % i
+                                   for i in xrange(1, number + 1)])
+            ).AndReturn({'subnets': subnet_data})
+        self.moxed_client.list_ports(
+            network_id=mox.SameElementsAs(
+                [subnet['network_id'] for subnet in subnet_data]),
+            device_owner='network:dhcp').AndReturn({'ports': []})
         self.mox.ReplayAll()
         nw_inf = api.get_instance_nw_info(self.context, instance)
         for i in xrange(0, number):
@@ -670,23 +716,23 @@ class TestNeutronv2(TestNeutronv2Base):
         for current_neutron_port in current_neutron_ports:
             current_neutron_port_map[current_neutron_port['id']] = (
                 current_neutron_port)
-        for port_id in port_ids:
-            current_neutron_port = current_neutron_port_map.get(port_id)
-            if current_neutron_port:
-                for ip in current_neutron_port['fixed_ips']:
-                    self.moxed_client.list_floatingips(
-                        fixed_ip_address=ip['ip_address'],
-                        port_id=current_neutron_port['id']).AndReturn(
-                            {'floatingips': [self.float_data2[index]]})
-                    self.moxed_client.list_subnets(
-                        id=mox.SameElementsAs([ip['subnet_id']])
-                        ).AndReturn(
-                            {'subnets': [self.subnet_data_n[index]]})
-                    self.moxed_client.list_ports(
-                        network_id=current_neutron_port['network_id'],
-                        device_owner='network:dhcp').AndReturn(
-                        {'ports': self.dhcp_port_data1})
-                    index += 1
+        ports = [current_neutron_port_map[port_id] for port_id in port_ids
+                 if port_id in current_neutron_port_map]
+        subnet_ids = [ip['subnet_id'] for port in ports
+                      for ip in port['fixed_ips']]
+        index = len(subnet_ids)
+        if index:
+            self.moxed_client.list_floatingips(
+                port_id=mox.SameElementsAs([port['id'] for port in ports])
+                ).AndReturn({'floatingips': self.float_data2[:index]})
+            self.moxed_client.list_subnets(
+                id=mox.SameElementsAs(subnet_ids)).AndReturn(
+                    {'subnets': self.subnet_data_n[:index]})
+            self.moxed_client.list_ports(
+                network_id=mox.SameElementsAs(
+                    [port['network_id'] for port in ports]),
+                device_owner='network:dhcp').AndReturn(
+                    {'ports': self.dhcp_port_data1})
         self.mox.ReplayAll()
 
         self.instance['info_cache'] = network_cache
@@ -1114,13 +1160,10 @@ class TestNeutronv2(TestNeutronv2Base):
         self.moxed_client.list_networks(id=net_ids).AndReturn(
             {'networks': nets})
         float_data = number == 1 and self.float_data1 or self.float_data2
-        for data in port_data[1:]:
-            for ip in data['fixed_ips']:
-                self.moxed_client.list_floatingips(
-                    fixed_ip_address=ip['ip_address'],
-                    port_id=data['id']).AndReturn(
-                        {'floatingips': float_data[1:]})
-        for port in port_data[1:]:
+        if port_data[1:]:
+            self.moxed_client.list_floatingips(
+                port_id=[port['id'] for port in port_data[1:]]).AndReturn(
+                    {'floatingips': float_data[1:]})
             self.moxed_client.list_subnets(id=['my_subid2']).AndReturn({})
 
         self.mox.ReplayAll()
@@ -1968,12 +2011,25 @@ class TestNeutronv2(TestNeutronv2Base):
         NeutronNotFound = exceptions.NeutronClientException(
             status_code=404)
         self.moxed_client.list_floatingips(
-            fixed_ip_address='1.1.1.1', port_id=1).AndRaise(NeutronNotFound)
+            port_id=[1]).AndRaise(NeutronNotFound)
         self.mox.ReplayAll()
         neutronv2.get_client('fake')
-        floatingips = api._get_floating_ips_by_fixed_and_port(
-            self.moxed_client, '1.1.1.1', 1)
-        self.assertEqual(floatingips, [])
+        floatingips = api._get_floating_ips_by_ports(self.moxed_client, [1])
+        self.assertEqual(floatingips, {})
+
+    def test_get_floating_ips_by_ports(self):
+        api = neutronapi.API()
+        self.moxed_client.list_floatingips(
+            port_id=['my_portid1', 'my_portid2']).AndReturn(
+                {'floatingips': self.float_data2})
+        self.mox.ReplayAll()
+        neutronv2.get_client('fake')
+        floatingips = api._get_floating_ips_by_ports(
+            self.moxed_client, ['my_portid1', 'my_portid2'])
+        self.assertEqual(
+            {('my_portid1', '10.0.1.2'): [self.float_data2[0]],
+             ('my_portid2', '10.0.2.2'): [self.float_data2[1]]},
+            floatingips)
 
     def test_nw_info_get_ips(self):
         fake_port = {
@@ -1982,13 +2038,11 @@ class TestNeutronv2(TestNeutronv2Base):
             'id': 'port-id',
             }
         api = neutronapi.API()
-        self.mox.StubOutWithMock(api, '_get_floating_ips_by_fixed_and_port')
-        api._get_floating_ips_by_fixed_and_port(
-            self.moxed_client, '1.1.1.1', 'port-id').AndReturn(
-                [{'floating_ip_address': '10.0.0.1'}])
         self.mox.ReplayAll()
         neutronv2.get_client('fake')
-        result = api._nw_info_get_ips(self.moxed_client, fake_port)
+        result = api._nw_info_get_ips(
+            fake_port,
+            {('port-id', '1.1.1.1'): [{'floating_ip_address': '10.0.0.1'}]})
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]['address'], '1.1.1.1')
         self.assertEqual(result[0]['floating_ips'][0]['address'], '10.0.0.1')
@@ -2004,11 +2058,12 @@ class TestNeutronv2(TestNeutronv2Base):
         fake_ips = [model.IP(x['ip_address']) for x in fake_port['fixed_ips']]
         api = neutronapi.API()
         self.mox.StubOutWithMock(api, '_get_subnets_from_port')
-        api._get_subnets_from_port(self.context, fake_port).AndReturn(
+        api._get_subnets_from_port(fake_port, 'ipam-subnets').AndReturn(
             [fake_subnet])
         self.mox.ReplayAll()
         neutronv2.get_client('fake')
-        subnets = api._nw_info_get_subnets(self.context, fake_port, fake_ips)
+        subnets = api._nw_info_get_subnets(fake_port, fake_ips,
+                                           'ipam-subnets')
         self.assertEqual(len(subnets), 1)
         self.assertEqual(len(subnets[0]['ips']), 1)
         self.assertEqual(subnets[0]['ips'][0]['address'], '1.1.1.1')
@@ -2125,15 +2180,20 @@ class TestNeutronv2(TestNeutronv2Base):
             tenant_id='fake', device_id='uuid').AndReturn(
                 {'ports': fake_ports})
 
-        self.mox.StubOutWithMock(api, '_get_floating_ips_by_fixed_and_port')
+        self.mox.StubOutWithMock(api, '_get_floating_ips_by_ports')
+        self.mox.StubOutWithMock(api, '_get_ipam_subnets')
         self.mox.StubOutWithMock(api, '_get_subnets_from_port')
         requested_ports = [fake_ports[2], fake_ports[0], fake_ports[1]]
+        api._get_floating_ips_by_ports(
+            self.moxed_client,
+            [requested_port['id'] for requested_port in requested_ports]
+            ).AndReturn(dict(((requested_port['id'], '1.1.1.1'),
+                              [{'floating_ip_address': '10.0.0.1'}])
+                             for requested_port in requested_ports))
+        api._get_ipam_subnets(self.context, requested_ports).AndReturn(
+            'ipam-subnets')
         for requested_port in requested_ports:
-            api._get_floating_ips_by_fixed_and_port(
-                self.moxed_client, '1.1.1.1', requested_port['id']).AndReturn(
-                    [{'floating_ip_address': '10.0.0.1'}])
-        for requested_port in requested_ports:
-            api._get_subnets_from_port(self.context, requested_port
+            api._get_subnets_from_port(requested_port, 'ipam-subnets'
                 ).AndReturn(fake_subnets)
 
         self.mox.ReplayAll()
@@ -2199,6 +2259,90 @@ class TestNeutronv2WithMock(test.TestCase):
                           api.get_instance_nw_info, 'context', instance)
         mock_lock.assert_called_once_with('refresh_cache-%s' % instance.uuid)
 
+    @mock.patch.object(neutronapi, 'update_instance_info_cache')
+    @mock.patch.object(neutronapi.API, '_get_instance_nw_info')
+    @mock.patch.object(neutronv2, 'get_client')
+    def test_get_instance_nw_info_bulk(self, mock_get_client, mock_nw_info,
+                                       mock_update_cache):
+        instances = [{'uuid': 'uuid1', 'project_id': 'project1'},
+                     {'uuid': 'uuid2', 'project_id': 'project1'},
+                     {'uuid': 'uuid3', 'project_id': 'project1'}]
+        ports = [{'id': 'port1', 'device_id': 'uuid1',
+                  'tenant_id': 'project1'},
+                 {'id': 'port2', 'device_id': 'uuid2',
+                  'tenant_id': 'project1'},
+                 {'id': 'port3', 'device_id': 'uuid2',
+                  'tenant_id': 'project2'}]
+        mock_client = mock_get_client.return_value
+        mock_client.list_ports.return_value = {'ports': ports}
+        mock_nw_info.side_effect = ['nw_info1', test.TestingException,
+                                    'nw_info3']
+
+        result = self.api.get_instance_nw_info_bulk(self.context, instances)
+
+        self.assertEqual({'uuid1': 'nw_info1', 'uuid3': 'nw_info3'}, result)
+        mock_client.list_ports.assert_called_once_with(
+            device_id=['uuid1', 'uuid2', 'uuid3'])
+        mock_nw_info.assert_has_calls([
+            mock.call(self.context, instances[0], neutron_ports=[ports[0]]),
+            mock.call(self.context, instances[1], neutron_ports=[ports[1]]),
+            mock.call(self.context, instances[2], neutron_ports=[])])
+        self.assertEqual(2, mock_update_cache.call_count)
+
+    @mock.patch.object(neutronv2, 'get_client')
+    def test_build_network_info_model_request_count(self, mock_get_client):
+        # A multi-NIC instance costs the same number of neutron requests as
+        # a single NIC one.
+        ports = []
+        subnets = []
+        for i in xrange(4):
+            ports.append({'id': 'port%d' % i,
+                          'network_id': 'net%d' % i,
+                          'admin_state_up': True,
+                          'status': 'ACTIVE',
+                          'mac_address': 'de:ad:be:ef:00:0%d' % i,
+                          'fixed_ips': [{'ip_address': '10.0.%d.2' % i,
+                                         'subnet_id': 'subnet%d' % i}]})
+            subnets.append({'id': 'subnet%d' % i,
+                            'network_id': 'net%d' % i,
+                            'cidr': '10.0.%d.0/24' % i,
+                            'gateway_ip': '10.0.%d.1' % i})
+        dhcp_ports = [{'fixed_ips': [{'ip_address': '10.0.%d.3' % i,
+                                      'subnet_id': 'subnet%d' % i}]}
+                      for i in xrange(4)]
+        floating_ips = [{'port_id': 'port1', 'fixed_ip_address': '10.0.1.2',
+                         'floating_ip_address': '172.24.4.2'}]
+        networks = [{'id': 'net%d' % i, 'name': 'net%d' % i,
+                     'tenant_id': 'fake-project'} for i in xrange(4)]
+        instance = {'uuid': 'fake-uuid', 'project_id': 'fake-project',
+                    'info_cache': {'network_info': [
+                        {'id': port['id'],
+                         'network': {'id': port['network_id']}}
+                        for port in ports]}}
+
+        def fake_list_ports(**search_opts):
+            if search_opts.get('device_owner') == 'network:dhcp':
+                return {'ports': dhcp_ports}
+            return {'ports': ports}
+
+        mock_client = mock_get_client.return_value
+        mock_client.list_ports.side_effect = fake_list_ports
+        mock_client.list_networks.return_value = {'networks': networks}
+        mock_client.list_floatingips.return_value = {
+            'floatingips': floating_ips}
+        mock_client.list_subnets.return_value = {'subnets': subnets}
+
+        nw_info = self.api._build_network_info_model(self.context, instance)
+
+        self.assertEqual(4, len(nw_info))
+        self.assertEqual(5, len(mock_client.method_calls))
+        self.assertEqual(['172.24.4.2'],
+                         nw_info[1].fixed_ips()[0].floating_ip_addresses())
+        for i, vif in enumerate(nw_info):
+            subnet = vif['network']['subnets'][0]
+            self.assertEqual('10.0.%d.0/24' % i, subnet['cidr'])
+            self.assertEqual('10.0.%d.3' % i, subnet.get_meta('dhcp_server'))
+
 
 class TestNeutronv2ModuleMethods(test.TestCase):
 
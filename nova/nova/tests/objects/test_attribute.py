@@ -0,0 +1,161 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from nova import db
+from nova.objects import attribute
+from nova.objects import scope
+from nova.openstack.common import timeutils
+from nova.tests.objects import test_objects
+
+NOW = timeutils.utcnow().replace(microsecond=0)
+
+
+def _fake_row(**values):
+    row = {
+        'created_at': NOW,
+        'updated_at': None,
+        'deleted_at': None,
+        'deleted': False,
+        'project_id': 'fake-project',
+        }
+    row.update(values)
+    return row
+
+
+fake_attribute = _fake_row(id=1, name='color')
+fake_scope = _fake_row(id=2, name='color', value='red')
+
+
+class _TestAttributeObject(object):
+    def setUp(self):
+        super(_TestAttributeObject, self).setUp()
+        attribute.reset_cache()
+        self.addCleanup(attribute.reset_cache)
+
+    def test_list_is_cached(self):
+        self.mox.StubOutWithMock(db, 'attribute_get_all_by_project')
+        db.attribute_get_all_by_project(self.context,
+                                        'fake-project').AndReturn(
+            [fake_attribute])
+        self.mox.ReplayAll()
+        for i in range(2):
+            attributes = attribute.Attribute().list(self.context)
+            self.assertEqual(1, len(attributes))
+            self.compare_obj(attributes[0], fake_attribute)
+
+    def test_get_cached_without_project(self):
+        calls = []
+
+        def loader(context, project_id):
+            calls.append(project_id)
+            return {}
+
+        for i in range(2):
+            self.assertEqual({}, attribute.get_cached(self.context,
+                                                      'attribute', None,
+                                                      loader))
+        self.assertEqual([None], calls)
+        attribute.invalidate_cache(None)
+        attribute.get_cached(self.context, 'attribute', None, loader)
+        self.assertEqual([None, None], calls)
+
+    def test_exists(self):
+        self.mox.StubOutWithMock(db, 'attribute_get_all_by_project')
+        db.attribute_get_all_by_project(self.context,
+                                        'fake-project').AndReturn(
+            [fake_attribute])
+        self.mox.ReplayAll()
+        self.assertTrue(attribute.Attribute.exists(self.context,
+                                                   'fake-project', 'color'))
+        self.assertFalse(attribute.Attribute.exists(self.context,
+                                                    'fake-project', 'size'))
+
+    def test_create_invalidates_cache(self):
+        self.mox.StubOutWithMock(db, 'attribute_get_all_by_project')
+        self.mox.StubOutWithMock(db, 'attribute_create')
+        db.attribute_get_all_by_project(self.context,
+                                        'fake-project').AndReturn([])
+        db.attribute_create(self.context,
+                            {'name': 'color',
+                             'project_id': 'fake-project'}).AndReturn(
+            fake_attribute)
+        db.attribute_get_all_by_project(self.context,
+                                        'fake-project').AndReturn(
+            [fake_attribute])
+        self.mox.ReplayAll()
+        self.assertFalse(attribute.Attribute.exists(self.context,
+                                                    'fake-project', 'color'))
+        attribute_obj = attribute.Attribute()
+        attribute_obj.name = 'color'
+        attribute_obj.project_id = 'fake-project'
+        attribute_obj.create(self.context)
+        self.assertTrue(attribute.Attribute.exists(self.context,
+                                                   'fake-project', 'color'))
+
+    def test_delete_invalidates_owner_cache(self):
+        self.mox.StubOutWithMock(db, 'attribute_get_all_by_project')
+        self.mox.StubOutWithMock(db, 'attribute_delete_all')
+        db.attribute_get_all_by_project(self.context,
+                                        'other-project').AndReturn(
+            [fake_attribute])
+        db.attribute_delete_all(self.context, [1]).AndReturn(
+            set(['other-project']))
+        db.attribute_get_all_by_project(self.context,
+                                        'other-project').AndReturn([])
+        self.mox.ReplayAll()
+        self.assertTrue(attribute.Attribute.exists(self.context,
+                                                   'other-project', 'color'))
+        attribute.Attribute().delete(self.context, 1)
+        self.assertFalse(attribute.Attribute.exists(self.context,
+                                                    'other-project', 'color'))
+
+    def test_scope_exists(self):
+        self.mox.StubOutWithMock(db, 'scope_get_all_by_project')
+        db.scope_get_all_by_project(self.context,
+                                    'fake-project').AndReturn([fake_scope])
+        self.mox.ReplayAll()
+        self.assertTrue(scope.Scope.exists(self.context, 'fake-project',
+                                           'color', 'red'))
+        self.assertFalse(scope.Scope.exists(self.context, 'fake-project',
+                                            'color', 'blue'))
+        self.assertFalse(scope.Scope.exists(self.context, 'fake-project',
+                                            'size', 'red'))
+
+    def test_scope_delete_invalidates_owner_cache(self):
+        self.mox.StubOutWithMock(db, 'scope_get_all_by_project')
+        self.mox.StubOutWithMock(db, 'scope_delete_all')
+        db.scope_get_all_by_project(self.context,
+                                    'other-project').AndReturn([fake_scope])
+        db.scope_delete_all(self.context, [2]).AndReturn(
+            set(['other-project']))
+        db.scope_get_all_by_project(self.context,
+                                    'other-project').AndReturn([])
+        self.mox.ReplayAll()
+        self.assertTrue(scope.Scope.exists(self.context, 'other-project',
+                                           'color', 'red'))
+        scope.Scope().delete(self.context, 2)
+        self.assertFalse(scope.Scope.exists(self.context, 'other-project',
+                                            'color', 'red'))
+
+    def test_scope_list(self):
+        self.mox.StubOutWithMock(db, 'scope_get_all_by_project')
+        db.scope_get_all_by_project(self.context,
+                                    'fake-project').AndReturn([fake_scope])
+        self.mox.ReplayAll()
+        scopes = scope.Scope().list(self.context)
+        self.assertEqual(1, len(scopes))
+        self.compare_obj(scopes[0], fake_scope)
+
+
+class TestAttributeObject(_TestAttributeObject,
+                          test_objects._LocalTest):
+    pass
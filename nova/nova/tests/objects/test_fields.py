@@ -58,6 +58,12 @@ class TestField(test.NoDBTestCase):
             self.assertEqual(prim_val, self.field.to_primitive('obj', 'attr',
                                                                in_val))
 
+    def test_get_to_primitive(self):
+        convert = self.field.get_to_primitive()
+        for in_val, prim_val in self.to_primitive_values:
+            self.assertEqual(prim_val,
+                             in_val if convert is None else convert(in_val))
+
     def test_from_primitive(self):
         class ObjectLikeThing:
             _context = 'context'
@@ -21,8 +21,10 @@ import netaddr
 
 from nova.cells import rpcapi as cells_rpcapi
 from nova.compute import flavors
+from nova.compute import task_states
 from nova import db
 from nova import exception
+from nova import metadata_cache
 from nova.network import model as network_model
 from nova import notifications
 from nova.objects import instance
@@ -379,6 +381,36 @@ class _TestInstanceObject(object):
         self.assertEqual('goodbye', inst.display_name)
         self.assertEqual(set([]), inst.obj_what_changed())
 
+    def test_save_invalidates_metadata_cache(self):
+        self.flags(enable=False, group='cells')
+        fake_inst = dict(self.fake_instance, display_name='hello')
+        fake_uuid = fake_inst['uuid']
+        self.mox.StubOutWithMock(db, 'instance_get_by_uuid')
+        self.mox.StubOutWithMock(db, 'instance_update_and_get_original')
+        self.mox.StubOutWithMock(metadata_cache, 'invalidate')
+        db.instance_get_by_uuid(self.context, fake_uuid,
+                                columns_to_join=['info_cache',
+                                                 'security_groups'],
+                                use_slave=False
+                                ).AndReturn(fake_inst)
+        db.instance_update_and_get_original(
+                self.context, fake_uuid, mox.IgnoreArg(), update_cells=False,
+                columns_to_join=mox.IgnoreArg()
+                ).AndReturn((fake_inst, fake_inst))
+        db.instance_update_and_get_original(
+                self.context, fake_uuid, mox.IgnoreArg(), update_cells=False,
+                columns_to_join=mox.IgnoreArg()
+                ).AndReturn((fake_inst, fake_inst))
+        metadata_cache.invalidate(fake_uuid)
+        self.mox.ReplayAll()
+
+        inst = instance.Instance.get_by_uuid(self.context, fake_uuid,
+                                             use_slave=False)
+        inst.task_state = task_states.REBOOTING
+        inst.save()
+        inst.display_name = 'goodbye'
+        inst.save()
+
     def test_get_deleted(self):
         fake_inst = dict(self.fake_instance, id=123, deleted=123)
         fake_uuid = fake_inst['uuid']
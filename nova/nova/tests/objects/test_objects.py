@@ -15,6 +15,7 @@
 import contextlib
 import datetime
 import iso8601
+import pickle
 
 import mock
 import netaddr
@@ -110,6 +111,12 @@ class TestSubclassedObject(RandomMixInWithNoFields, MyObj):
     fields = {'new_field': fields.Field(fields.String())}
 
 
+class MyParentObj(base.NovaObject):
+    fields = {'foo': fields.IntegerField(),
+              'bar': fields.ObjectField('MyObj'),
+              }
+
+
 class TestMetaclass(test.TestCase):
     def test_obj_tracking(self):
 
@@ -622,6 +629,109 @@ class _TestObject(object):
         bar.foo = 1
         self.assertEqual(set(['bar']), obj.obj_what_changed())
 
+    def test_fields_stored_in_slots(self):
+        self.assertIn('_foo', MyObj.__slots__)
+        self.assertIn('_created_at', MyObj.__slots__)
+        self.assertEqual(('_new_field',), TestSubclassedObject.__slots__)
+        obj = MyObj(foo=1, bar='bar')
+        obj.obj_reset_changes()
+        self.assertEqual({}, obj.__dict__)
+
+    def test_sub_object_hydrated_lazily(self):
+        class LazyParentObject(base.NovaObject):
+            fields = {'foo': fields.IntegerField(),
+                      'bar': fields.ObjectField('MyObj'),
+                      }
+        obj = LazyParentObject(foo=1, bar=MyObj(foo=2))
+        obj.obj_reset_changes()
+        obj.bar.obj_reset_changes()
+        primitive = obj.obj_to_primitive()
+
+        obj2 = LazyParentObject.obj_from_primitive(primitive, self.context)
+        self.assertIsInstance(obj2._bar, base._LazyObjectPrimitive)
+        self.assertEqual(set(), obj2.obj_what_changed())
+        self.assertEqual(primitive, obj2.obj_to_primitive())
+        # Backporting the copy must not touch the primitive it was built from
+        backport = obj2.obj_to_primitive()['nova_object.data']['bar']
+        backport['nova_object.data']['foo'] = 3
+        self.assertEqual(2, obj2.bar.foo)
+        self.assertIsInstance(obj2._bar, MyObj)
+        self.assertEqual(self.context, obj2.bar._context)
+        self.assertEqual(primitive, obj2.obj_to_primitive())
+
+    def test_sub_object_changes_without_hydration(self):
+        class LazyChangedParentObject(base.NovaObject):
+            fields = {'bar': fields.ObjectField('MyObj')}
+        obj = LazyChangedParentObject(bar=MyObj(foo=2))
+        obj.obj_reset_changes()
+        primitive = obj.obj_to_primitive()
+
+        obj2 = LazyChangedParentObject.obj_from_primitive(primitive)
+        self.assertEqual(set(['bar']), obj2.obj_what_changed())
+        self.assertIsInstance(obj2._bar, base._LazyObjectPrimitive)
+
+    def test_pickle_with_lazy_sub_object(self):
+        obj = MyParentObj(foo=1, bar=MyObj(foo=2))
+        obj.obj_reset_changes()
+        obj.bar.obj_reset_changes()
+        obj2 = MyParentObj.obj_from_primitive(obj.obj_to_primitive())
+        obj2.extra = 'extra'
+        for protocol in (0, 2):
+            obj3 = pickle.loads(pickle.dumps(obj2, protocol))
+            self.assertEqual(1, obj3.foo)
+            self.assertEqual('extra', obj3.extra)
+            self.assertEqual(set(), obj3.obj_what_changed())
+            self.assertIsInstance(obj3._bar, base._LazyObjectPrimitive)
+            self.assertEqual(2, obj3.bar.foo)
+
+    def test_codec_matches_fields(self):
+        class CodecObject(base.NovaObject):
+            fields = {'when': fields.DateTimeField(nullable=True),
+                      'addr': fields.IPAddressField(),
+                      'names': fields.ListOfStringsField(),
+                      'addrs': fields.Field(fields.Dict(fields.IPAddress())),
+                      'child': fields.ObjectField('MyObj'),
+                      'unset': fields.StringField()}
+        dt = datetime.datetime(1955, 11, 5, tzinfo=iso8601.iso8601.Utc())
+        obj = CodecObject(when=dt, addr='1.2.3.4', names=['a', 'b'],
+                          addrs={'a': '::1'}, child=MyObj(foo=1))
+        expected = dict((name, field.to_primitive(obj, name, obj[name]))
+                        for name, field in obj.fields.items()
+                        if obj.obj_attr_is_set(name))
+        self.assertEqual(expected, CodecObject._obj_codec.to_primitive(obj))
+
+        obj.when = None
+        self.assertIsNone(CodecObject._obj_codec.to_primitive(obj)['when'])
+
+    def test_codec_from_primitive_does_not_track_changes(self):
+        obj = MyObj(foo=1, bar='bar')
+        obj2 = MyObj()
+        MyObj._obj_codec.from_primitive(obj2, {'foo': '2', 'bar': 'baz',
+                                               'missing': 'ignored'})
+        self.assertEqual(2, obj2.foo)
+        self.assertEqual('baz', obj2.bar)
+        self.assertFalse(obj2.obj_what_changed())
+        self.assertEqual(set(['foo', 'bar']), obj.obj_what_changed())
+
+    def test_from_primitive_replaces_constructor_changes(self):
+        class InitChangesObject(base.NovaObject):
+            fields = {'foo': fields.IntegerField(),
+                      'bar': fields.StringField()}
+
+            def __init__(self):
+                super(InitChangesObject, self).__init__()
+                self.bar = 'default'
+
+        obj = InitChangesObject()
+        obj.foo = 1
+        obj.obj_reset_changes()
+        obj2 = InitChangesObject.obj_from_primitive(obj.obj_to_primitive())
+        self.assertEqual(set(), obj2.obj_what_changed())
+
+        obj.foo = 2
+        obj2 = InitChangesObject.obj_from_primitive(obj.obj_to_primitive())
+        self.assertEqual(set(['foo']), obj2.obj_what_changed())
+
     def test_static_result(self):
         obj = MyObj.query(self.context)
         self.assertEqual(obj.bar, 'bar')
@@ -621,3 +621,160 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
             request_spec, filter_properties)
         self.assertEqual(filter_properties.get('pci_requests'),
                          requests)
+
+    def _claim_hosts(self):
+        hosts = []
+        for i in range(2):
+            host_state = fakes.FakeHostState('host%d' % i, 'node%d' % i,
+                                             {'compute_node_id': i,
+                                              'generation': 4})
+            hosts.append(weights.WeighedHost(host_state, 2.0 - i))
+        return hosts
+
+    def test_claim_host(self):
+        instance_properties = {'memory_mb': 512, 'vcpus': 1,
+                               'root_gb': 10, 'ephemeral_gb': 5}
+        weighed_hosts = self._claim_hosts()
+        with mock.patch.object(db, 'compute_node_claim',
+                               return_value=5) as claim:
+            chosen = self.driver._claim_host(self.context, weighed_hosts, 1,
+                                             {}, instance_properties, 0)
+        self.assertEqual(weighed_hosts[0], chosen)
+        self.assertEqual(5, chosen.obj.generation)
+        claim.assert_called_once_with(self.context, 0, 4, 512, 1, 15)
+
+    def test_claim_host_swap(self):
+        instance_properties = {'memory_mb': 512, 'vcpus': 1,
+                               'root_gb': 10, 'ephemeral_gb': 5}
+        filter_properties = {'instance_type': {'swap': 1536}}
+        weighed_hosts = self._claim_hosts()
+        with mock.patch.object(db, 'compute_node_claim',
+                               return_value=5) as claim:
+            self.driver._claim_host(self.context, weighed_hosts, 1,
+                                    filter_properties, instance_properties, 0)
+        claim.assert_called_once_with(self.context, 0, 4, 512, 1, 17)
+
+    def test_claim_host_conflict_host_still_passes(self):
+        instance_properties = {'memory_mb': 512, 'vcpus': 1,
+                               'root_gb': 10, 'ephemeral_gb': 0}
+        weighed_hosts = self._claim_hosts()
+        host_state = weighed_hosts[0].obj
+        conflict = exception.ComputeNodeClaimConflict(compute_id=0)
+
+        def refresh(context, host_state):
+            host_state.generation = 6
+
+        with contextlib.nested(
+            mock.patch.object(db, 'compute_node_claim',
+                              side_effect=[conflict, 7]),
+            mock.patch.object(self.driver.host_manager,
+                              'refresh_host_state', side_effect=refresh),
+            mock.patch.object(self.driver.host_manager,
+                              'get_filtered_hosts',
+                              return_value=[host_state])
+        ) as (claim, refresh_host_state, get_filtered_hosts):
+            chosen = self.driver._claim_host(self.context, weighed_hosts, 1,
+                                             {}, instance_properties, 0)
+        self.assertEqual(weighed_hosts[0], chosen)
+        self.assertEqual(7, host_state.generation)
+        self.assertEqual([mock.call(self.context, 0, 4, 512, 1, 10),
+                          mock.call(self.context, 0, 6, 512, 1, 10)],
+                         claim.call_args_list)
+
+    def test_claim_host_conflict_host_filtered_out(self):
+        self.flags(scheduler_claim_attempts=2)
+        instance_properties = {'memory_mb': 512, 'vcpus': 1,
+                               'root_gb': 10, 'ephemeral_gb': 0}
+        weighed_hosts = self._claim_hosts()
+        conflict = exception.ComputeNodeClaimConflict(compute_id=0)
+
+        with contextlib.nested(
+            mock.patch.object(db, 'compute_node_claim',
+                              side_effect=[conflict, 5]),
+            mock.patch.object(self.driver.host_manager,
+                              'refresh_host_state'),
+            mock.patch.object(self.driver.host_manager,
+                              'get_filtered_hosts', return_value=[])
+        ) as (claim, refresh_host_state, get_filtered_hosts):
+            chosen = self.driver._claim_host(self.context, weighed_hosts, 1,
+                                             {}, instance_properties, 0)
+        self.assertEqual(weighed_hosts[1], chosen)
+        self.assertEqual(2, len(weighed_hosts))
+
+    def test_claim_host_gives_up(self):
+        self.flags(scheduler_claim_attempts=1)
+        instance_properties = {'memory_mb': 512, 'vcpus': 1,
+                               'root_gb': 10, 'ephemeral_gb': 0}
+        conflict = exception.ComputeNodeClaimConflict(compute_id=0)
+
+        with contextlib.nested(
+            mock.patch.object(db, 'compute_node_claim', side_effect=conflict),
+            mock.patch.object(self.driver.host_manager,
+                              'refresh_host_state',
+                              side_effect=exception.ComputeHostNotFound(
+                                  host=0))
+        ):
+            self.assertIsNone(self.driver._claim_host(
+                self.context, self._claim_hosts(), 1, {},
+                instance_properties, 0))
+
+    def _schedule_on_ram(self, num_instances, batch):
+        self.flags(scheduler_default_filters=['RamFilter'],
+                   scheduler_batch_placement=batch)
+        sched = fakes.FakeFilterScheduler()
+        self.flags(ram_allocation_ratio=1.0)
+        host_states = []
+        for i, ram in enumerate([2048, 4096, 1024, 4096, 3072]):
+            host_states.append(fakes.FakeHostState('host%d' % i,
+                    'node%d' % i, {'free_ram_mb': ram,
+                                   'total_usable_ram_mb': ram,
+                                   'free_disk_mb': 102400}))
+        instance_properties = {'project_id': 1,
+                               'root_gb': 10,
+                               'memory_mb': 1024,
+                               'ephemeral_gb': 0,
+                               'vcpus': 1,
+                               'os_type': 'Linux'}
+        instance_type = {'memory_mb': 1024, 'root_gb': 10,
+                         'ephemeral_gb': 0, 'swap': 0, 'vcpus': 1}
+        request_spec = dict(instance_properties=instance_properties,
+                            instance_type=instance_type,
+                            num_instances=num_instances)
+        with contextlib.nested(
+            mock.patch.object(sched.host_manager, 'get_all_host_states',
+                              return_value=host_states),
+            mock.patch.object(sched, '_batch_schedule',
+                              wraps=sched._batch_schedule)
+        ) as (get_all_host_states, batch_schedule):
+            hosts = sched._schedule(self.context, request_spec, {})
+        self.assertEqual(batch, batch_schedule.called)
+        return [weighed_host.obj.host for weighed_host in hosts]
+
+    def test_batch_placement_matches_sequential(self):
+        sequential = self._schedule_on_ram(20, batch=False)
+        batched = self._schedule_on_ram(20, batch=True)
+        # 14GB of free RAM, so only 14 of the instances fit
+        self.assertEqual(14, len(sequential))
+        self.assertEqual(sequential, batched)
+
+    def test_batch_placement_skipped_for_groups(self):
+        self.flags(scheduler_batch_placement=True)
+        sched = fakes.FakeFilterScheduler()
+        self.stubs.Set(sched.host_manager, 'get_filtered_hosts',
+                fake_get_filtered_hosts)
+        request_spec = {'instance_properties': {'project_id': 1,
+                                                'root_gb': 512,
+                                                'memory_mb': 512,
+                                                'ephemeral_gb': 0,
+                                                'vcpus': 1,
+                                                'os_type': 'Linux'},
+                        'num_instances': 2}
+        with contextlib.nested(
+            mock.patch.object(sched, '_setup_instance_group',
+                              return_value=True),
+            mock.patch.object(sched, '_batch_schedule'),
+            mock.patch.object(sched.host_manager, 'get_all_host_states',
+                              return_value=[])
+        ) as (setup_instance_group, batch_schedule, get_all_host_states):
+            sched._schedule(self.context, request_spec, {})
+        self.assertFalse(batch_schedule.called)
@@ -204,3 +204,75 @@ class FiltersTestCase(test.NoDBTestCase):
                                                      filter_objs_initial,
                                                      filter_properties)
         self.assertIsNone(result)
+
+    def test_get_filtered_objects_records_stats(self):
+        def _fake_base_loader_init(*args, **kwargs):
+            pass
+
+        self.stubs.Set(loadables.BaseLoader, '__init__',
+                       _fake_base_loader_init)
+
+        class RejectOddFilter(filters.BaseFilter):
+            def _filter_one(self, obj, filter_properties):
+                return obj % 2 == 0
+
+        class PassAllFilter(filters.BaseFilter):
+            def _filter_one(self, obj, filter_properties):
+                return True
+
+        filter_handler = filters.BaseFilterHandler(filters.BaseFilter)
+        result = filter_handler.get_filtered_objects(
+                [RejectOddFilter, PassAllFilter], range(10), {})
+        self.assertEqual([0, 2, 4, 6, 8], result)
+
+        stats = filter_handler.get_filter_stats()
+        self.assertEqual(1, stats['RejectOddFilter']['runs'])
+        self.assertEqual(10, stats['RejectOddFilter']['objects_in'])
+        self.assertEqual(5, stats['RejectOddFilter']['objects_out'])
+        self.assertEqual(0.5, stats['RejectOddFilter']['pass_ratio'])
+        self.assertEqual(5, stats['PassAllFilter']['objects_in'])
+        self.assertEqual(1.0, stats['PassAllFilter']['pass_ratio'])
+
+        filter_handler.reset_filter_stats()
+        self.assertEqual({}, filter_handler.get_filter_stats())
+
+    def test_order_by_cost(self):
+        def _fake_base_loader_init(*args, **kwargs):
+            pass
+
+        self.stubs.Set(loadables.BaseLoader, '__init__',
+                       _fake_base_loader_init)
+
+        filter_handler = filters.BaseFilterHandler(filters.BaseFilter)
+        filter_classes = [Filter1, Filter2]
+
+        # Not enough statistics yet, keep the configured order
+        self.assertEqual(filter_classes,
+                         filter_handler.order_by_cost(filter_classes))
+
+        for i in xrange(10):
+            # Filter1 is expensive and rejects few objects, Filter2 is
+            # cheap and rejects most of them
+            filter_handler._record_stats('Filter1', 100, 90, 1.0)
+            filter_handler._record_stats('Filter2', 100, 10, 0.1)
+        self.assertEqual([Filter2, Filter1],
+                         filter_handler.order_by_cost(filter_classes))
+        self.assertEqual(filter_classes,
+                         filter_handler.order_by_cost(filter_classes,
+                                                      min_runs=11))
+
+    def test_filter_stats_rank(self):
+        stats = filters.FilterStats()
+        self.assertEqual(1.0, stats.pass_ratio)
+        self.assertEqual(0.0, stats.cost)
+        self.assertEqual(float('inf'), stats.rank())
+
+        stats.record(10, 5, 1.0)
+        self.assertEqual(0.5, stats.pass_ratio)
+        self.assertEqual(0.1, stats.cost)
+        self.assertEqual(0.2, stats.rank())
+
+        # A filter that never rejects anything goes last
+        stats = filters.FilterStats()
+        stats.record(10, 10, 0.001)
+        self.assertEqual(float('inf'), stats.rank())
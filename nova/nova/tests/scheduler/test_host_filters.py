@@ -19,6 +19,7 @@ import httplib
 
 from oslo.config import cfg
 import stubout
+import testtools
 
 from nova import context
 from nova import db
@@ -28,6 +29,8 @@ from nova.pci import pci_stats
 from nova.scheduler import filters
 from nova.scheduler.filters import extra_specs_ops
 from nova.scheduler.filters import trusted_filter
+from nova.scheduler import host_attribute_index
+from nova.scheduler import host_columns
 from nova import servicegroup
 from nova import test
 from nova.tests.scheduler import fakes
@@ -1422,6 +1425,59 @@ class HostFiltersTestCase(test.NoDBTestCase):
                 {'vcpus_total': 4, 'vcpus_used': 8})
         self.assertFalse(filt_cls.host_passes(host, filter_properties))
 
+    @testtools.skipIf(not host_columns.available(), "numpy not available")
+    def test_resource_filters_columnar(self):
+        self.flags(ram_allocation_ratio=1.0, cpu_allocation_ratio=2.0,
+                   disk_allocation_ratio=1.0)
+        filter_properties = {'instance_type': {'memory_mb': 1024, 'vcpus': 2,
+                                               'root_gb': 1,
+                                               'ephemeral_gb': 0,
+                                               'swap': 0}}
+        resources = [
+            # fits
+            (2048, 2048, 4, 0, 2048, 2),
+            # not enough ram
+            (1023, 2048, 4, 0, 2048, 2),
+            # not enough vcpus, 2 * 2 - 3 < 2
+            (2048, 2048, 2, 3, 2048, 2),
+            # not enough disk
+            (2048, 2048, 4, 0, 1023, 2),
+            # unknown vcpus always pass CoreFilter
+            (2048, 2048, 0, 0, 2048, 2),
+        ]
+        hosts = [fakes.FakeHostState('host%d' % i, 'node',
+                                     {'free_ram_mb': free_ram,
+                                      'total_usable_ram_mb': total_ram,
+                                      'vcpus_total': vcpus_total,
+                                      'vcpus_used': vcpus_used,
+                                      'free_disk_mb': free_disk,
+                                      'total_usable_disk_gb': total_disk})
+                 for i, (free_ram, total_ram, vcpus_total, vcpus_used,
+                         free_disk, total_disk) in enumerate(resources)]
+        columns = host_columns.HostColumns(hosts)
+
+        for name in ('RamFilter', 'CoreFilter', 'DiskFilter'):
+            filt_cls = self.class_map[name]()
+            for host in hosts:
+                host.limits = {}
+            expected = [host for host in hosts
+                        if filt_cls.host_passes(host, filter_properties)]
+            expected_limits = [dict(host.limits) for host in expected]
+            for host in hosts:
+                host.limits = {}
+            result = filt_cls.filter_all(hosts, filter_properties)
+            self.assertEqual(expected, result)
+            self.assertEqual(expected_limits,
+                             [host.limits for host in result])
+        self.assertNotIn('vcpu', hosts[4].limits)
+
+        # consuming an instance only updates the host's own row
+        hosts[0].consume_from_instance({'root_gb': 1, 'ephemeral_gb': 0,
+                                        'memory_mb': 1024, 'vcpus': 2})
+        self.assertEqual([1024, 1023, 2048, 2048, 2048],
+                         columns['free_ram_mb'].tolist())
+        self.assertEqual(2, columns['vcpus_used'][0])
+
     def test_aggregate_core_filter_value_error(self):
         filt_cls = self.class_map['AggregateCoreFilter']()
         filter_properties = {'context': self.context,
@@ -1830,3 +1886,52 @@ class HostFiltersTestCase(test.NoDBTestCase):
                                    attribute_dict={'metrics': metrics})
         filt_cls = self.class_map['MetricsFilter']()
         self.assertFalse(filt_cls.host_passes(host, None))
+
+    def _cvrm_filter_properties(self, metadata):
+        return {'context': self.context,
+                'request_spec': {
+                    'instance_properties': {'metadata': metadata}}}
+
+    def test_cvrm_attribute_filter_without_index(self):
+        self._create_aggregate_with_host(name='fake1',
+                                         metadata={'cvrm:color': 'red'},
+                                         hosts=['host1'])
+        self._create_aggregate_with_host(name='fake2',
+                                         metadata={'cvrm:color': 'blue'},
+                                         hosts=['host1'])
+        filt_cls = self.class_map['CvrmAttributeFilter']()
+        host1 = fakes.FakeHostState('host1', 'node1', {})
+        host2 = fakes.FakeHostState('host2', 'node1', {})
+        self.assertTrue(filt_cls.host_passes(
+            host1, self._cvrm_filter_properties({'color': 'blue'})))
+        self.assertFalse(filt_cls.host_passes(
+            host1, self._cvrm_filter_properties({'color': 'green'})))
+        self.assertTrue(filt_cls.host_passes(
+            host2, self._cvrm_filter_properties({'color': 'green'})))
+
+    def test_cvrm_attribute_filter(self):
+        index = host_attribute_index.HostAttributeIndex(
+            {'host1': {'color': set(['red'])},
+             'host2': {'color': set(['blue', 'green'])},
+             'host3': {'level': set(['high'])}})
+        filter_properties = self._cvrm_filter_properties({'color': 'green'})
+        filt_cls = self.class_map['CvrmAttributeFilter']()
+        results = {}
+        for name in ('host1', 'host2', 'host3', 'host4'):
+            host = fakes.FakeHostState(name, 'node1',
+                                       {'attribute_index': index})
+            results[name] = filt_cls.host_passes(host, filter_properties)
+        self.assertEqual({'host1': False, 'host2': True, 'host3': True,
+                          'host4': True}, results)
+
+    def test_cvrm_attribute_filter_unknown_value(self):
+        index = host_attribute_index.HostAttributeIndex(
+            {'host1': {'color': set(['red'])}, 'host2': {}})
+        filter_properties = self._cvrm_filter_properties({'color': 'pink'})
+        filt_cls = self.class_map['CvrmAttributeFilter']()
+        host1 = fakes.FakeHostState('host1', 'node1',
+                                    {'attribute_index': index})
+        host2 = fakes.FakeHostState('host2', 'node1',
+                                    {'attribute_index': index})
+        self.assertFalse(filt_cls.host_passes(host1, filter_properties))
+        self.assertTrue(filt_cls.host_passes(host2, filter_properties))
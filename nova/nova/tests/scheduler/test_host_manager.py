@@ -15,6 +15,8 @@
 """
 Tests For HostManager
 """
+import datetime
+
 from nova.compute import task_states
 from nova.compute import vm_states
 from nova import db
@@ -102,6 +104,27 @@ class HostManagerTestCase(test.NoDBTestCase):
                 fake_properties)
         self._verify_result(info, result)
 
+    def test_get_filtered_hosts_adaptive_filter_order(self):
+        self.flags(scheduler_adaptive_filter_order=True)
+        fake_properties = {'moo': 1, 'cow': 2}
+
+        info = {'expected_objs': self.fake_hosts,
+                'expected_fprops': fake_properties}
+
+        self._mock_get_filtered_hosts(info)
+        self.mox.StubOutWithMock(self.host_manager.filter_handler,
+                                 'order_by_cost')
+        self.host_manager.filter_handler.order_by_cost(
+                [FakeFilterClass1]).AndReturn([FakeFilterClass1])
+
+        self.mox.ReplayAll()
+        result = self.host_manager.get_filtered_hosts(self.fake_hosts,
+                fake_properties)
+        self._verify_result(info, result)
+        stats = self.host_manager.get_filter_stats()
+        self.assertEqual(len(self.fake_hosts),
+                         stats['FakeFilterClass1']['objects_out'])
+
     def test_get_filtered_hosts_with_specified_filters(self):
         fake_properties = {'moo': 1, 'cow': 2}
 
@@ -314,6 +337,31 @@ class HostManagerTestCase(test.NoDBTestCase):
         self.assertEqual(host_states_map[('host4', 'node4')].free_disk_mb,
                          8388608)
 
+    def test_get_all_host_states_builds_attribute_index(self):
+        self.flags(scheduler_default_filters=['CvrmAttributeFilter'])
+        context = 'fake_context'
+        aggregates = [{'hosts': ['host1', 'host2'],
+                       'metadetails': {'cvrm:color': 'red',
+                                       'availability_zone': 'az1'}}]
+
+        self.mox.StubOutWithMock(db, 'aggregate_get_all')
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        db.aggregate_get_all(context).AndReturn(aggregates)
+        db.compute_node_get_all(context).AndReturn(fakes.COMPUTE_NODES)
+        # the index is not rebuilt within the refresh interval
+        db.compute_node_get_all(context).AndReturn(fakes.COMPUTE_NODES)
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        self.host_manager.get_all_host_states(context)
+        index = self.host_manager.host_attribute_index
+        self.assertEqual(['color'], index.bits.keys())
+        for host_state in self.host_manager.host_state_map.values():
+            self.assertIs(index, host_state.attribute_index)
+        code = index.encode({'color': 'blue'})
+        self.assertFalse(index.host_passes('host1', code))
+        self.assertTrue(index.host_passes('host3', code))
+
 
 class HostManagerChangedNodesTestCase(test.NoDBTestCase):
     """Test case for HostManager class."""
@@ -372,6 +420,93 @@ class HostManagerChangedNodesTestCase(test.NoDBTestCase):
         host_states_map = self.host_manager.host_state_map
         self.assertEqual(len(host_states_map), 0)
 
+    def _dated_compute_nodes(self, updated_at):
+        compute_nodes = []
+        for compute in fakes.COMPUTE_NODES:
+            compute = dict(compute, updated_at=updated_at, deleted=0,
+                           service_id=compute['id'])
+            if compute['service']:
+                compute['service'] = dict(compute['service'],
+                                          id=compute['id'])
+            compute_nodes.append(compute)
+        return compute_nodes
+
+    @staticmethod
+    def _services(compute_nodes):
+        return [compute['service'] for compute in compute_nodes
+                if compute['service']]
+
+    def test_get_all_host_states_incremental(self):
+        self.flags(scheduler_host_state_full_refresh_interval=300)
+        context = 'fake_context'
+        then = datetime.datetime(2014, 1, 1, 12, 0, 0)
+        now = then + datetime.timedelta(seconds=60)
+        compute_nodes = self._dated_compute_nodes(then)
+        changed = dict(compute_nodes[1], updated_at=now, free_ram_mb=256)
+        deleted = dict(compute_nodes[3], deleted=4, deleted_at=now)
+        services = self._services(compute_nodes[:3])
+        services[0] = dict(services[0], disabled=True)
+
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        self.mox.StubOutWithMock(db, 'compute_node_get_all_changed_since')
+        db.compute_node_get_all(context).AndReturn(compute_nodes)
+        db.compute_node_get_all_changed_since(context, then).AndReturn(
+            {'compute_nodes': [changed, deleted], 'services': services})
+        db.compute_node_get_all_changed_since(context, now).AndReturn(
+            {'compute_nodes': [], 'services': services})
+        self.mox.ReplayAll()
+
+        for i in range(3):
+            self.host_manager.get_all_host_states(context)
+        host_states_map = self.host_manager.host_state_map
+        self.assertEqual(3, len(host_states_map))
+        self.assertNotIn(('host4', 'node4'), host_states_map)
+        self.assertEqual(256, host_states_map[('host2', 'node2')].free_ram_mb)
+        host1_service = host_states_map[('host1', 'node1')].service
+        self.assertTrue(host1_service['disabled'])
+
+    def test_get_all_host_states_incremental_deleted_service(self):
+        self.flags(scheduler_host_state_full_refresh_interval=300)
+        context = 'fake_context'
+        then = datetime.datetime(2014, 1, 1, 12, 0, 0)
+        compute_nodes = self._dated_compute_nodes(then)
+        # The service of host3 was deleted without its compute node row
+        # showing up as changed.
+        services = self._services(compute_nodes)
+        del services[2]
+
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        self.mox.StubOutWithMock(db, 'compute_node_get_all_changed_since')
+        db.compute_node_get_all(context).AndReturn(compute_nodes)
+        db.compute_node_get_all_changed_since(context, then).AndReturn(
+            {'compute_nodes': [], 'services': services})
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        self.assertIn(('host3', 'node3'), self.host_manager.host_state_map)
+        self.host_manager.get_all_host_states(context)
+        host_states_map = self.host_manager.host_state_map
+        self.assertEqual(3, len(host_states_map))
+        self.assertNotIn(('host3', 'node3'), host_states_map)
+
+    def test_get_all_host_states_full_refresh_after_interval(self):
+        self.flags(scheduler_host_state_full_refresh_interval=300)
+        context = 'fake_context'
+        then = datetime.datetime(2014, 1, 1, 12, 0, 0)
+        compute_nodes = self._dated_compute_nodes(then)
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+
+        self.mox.StubOutWithMock(db, 'compute_node_get_all')
+        db.compute_node_get_all(context).AndReturn(compute_nodes)
+        db.compute_node_get_all(context).AndReturn(compute_nodes[:2])
+        self.mox.ReplayAll()
+
+        self.host_manager.get_all_host_states(context)
+        timeutils.advance_time_seconds(300)
+        self.host_manager.get_all_host_states(context)
+        self.assertEqual(2, len(self.host_manager.host_state_map))
+
 
 class HostStateTestCase(test.NoDBTestCase):
     """Test case for HostState class."""
@@ -391,6 +526,7 @@ class HostStateTestCase(test.NoDBTestCase):
             'num_os_type_linux': '4',
             'num_os_type_windoze': '1',
             'io_workload': '42',
+            'cached_images': 'aa,bb',
         }
         stats = jsonutils.dumps(stats)
 
@@ -416,7 +552,8 @@ class HostStateTestCase(test.NoDBTestCase):
         self.assertEqual(4, host.num_instances_by_os_type['linux'])
         self.assertEqual(1, host.num_instances_by_os_type['windoze'])
         self.assertEqual(42, host.num_io_ops)
-        self.assertEqual(10, len(host.stats))
+        self.assertEqual(set(['aa', 'bb']), host.cached_images)
+        self.assertEqual(11, len(host.stats))
 
         self.assertEqual('127.0.0.1', host.host_ip)
         self.assertEqual('htype', host.hypervisor_type)
@@ -16,9 +16,11 @@
 Tests For Scheduler weights.
 """
 
+from nova.compute import cached_images
 from nova import context
 from nova import exception
 from nova.openstack.common.fixture import mockpatch
+from nova.scheduler import host_columns
 from nova.scheduler import weights
 from nova import test
 from nova.tests import matchers
@@ -36,9 +38,10 @@ class TestWeighedHost(test.NoDBTestCase):
     def test_all_weighers(self):
         classes = weights.all_weighers()
         class_names = [cls.__name__ for cls in classes]
-        self.assertEqual(len(classes), 2)
+        self.assertEqual(len(classes), 3)
         self.assertIn('RAMWeigher', class_names)
         self.assertIn('MetricsWeigher', class_names)
+        self.assertIn('ImageCacheWeigher', class_names)
 
 
 class RamWeigherTestCase(test.NoDBTestCase):
@@ -129,6 +132,14 @@ class RamWeigherTestCase(test.NoDBTestCase):
         self.assertEqual(weighed_host.obj.host, "negative")
 
 
+class ColumnarRamWeigherTestCase(RamWeigherTestCase):
+    def setUp(self):
+        if not host_columns.available():
+            self.skipTest("numpy not available")
+        super(ColumnarRamWeigherTestCase, self).setUp()
+        self.flags(scheduler_columnar_host_states=True)
+
+
 class MetricsWeigherTestCase(test.NoDBTestCase):
     def setUp(self):
         super(MetricsWeigherTestCase, self).setUp()
@@ -246,3 +257,58 @@ class MetricsWeigherTestCase(test.NoDBTestCase):
         self.flags(required=False, group='metrics')
         setting = ['foo=0.0001', 'zot=-1']
         self._do_test(setting, 1.0, 'host5')
+
+
+class ColumnarMetricsWeigherTestCase(MetricsWeigherTestCase):
+    def setUp(self):
+        if not host_columns.available():
+            self.skipTest("numpy not available")
+        super(ColumnarMetricsWeigherTestCase, self).setUp()
+        self.flags(scheduler_columnar_host_states=True)
+
+
+class ImageCacheWeigherTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(ImageCacheWeigherTestCase, self).setUp()
+        self.weight_handler = weights.HostWeightHandler()
+        self.weight_classes = self.weight_handler.get_matching_classes(
+                ['nova.scheduler.weights.image_cache.ImageCacheWeigher'])
+        image_names = [cached_images.cache_name('image1'),
+                       cached_images.cache_name('image2')]
+        bloom = cached_images.encode(image_names[:1], 1024)
+        self.hosts = [
+            fakes.FakeHostState('host1', 'node1',
+                                {'cached_images': set()}),
+            fakes.FakeHostState('host2', 'node2',
+                                {'cached_images': set(image_names)}),
+            fakes.FakeHostState('host3', 'node3',
+                                {'cached_images':
+                                 cached_images.decode(bloom)}),
+        ]
+
+    def _get_weighed_hosts(self, image_ref):
+        weight_properties = {'request_spec': {
+            'instance_properties': {'image_ref': image_ref}}}
+        return self.weight_handler.get_weighed_objects(self.weight_classes,
+                self.hosts, weight_properties)
+
+    def test_image_cached(self):
+        weighed_hosts = self._get_weighed_hosts('image2')
+        self.assertEqual('host2', weighed_hosts[0].obj.host)
+        self.assertEqual(1.0, weighed_hosts[0].weight)
+        self.assertEqual([0.0, 0.0], [h.weight for h in weighed_hosts[1:]])
+
+    def test_image_cached_bloom(self):
+        weighed_hosts = self._get_weighed_hosts('image1')
+        self.assertEqual(set(['host2', 'host3']),
+                         set(h.obj.host for h in weighed_hosts[:2]))
+        self.assertEqual('host1', weighed_hosts[2].obj.host)
+
+    def test_negative_multiplier(self):
+        self.flags(image_cache_weight_multiplier=-1.0)
+        weighed_hosts = self._get_weighed_hosts('image2')
+        self.assertEqual('host2', weighed_hosts[-1].obj.host)
+
+    def test_no_image(self):
+        weighed_hosts = self._get_weighed_hosts('')
+        self.assertEqual([0.0, 0.0, 0.0], [h.weight for h in weighed_hosts])
@@ -40,8 +40,10 @@ from nova import context
 from nova import db
 from nova.db.sqlalchemy import api
 from nova import exception
+from nova import metadata_cache
 from nova.network import api as network_api
 from nova.objects import instance as instance_obj
+from nova.openstack.common import memorycache
 from nova import test
 from nova.tests import fake_block_device
 from nova.tests import fake_instance
@@ -344,6 +346,49 @@ class MetadataTestCase(test.TestCase):
         data = md.get_ec2_metadata(version='2009-04-04')
         self.assertEqual(data['meta-data']['local-ipv4'], '')
 
+    def test_can_pickle_document(self):
+        md = fake_InstanceMetadata(self.stubs, self.instance.obj_clone())
+        pickle.dumps(md.get_document(), protocol=0)
+
+    def test_document_lookups(self):
+        md = fake_InstanceMetadata(self.stubs, self.instance.obj_clone())
+        doc = base.InstanceMetadataDocument(md.get_document())
+
+        for path in ('/', '/latest/', '/2009-04-04/meta-data/',
+                     '/2009-04-04/meta-data/instance-id',
+                     '/latest/meta-data/local-ipv4',
+                     '/latest/meta-data/public-keys/0/openssh-key',
+                     '/latest/meta-data/placement/availability-zone',
+                     '/latest/user-data', '/openstack/',
+                     '/openstack/latest/', '/openstack/latest/user_data',
+                     '/openstack/latest/vendor_data.json'):
+            self.assertEqual(md.lookup(path), doc.lookup(path))
+
+        path = '/openstack/latest/meta_data.json'
+        expected = json.loads(md.lookup(path))
+        actual = json.loads(doc.lookup(path))
+        # A new random seed is given on every request.
+        self.assertIn('random_seed', actual)
+        del expected['random_seed'], actual['random_seed']
+        self.assertEqual(expected, actual)
+
+        self.assertRaises(base.InvalidMetadataVersion,
+                          doc.get_ec2_metadata, '9999-99-99')
+
+    def test_document_local_ipv4_from_address(self):
+        md = fake_InstanceMetadata(self.stubs, self.instance,
+                                   address="fake")
+        document = md.get_document()
+        self.assertEqual(md.address, "fake")
+
+        data = base.InstanceMetadataDocument(document).get_ec2_metadata(
+            version='2009-04-04')
+        self.assertNotEqual(data['meta-data']['local-ipv4'], "fake")
+
+        data = base.InstanceMetadataDocument(
+            document, address="other").get_ec2_metadata(version='2009-04-04')
+        self.assertEqual(data['meta-data']['local-ipv4'], "other")
+
 
 class OpenStackMetadataTestCase(test.TestCase):
     def setUp(self):
@@ -556,6 +601,81 @@ class MetadataHandlerTestCase(test.TestCase):
         self.flags(use_local=True, group='conductor')
         self.mdinst = fake_InstanceMetadata(self.stubs, self.instance,
             address=None, sgroups=None)
+        self.stubs.Set(metadata_cache, '_CLIENT', memorycache.Client())
+
+    def _stub_get_metadata_by_address(self):
+        calls = []
+
+        def fake_get_metadata(conductor_api, address):
+            calls.append(address)
+            return self.mdinst
+
+        self.stubs.Set(base, 'get_metadata_by_address', fake_get_metadata)
+        return calls
+
+    def test_cached_metadata_by_remote_address(self):
+        calls = self._stub_get_metadata_by_address()
+        app = handler.MetadataRequestHandler()
+
+        self.assertEqual(self.mdinst,
+                         app.get_metadata_by_remote_address('10.0.0.1'))
+        data = app.get_metadata_by_remote_address('10.0.0.1')
+
+        self.assertEqual(['10.0.0.1'], calls)
+        self.assertIsInstance(data, base.InstanceMetadataDocument)
+        self.assertEqual(self.mdinst.uuid, data.uuid)
+        self.assertEqual('10.0.0.1', data.address)
+
+    def test_cached_metadata_invalidated(self):
+        calls = self._stub_get_metadata_by_address()
+        app = handler.MetadataRequestHandler()
+
+        app.get_metadata_by_remote_address('10.0.0.1')
+        metadata_cache.invalidate(self.mdinst.uuid)
+        self.assertEqual(self.mdinst,
+                         app.get_metadata_by_remote_address('10.0.0.1'))
+        self.assertEqual(['10.0.0.1', '10.0.0.1'], calls)
+
+    def test_cached_metadata_kept_on_other_updates(self):
+        calls = self._stub_get_metadata_by_address()
+        app = handler.MetadataRequestHandler()
+
+        app.get_metadata_by_remote_address('10.0.0.1')
+        metadata_cache.instance_updated(self.mdinst.uuid,
+                                        ['vm_state', 'task_state'])
+        app.get_metadata_by_remote_address('10.0.0.1')
+        metadata_cache.instance_updated(self.mdinst.uuid,
+                                        ['task_state', 'metadata'])
+        app.get_metadata_by_remote_address('10.0.0.1')
+        self.assertEqual(['10.0.0.1', '10.0.0.1'], calls)
+
+    def test_metadata_cache_disabled(self):
+        self.flags(metadata_cache_expiration=0)
+        calls = self._stub_get_metadata_by_address()
+        app = handler.MetadataRequestHandler()
+
+        app.get_metadata_by_remote_address('10.0.0.1')
+        self.assertEqual(self.mdinst,
+                         app.get_metadata_by_remote_address('10.0.0.1'))
+        self.assertEqual(['10.0.0.1', '10.0.0.1'], calls)
+
+    def test_cached_metadata_by_instance_id(self):
+        calls = []
+
+        def fake_get_metadata(conductor_api, instance_id, address):
+            calls.append(instance_id)
+            return self.mdinst
+
+        self.stubs.Set(base, 'get_metadata_by_instance_id',
+                       fake_get_metadata)
+        app = handler.MetadataRequestHandler()
+
+        app.get_metadata_by_instance_id(self.mdinst.uuid, '10.0.0.1')
+        data = app.get_metadata_by_instance_id(self.mdinst.uuid, '10.0.0.1')
+
+        self.assertEqual([self.mdinst.uuid], calls)
+        self.assertEqual(self.instance['project_id'],
+                         data.instance['project_id'])
 
     def test_callable(self):
 
@@ -990,6 +990,103 @@ class DbQuotaDriverTestCase(test.TestCase):
                     ),
                 ))
 
+    def test_get_user_quotas_cached(self):
+        self.flags(quota_limit_cache_seconds=60)
+        self._stub_get_by_project_and_user()
+        ctxt = FakeContext('test_project', 'test_class')
+        for i in range(2):
+            self.driver.get_user_quotas(ctxt, quota.QUOTAS._resources,
+                                        'test_project', 'fake_user',
+                                        usages=False)
+
+        self.assertEqual(self.calls, [
+                'quota_get_all_by_project_and_user',
+                'quota_get_all_by_project',
+                'quota_class_get_all_by_name',
+                ])
+        self.assertEqual({'hits': 4, 'misses': 4, 'hit_rate': 0.5},
+                         self.driver.get_limit_cache_stats())
+
+        self.calls = []
+        self.driver.invalidate_limits(project_id='test_project')
+        self.driver.get_user_quotas(ctxt, quota.QUOTAS._resources,
+                                    'test_project', 'fake_user',
+                                    usages=False)
+        self.assertEqual(self.calls, [
+                'quota_get_all_by_project_and_user',
+                'quota_get_all_by_project',
+                ])
+
+        self.calls = []
+        self.driver.invalidate_limits(quota_class='test_class')
+        self.driver.get_user_quotas(ctxt, quota.QUOTAS._resources,
+                                    'test_project', 'fake_user',
+                                    usages=False)
+        self.assertEqual(self.calls, ['quota_class_get_all_by_name'])
+
+    def test_limit_cache_project_and_no_user(self):
+        self.flags(quota_limit_cache_seconds=60)
+
+        def fake_get_all_by_project(context, project_id):
+            self.calls.append('quota_get_all_by_project')
+            return dict(project_id=project_id, cores=10)
+
+        def fake_get_all_by_project_and_user(context, project_id, user_id):
+            self.calls.append('quota_get_all_by_project_and_user')
+            return dict(project_id=project_id, user_id=user_id, cores=5)
+
+        self.stubs.Set(db, 'quota_get_all_by_project',
+                       fake_get_all_by_project)
+        self.stubs.Set(db, 'quota_get_all_by_project_and_user',
+                       fake_get_all_by_project_and_user)
+        ctxt = FakeContext('test_project', 'test_class')
+        cache = self.driver.limit_cache
+        for i in range(2):
+            self.assertEqual(dict(project_id='test_project', user_id=None,
+                                  cores=5),
+                             cache.get_user_quotas(ctxt, 'test_project',
+                                                   None))
+            self.assertEqual(dict(project_id='test_project', cores=10),
+                             cache.get_project_quotas(ctxt, 'test_project'))
+
+        self.assertEqual(self.calls, [
+                'quota_get_all_by_project_and_user',
+                'quota_get_all_by_project',
+                ])
+
+    def test_limit_cache_no_project(self):
+        self.flags(quota_limit_cache_seconds=60)
+
+        def fake_get_all_by_project(context, project_id):
+            self.calls.append('quota_get_all_by_project')
+            return dict(project_id=project_id, cores=10)
+
+        self.stubs.Set(db, 'quota_get_all_by_project',
+                       fake_get_all_by_project)
+        ctxt = FakeContext(None, None)
+        cache = self.driver.limit_cache
+        for i in range(2):
+            self.assertEqual(dict(project_id=None, cores=10),
+                             cache.get_project_quotas(ctxt, None))
+
+        self.assertEqual(self.calls, ['quota_get_all_by_project'])
+
+    def test_get_user_quotas_cache_disabled(self):
+        self._stub_get_by_project_and_user()
+        ctxt = FakeContext('test_project', 'test_class')
+        for i in range(2):
+            self.driver.get_user_quotas(ctxt, quota.QUOTAS._resources,
+                                        'test_project', 'fake_user',
+                                        usages=False)
+
+        self.assertEqual(self.calls, [
+                'quota_get_all_by_project_and_user',
+                'quota_get_all_by_project',
+                'quota_class_get_all_by_name',
+                ] * 2)
+        self.assertEqual({'hits': 0, 'misses': 0, 'hit_rate': 0.0},
+                         self.driver.get_limit_cache_stats())
+
     def _stub_get_by_project_and_user_specific(self):
         def fake_quota_get(context, project_id, resource, user_id=None):
             self.calls.append('quota_get')
@@ -1997,6 +2094,66 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual(calls, exemplar)
 
 
+class CounterQuotaDriverTestCase(test.TestCase):
+    def setUp(self):
+        super(CounterQuotaDriverTestCase, self).setUp()
+        self.flags(reservation_expire=86400, until_refresh=5, max_age=60)
+        self.driver = quota.CounterQuotaDriver()
+        self.calls = []
+
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+
+    def test_reserve(self):
+        def fake_get_quotas(context, resources, keys, has_sync,
+                            project_id=None, user_id=None,
+                            project_quotas=None):
+            return dict(instances=10)
+
+        def fake_quota_reserve_counter(context, resources, quotas,
+                                       user_quotas, deltas, expire, max_age,
+                                       project_id=None, user_id=None):
+            self.calls.append(('quota_reserve_counter', deltas, expire,
+                               max_age, project_id, user_id))
+            return ['resv-1']
+
+        self.stubs.Set(db, 'quota_get_all_by_project',
+                       lambda context, project_id: {})
+        self.stubs.Set(self.driver, '_get_quotas', fake_get_quotas)
+        self.stubs.Set(db, 'quota_reserve_counter',
+                       fake_quota_reserve_counter)
+        result = self.driver.reserve(FakeContext('test_project', 'test_class'),
+                                     quota.QUOTAS._resources,
+                                     dict(instances=2))
+
+        expire = timeutils.utcnow() + datetime.timedelta(seconds=86400)
+        self.assertEqual([('quota_reserve_counter', dict(instances=2),
+                           expire, 60, 'test_project', 'fake_user')],
+                         self.calls)
+        self.assertEqual(['resv-1'], result)
+
+    def test_commit_rollback_expire(self):
+        def fake_call(name):
+            def fake(context, *args, **kwargs):
+                self.calls.append((name, args, kwargs))
+            return fake
+
+        for name in ('reservation_commit_counter',
+                     'reservation_rollback_counter',
+                     'reservation_expire_counter'):
+            self.stubs.Set(db, name, fake_call(name))
+        ctxt = FakeContext('test_project', 'test_class')
+        self.driver.commit(ctxt, ['resv-1'])
+        self.driver.rollback(ctxt, ['resv-2'], project_id='other_project')
+        self.driver.expire(ctxt)
+        self.assertEqual([
+            ('reservation_commit_counter', (['resv-1'],),
+             dict(project_id=None, user_id=None)),
+            ('reservation_rollback_counter', (['resv-2'],),
+             dict(project_id='other_project', user_id=None)),
+            ('reservation_expire_counter', (), {})], self.calls)
+
+
 class FakeSession(object):
     def begin(self):
         return self
@@ -134,6 +134,12 @@ VIR_ERR_INTERNAL_ERROR = 950
 # Readonly
 VIR_CONNECT_RO = 1
 
+# listAllDomains flags
+VIR_CONNECT_LIST_DOMAINS_RUNNING = 16
+VIR_CONNECT_LIST_DOMAINS_PAUSED = 32
+VIR_CONNECT_LIST_DOMAINS_SHUTOFF = 64
+VIR_CONNECT_LIST_DOMAINS_OTHER = 128
+
 # virConnectBaselineCPU flags
 VIR_CONNECT_BASELINE_CPU_EXPAND_FEATURES = 1
 
@@ -1001,6 +1007,21 @@ class Connection(object):
     def listDefinedDomains(self):
         return []
 
+    def listAllDomains(self, flags):
+        states = {VIR_CONNECT_LIST_DOMAINS_RUNNING: [VIR_DOMAIN_RUNNING],
+                  VIR_CONNECT_LIST_DOMAINS_PAUSED: [VIR_DOMAIN_PAUSED],
+                  VIR_CONNECT_LIST_DOMAINS_SHUTOFF: [VIR_DOMAIN_SHUTOFF]}
+        wanted = []
+        for flag, flag_states in states.iteritems():
+            if flags & flag:
+                wanted.extend(flag_states)
+        other = flags & VIR_CONNECT_LIST_DOMAINS_OTHER
+        return [dom for dom in self._vms.values()
+                if not flags or dom._state in wanted or
+                (other and dom._state not in (VIR_DOMAIN_RUNNING,
+                                              VIR_DOMAIN_PAUSED,
+                                              VIR_DOMAIN_SHUTOFF))]
+
     def listDevices(self, cap, flags):
         return []
 
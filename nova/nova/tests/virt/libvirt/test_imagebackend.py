@@ -17,6 +17,8 @@ import os
 import shutil
 import tempfile
 
+import eventlet
+from eventlet import event
 import fixtures
 import mock
 from oslo.config import cfg
@@ -891,6 +893,89 @@ class RbdTestCase(_ImageTestCase, test.NoDBTestCase):
             volume_mock.resize.assert_called_once_with(self.SIZE)
 
 
+class FetchOnceTestCase(test.NoDBTestCase):
+
+    def _fetch_concurrently(self, fetch, waiters=3):
+        leader = eventlet.spawn(imagebackend._fetch_once, fetch, 'base')
+        eventlet.sleep(0)
+        followers = [eventlet.spawn(imagebackend._fetch_once, fetch, 'base')
+                     for i in range(waiters)]
+        eventlet.sleep(0)
+        return [leader] + followers
+
+    def test_concurrent_fetches_share_one(self):
+        calls = []
+        done = event.Event()
+
+        def fetch(target):
+            calls.append(target)
+            done.wait()
+
+        fetches = self._fetch_concurrently(fetch)
+        done.send()
+        for fetch_thread in fetches:
+            fetch_thread.wait()
+        self.assertEqual(['base'], calls)
+        self.assertEqual({}, imagebackend._FETCHES)
+
+    def test_concurrent_fetches_share_failure(self):
+        done = event.Event()
+
+        def fetch(target):
+            done.wait()
+            raise test.TestingException()
+
+        fetches = self._fetch_concurrently(fetch)
+        done.send()
+        for fetch_thread in fetches:
+            self.assertRaises(test.TestingException, fetch_thread.wait)
+        self.assertEqual({}, imagebackend._FETCHES)
+
+    def test_fetch_too_small_for_leader_retried(self):
+        calls = []
+        done = event.Event()
+
+        def fetch(target, max_size):
+            calls.append(max_size)
+            if max_size == 1:
+                done.wait()
+                raise exception.FlavorDiskTooSmall()
+
+        leader = eventlet.spawn(imagebackend._fetch_once, fetch, 'base',
+                                max_size=1)
+        eventlet.sleep(0)
+        follower = eventlet.spawn(imagebackend._fetch_once, fetch, 'base',
+                                  max_size=2)
+        eventlet.sleep(0)
+        done.send()
+        self.assertRaises(exception.FlavorDiskTooSmall, leader.wait)
+        follower.wait()
+        self.assertEqual([1, 2], calls)
+
+    def test_shared_fetch_checked_against_each_flavor(self):
+        calls = []
+        done = event.Event()
+
+        def fetch(target, max_size):
+            calls.append(max_size)
+            done.wait()
+
+        self.stubs.Set(imagebackend.disk, 'get_disk_size', lambda path: 5)
+        leader = eventlet.spawn(imagebackend._fetch_once, fetch, 'base',
+                                max_size=10)
+        eventlet.sleep(0)
+        large = eventlet.spawn(imagebackend._fetch_once, fetch, 'base',
+                               max_size=5)
+        small = eventlet.spawn(imagebackend._fetch_once, fetch, 'base',
+                               max_size=1)
+        eventlet.sleep(0)
+        done.send()
+        leader.wait()
+        large.wait()
+        self.assertRaises(exception.FlavorDiskTooSmall, small.wait)
+        self.assertEqual([10], calls)
+
+
 class BackendTestCase(test.NoDBTestCase):
     INSTANCE = {'name': 'fake-instance',
                 'uuid': uuidutils.generate_uuid()}
@@ -898,6 +983,7 @@ class BackendTestCase(test.NoDBTestCase):
 
     def setUp(self):
         super(BackendTestCase, self).setUp()
+        self.flags(instances_path=self.useFixture(fixtures.TempDir()).path)
 
         def fake_chown(path, owner_uid=None):
             return None
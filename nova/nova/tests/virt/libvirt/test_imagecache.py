@@ -159,6 +159,20 @@ class ImageCacheManagerTestCase(test.NoDBTestCase):
                                 '10737418240')
         self.assertNotIn(unexpected, image_cache_manager.originals)
 
+    def test_get_cached_images(self):
+        listing = ['e97222e91fc4241f49a7f520d1dcf446751129b3',
+                   'e97222e91fc4241f49a7f520d1dcf446751129b3_10737418240',
+                   'e97222e91fc4241f49a7f520d1dcf446751129b3.info',
+                   '17d1b00b81642842e514494a78e804e9a511637c.part',
+                   'ephemeral_0_20_None',
+                   '00000004']
+        self.stubs.Set(os, 'listdir', lambda x: listing)
+        self.stubs.Set(os.path, 'exists', lambda x: True)
+
+        image_cache_manager = imagecache.ImageCacheManager()
+        self.assertEqual(['e97222e91fc4241f49a7f520d1dcf446751129b3'],
+                         image_cache_manager.get_cached_images())
+
     def test_list_backing_images_small(self):
         self.stubs.Set(os, 'listdir',
                        lambda x: ['_base', 'instance-00000001',
@@ -244,6 +258,79 @@ class ImageCacheManagerTestCase(test.NoDBTestCase):
         self.assertRaises(processutils.ProcessExecutionError,
                           image_cache_manager._list_backing_images)
 
+    def _make_instance_disk(self, tmpdir, name):
+        instance_dir = os.path.join(tmpdir, name)
+        os.mkdir(instance_dir)
+        open(os.path.join(instance_dir, 'disk'), 'w').close()
+        return instance_dir
+
+    def _count_backing_file_calls(self):
+        calls = []
+
+        def fake_get_disk_backing_file(disk_path):
+            calls.append(disk_path)
+            return 'e97222e91fc4241f49a7f520d1dcf446751129b3'
+
+        self.stubs.Set(virtutils, 'get_disk_backing_file',
+                       fake_get_disk_backing_file)
+        return calls
+
+    def test_list_backing_images_indexed(self):
+        calls = self._count_backing_file_calls()
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir)
+            instance_dir = self._make_instance_disk(tmpdir,
+                                                    'instance-00000001')
+            found = os.path.join(tmpdir, CONF.image_cache_subdirectory_name,
+                                 'e97222e91fc4241f49a7f520d1dcf446751129b3')
+
+            image_cache_manager = imagecache.ImageCacheManager()
+            image_cache_manager.instance_names = self.stock_instance_names
+            self.assertEqual([found],
+                             image_cache_manager._list_backing_images())
+            self.assertEqual([found],
+                             image_cache_manager._list_backing_images())
+            self.assertEqual(1, len(calls))
+
+            # The disk is replaced, e.g. by a rebuild:
+            os.utime(instance_dir, (0, 0))
+            self.assertEqual([found],
+                             image_cache_manager._list_backing_images())
+            self.assertEqual(2, len(calls))
+
+            # The instance is gone:
+            image_cache_manager.instance_names = set()
+            image_cache_manager._list_backing_images()
+            self.assertEqual({}, image_cache_manager.backing_files)
+
+    def test_list_backing_images_index_file(self):
+        calls = self._count_backing_file_calls()
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir)
+            self.flags(image_cache_index_path=os.path.join(tmpdir, 'index'),
+                       group='libvirt')
+            self._make_instance_disk(tmpdir, 'instance-00000001')
+
+            image_cache_manager = imagecache.ImageCacheManager()
+            image_cache_manager.instance_names = self.stock_instance_names
+            image_cache_manager._list_backing_images()
+            self.assertEqual(1, len(calls))
+
+            image_cache_manager = imagecache.ImageCacheManager()
+            image_cache_manager.instance_names = self.stock_instance_names
+            image_cache_manager._list_backing_images()
+            self.assertEqual(1, len(calls))
+
+    def test_list_backing_images_bad_index_file(self):
+        with utils.tempdir() as tmpdir:
+            index_path = os.path.join(tmpdir, 'index')
+            self.flags(image_cache_index_path=index_path, group='libvirt')
+            with open(index_path, 'w') as f:
+                f.write('banana')
+
+            image_cache_manager = imagecache.ImageCacheManager()
+            self.assertEqual({}, image_cache_manager.backing_files)
+
     def test_find_base_file_nothing(self):
         self.stubs.Set(os.path, 'exists', lambda x: False)
 
@@ -865,6 +952,24 @@ class VerifyChecksumTestCase(test.NoDBTestCase):
                 log = stream.getvalue()
                 self.assertNotEqual(log.find('image verification failed'), -1)
 
+    def test_verify_checksum_budget(self):
+        self.flags(checksum_bytes_per_pass=1, group='libvirt')
+        with utils.tempdir() as tmpdir:
+            image_cache_manager, fname = self._check_body(tmpdir, "csum valid")
+            self.assertTrue(image_cache_manager._verify_checksum(self.img,
+                                                                 fname))
+
+            # The budget of the pass is spent:
+            with open(imagecache.get_info_filename(fname), 'w') as f:
+                f.write('{"sha1": "banana"}')
+            self.assertIsNone(image_cache_manager._verify_checksum(self.img,
+                                                                   fname))
+
+            # The next pass checksums it:
+            image_cache_manager._reset_state()
+            self.assertFalse(image_cache_manager._verify_checksum(self.img,
+                                                                  fname))
+
     def test_verify_checksum_file_missing(self):
         with utils.tempdir() as tmpdir:
             self.flags(instances_path=tmpdir)
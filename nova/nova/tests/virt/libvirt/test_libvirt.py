@@ -2567,6 +2567,43 @@ class LibvirtConnTestCase(test.TestCase):
         conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
         self.assertRaises(exception.NovaException, conn.list_instance_uuids)
 
+    def test_list_instance_power_states(self):
+        def fake_domain(name, state=None):
+            domain = mock.Mock()
+            domain.name.return_value = name
+            domain.info.return_value = [state, 2048, 2048, 1, 1234]
+            return domain
+
+        domains = {
+            libvirt_driver.VIR_CONNECT_LIST_DOMAINS_RUNNING:
+                [fake_domain('running')],
+            libvirt_driver.VIR_CONNECT_LIST_DOMAINS_PAUSED:
+                [fake_domain('paused')],
+            libvirt_driver.VIR_CONNECT_LIST_DOMAINS_SHUTOFF:
+                [fake_domain('shutoff')],
+            libvirt_driver.VIR_CONNECT_LIST_DOMAINS_OTHER:
+                [fake_domain('crashed', libvirt_driver.VIR_DOMAIN_CRASHED)],
+        }
+
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        with contextlib.nested(
+            mock.patch.object(conn, 'has_min_version', return_value=True),
+            mock.patch.object(libvirt_driver.LibvirtDriver, '_conn')
+        ) as (has_min_version, mock_conn):
+            mock_conn.listAllDomains.side_effect = domains.get
+            states = conn.list_instance_power_states()
+        self.assertEqual({'running': power_state.RUNNING,
+                          'paused': power_state.PAUSED,
+                          'shutoff': power_state.SHUTDOWN,
+                          'crashed': power_state.CRASHED}, states)
+        self.assertEqual(4, mock_conn.listAllDomains.call_count)
+
+    def test_list_instance_power_states_old_libvirt(self):
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        with mock.patch.object(conn, 'has_min_version', return_value=False):
+            self.assertRaises(NotImplementedError,
+                              conn.list_instance_power_states)
+
     def test_get_all_block_devices(self):
         xml = [
             # NOTE(vish): id 0 is skipped
@@ -12,6 +12,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+import shutil
+import tempfile
+
+import mock
 
 from nova import test
 from nova.virt import images
@@ -22,3 +27,40 @@ class QemuTestCase(test.NoDBTestCase):
         image_info = images.qemu_img_info("/path/that/does/not/exist")
         self.assertTrue(image_info)
         self.assertTrue(str(image_info))
+
+
+class FetchTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(FetchTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'image')
+
+    @mock.patch('nova.image.glance.get_remote_image_service')
+    def test_fetch_writes_chunks(self, mock_get_service):
+        image_service = mock.Mock()
+        mock_get_service.return_value = (image_service, 'image-id')
+
+        def download(context, image_id, data=None, dst_path=None):
+            self.assertEqual(self.path, dst_path)
+            for chunk in ('abc', 'def'):
+                data.write(chunk)
+
+        image_service.download.side_effect = download
+        images.fetch('context', 'image-href', self.path, None, None)
+        with open(self.path) as image:
+            self.assertEqual('abcdef', image.read())
+
+    @mock.patch('nova.image.glance.get_remote_image_service')
+    def test_fetch_direct_transfer(self, mock_get_service):
+        image_service = mock.Mock()
+        mock_get_service.return_value = (image_service, 'image-id')
+
+        def download(context, image_id, data=None, dst_path=None):
+            with open(dst_path, 'wb') as image:
+                image.write('direct')
+
+        image_service.download.side_effect = download
+        images.fetch('context', 'image-href', self.path, None, None)
+        with open(self.path) as image:
+            self.assertEqual('direct', image.read())
@@ -22,6 +22,7 @@ import netaddr
 import six
 
 from nova.compute import manager
+from nova.compute import power_state
 from nova import exception
 from nova.openstack.common import importutils
 from nova.openstack.common import jsonutils
@@ -235,6 +236,12 @@ class _VirtDriverTestCase(_FakeDriverBackendTestCase):
     def test_list_instance_uuids(self):
         self.connection.list_instance_uuids()
 
+    @catch_notimplementederror
+    def test_list_instance_power_states(self):
+        instance_ref, network_info = self._get_running_instance()
+        states = self.connection.list_instance_power_states()
+        self.assertEqual(power_state.RUNNING, states[instance_ref['name']])
+
     @catch_notimplementederror
     def test_spawn(self):
         instance_ref, network_info = self._get_running_instance()
@@ -172,6 +172,16 @@ class ComputeDriver(object):
         # TODO(Vek): Need to pass context in for access to auth_token
         raise NotImplementedError()
 
+    def list_instance_power_states(self):
+        """Return the power state of every instance known to the
+        virtualization layer.
+
+        Returns a dict mapping instance names to one of the power_state
+        codes.  Drivers should implement this if they can get the state of
+        all the instances in fewer calls than get_info() for each of them.
+        """
+        raise NotImplementedError()
+
     def get_num_instances(self):
         """Return the total number of virtual machines.
 
@@ -1106,6 +1116,13 @@ class ComputeDriver(object):
         """
         pass
 
+    def get_cached_images(self):
+        """Return the names of the images in the driver's local image cache.
+
+        The name of a cached image is the SHA1 hex digest of its image id.
+        """
+        return []
+
     def add_to_aggregate(self, context, aggregate, host, **kwargs):
         """Add a compute host to an aggregate."""
         #NOTE(jogo) Currently only used for XenAPI-Pool
@@ -265,6 +265,9 @@ class FakeDriver(driver.ComputeDriver):
                 'num_cpu': 2,
                 'cpu_time': 0}
 
+    def list_instance_power_states(self):
+        return dict((name, i.state) for name, i in self.instances.iteritems())
+
     def get_diagnostics(self, instance_name):
         return {'cpu0_time': 17300000000,
                 'memory': 524288,
@@ -20,6 +20,7 @@ Handling of VM disk images.
 """
 
 import os
+import time
 
 from oslo.config import cfg
 
@@ -42,6 +43,9 @@ image_opts = [
 CONF = cfg.CONF
 CONF.register_opts(image_opts)
 
+# Seconds between progress reports of an image download.
+PROGRESS_INTERVAL = 10
+
 
 def qemu_img_info(path):
     """Return an object containing the parsed output from qemu-img info."""
@@ -61,6 +65,45 @@ def convert_image(source, dest, out_format, run_as_root=False):
     utils.execute(*cmd, run_as_root=run_as_root)
 
 
+class _ProgressFile(object):
+    """Writes an image to path as it is downloaded, logging the progress
+    of the download.
+    """
+
+    def __init__(self, path, image_href):
+        self.path = path
+        self.image_href = image_href
+        self.file = None
+        self.written = 0
+        self.start = self.last_report = time.time()
+
+    def write(self, data):
+        # NOTE: only open the file once data arrives, as the image service
+        # may write path itself when it can transfer the image directly.
+        if self.file is None:
+            self.file = open(self.path, 'wb')
+        self.file.write(data)
+        self.written += len(data)
+        now = time.time()
+        if now - self.last_report >= PROGRESS_INTERVAL:
+            self.last_report = now
+            self.report(_('Downloading'))
+
+    def report(self, action):
+        seconds = time.time() - self.start
+        LOG.debug(_('%(action)s image %(image)s: %(mb).1f MB in '
+                    '%(seconds).1fs'),
+                  {'action': action, 'image': self.image_href,
+                   'mb': self.written / 1048576.0, 'seconds': seconds})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        elif not os.path.exists(self.path):
+            # An empty image.
+            open(self.path, 'wb').close()
+
+
 def fetch(context, image_href, path, _user_id, _project_id, max_size=0):
     # TODO(vish): Improve context handling and add owner and auth data
     #             when it is added to glance.  Right now there is no
@@ -69,7 +112,14 @@ def fetch(context, image_href, path, _user_id, _project_id, max_size=0):
     (image_service, image_id) = glance.get_remote_image_service(context,
                                                                 image_href)
     with fileutils.remove_path_on_error(path):
-        image_service.download(context, image_id, dst_path=path)
+        data = _ProgressFile(path, image_href)
+        try:
+            image_service.download(context, image_id, data=data,
+                                   dst_path=path)
+        finally:
+            data.close()
+        if data.written:
+            data.report(_('Downloaded'))
 
 
 def fetch_to_raw(context, image_href, path, user_id, project_id, max_size=0):
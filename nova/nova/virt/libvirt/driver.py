@@ -330,6 +330,18 @@ LIBVIRT_POWER_STATE = {
     VIR_DOMAIN_PMSUSPENDED: power_state.SUSPENDED,
 }
 
+VIR_CONNECT_LIST_DOMAINS_RUNNING = 16
+VIR_CONNECT_LIST_DOMAINS_PAUSED = 32
+VIR_CONNECT_LIST_DOMAINS_SHUTOFF = 64
+VIR_CONNECT_LIST_DOMAINS_OTHER = 128
+
+# Power state of the domains returned by listAllDomains() for a state flag
+LIBVIRT_LIST_DOMAINS_POWER_STATE = {
+    VIR_CONNECT_LIST_DOMAINS_RUNNING: power_state.RUNNING,
+    VIR_CONNECT_LIST_DOMAINS_PAUSED: power_state.PAUSED,
+    VIR_CONNECT_LIST_DOMAINS_SHUTOFF: power_state.SHUTDOWN,
+}
+
 MIN_LIBVIRT_VERSION = (0, 9, 6)
 # When the above version matches/exceeds this version
 # delete it & corresponding code using it
@@ -343,6 +355,8 @@ MIN_QEMU_LIVESNAPSHOT_VERSION = (1, 3, 0)
 MIN_LIBVIRT_BLOCKIO_VERSION = (0, 10, 2)
 # BlockJobInfo management requirement
 MIN_LIBVIRT_BLOCKJOBINFO_VERSION = (1, 1, 1)
+# listAllDomains() requirement
+MIN_LIBVIRT_LIST_ALL_DOMAINS_VERSION = (0, 9, 13)
 
 
 def libvirt_error_handler(context, err):
@@ -855,6 +869,31 @@ class LibvirtDriver(driver.ComputeDriver):
 
         return list(uuids)
 
+    def list_instance_power_states(self):
+        """Efficient override of base list_instance_power_states method.
+
+        Domains are listed with one listAllDomains() call per state, so the
+        state of most domains is known without looking each of them up.
+        """
+        if not self.has_min_version(MIN_LIBVIRT_LIST_ALL_DOMAINS_VERSION):
+            return super(LibvirtDriver, self).list_instance_power_states()
+
+        states = {}
+        for flag, state in LIBVIRT_LIST_DOMAINS_POWER_STATE.iteritems():
+            for domain in self._conn.listAllDomains(flag):
+                states[domain.name()] = state
+
+        # Domains being shut down, crashed, suspended, ... are rare enough
+        # to be looked at one by one.
+        for domain in self._conn.listAllDomains(
+                VIR_CONNECT_LIST_DOMAINS_OTHER):
+            try:
+                states[domain.name()] = LIBVIRT_POWER_STATE[domain.info()[0]]
+            except libvirt.libvirtError:
+                # Ignore deleted instance while listing
+                continue
+        return states
+
     def plug_vifs(self, instance, network_info):
         """Plug VIFs into networks."""
         for vif in network_info:
@@ -4890,6 +4929,10 @@ class LibvirtDriver(driver.ComputeDriver):
         """Manage the local cache of images."""
         self.image_cache_manager.update(context, all_instances)
 
+    def get_cached_images(self):
+        """Return the names of the images in the local cache."""
+        return self.image_cache_manager.get_cached_images()
+
     def _cleanup_remote_migration(self, dest, inst_base, inst_base_resize,
                                   shared_storage=False):
         """Used only for cleanup in case migrate_disk_and_power_off fails."""
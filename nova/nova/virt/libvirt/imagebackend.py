@@ -16,7 +16,9 @@
 import abc
 import contextlib
 import os
+import time
 
+from eventlet import event
 import six
 
 from oslo.config import cfg
@@ -88,6 +90,45 @@ CONF.import_opt('preallocate_images', 'nova.virt.driver')
 
 LOG = logging.getLogger(__name__)
 
+# Fetches of images in progress in this process, by target path.
+_FETCHES = {}
+
+
+def _fetch_once(fetch_func, target, *args, **kwargs):
+    """Fetch target, or wait for the fetch of target already in progress.
+
+    Concurrent requests for the same image share a single fetch and its
+    outcome, instead of each fetching the image again once it gets the
+    lock on it.  A fetch that failed because the image is too large for
+    the flavor of its request is retried, as the image may still fit the
+    flavor of the waiting request.  A shared fetch is checked against the
+    max_size of each waiting request.
+    """
+    while target in _FETCHES:
+        LOG.info(_('Waiting for the fetch of %s in progress'), target)
+        start = time.time()
+        try:
+            _FETCHES[target].wait()
+        except exception.FlavorDiskTooSmall:
+            continue
+        LOG.info(_('Shared the fetch of %(target)s after waiting '
+                   '%(seconds).1fs'),
+                 {'target': target, 'seconds': time.time() - start})
+        Image.verify_base_size(target, kwargs.get('max_size'))
+        return
+
+    fetching = event.Event()
+    _FETCHES[target] = fetching
+    try:
+        fetch_func(target=target, *args, **kwargs)
+    except Exception as e:
+        with excutils.save_and_reraise_exception():
+            fetching.send_exception(e)
+    else:
+        fetching.send()
+    finally:
+        del _FETCHES[target]
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Image(object):
@@ -178,9 +219,18 @@ class Image(object):
         :size: Size of created image in bytes (optional)
         """
         @utils.synchronized(filename, external=True, lock_path=self.lock_path)
-        def fetch_func_sync(target, *args, **kwargs):
+        def fetch_func_locked(target, *args, **kwargs):
             fetch_func(target=target, *args, **kwargs)
 
+        def fetch_func_sync(target, *args, **kwargs):
+            # NOTE: Only the base file is the same for every request of
+            # filename; images generated in the path of the instance
+            # itself are not shared.
+            if target == base:
+                _fetch_once(fetch_func_locked, target, *args, **kwargs)
+            else:
+                fetch_func_locked(target, *args, **kwargs)
+
         base_dir = os.path.join(CONF.instances_path,
                                 CONF.image_cache_subdirectory_name)
         if not os.path.exists(base_dir):
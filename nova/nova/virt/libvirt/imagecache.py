@@ -66,6 +66,16 @@ imagecache_opts = [
                default=3600,
                help='How frequently to checksum base images',
                deprecated_group='DEFAULT'),
+    cfg.IntOpt('checksum_bytes_per_pass',
+               default=0,
+               help='Maximum number of bytes of base images checksummed by '
+                    'one pass of the image cache manager.  The images left '
+                    'out are checksummed by the following passes.  0 does '
+                    'not limit checksumming'),
+    cfg.StrOpt('image_cache_index_path',
+               help='File in which the image cache manager keeps the '
+                    'backing files of the instance disks between passes '
+                    'and restarts.  Unset keeps them in memory only'),
     ]
 
 CONF = cfg.CONF
@@ -240,6 +250,9 @@ class ImageCacheManager(imagecache.ImageCacheManager):
     def __init__(self):
         super(ImageCacheManager, self).__init__()
         self.lock_path = os.path.join(CONF.instances_path, 'locks')
+        # Instance disk path => [instance directory mtime, disk inode,
+        # backing file], kept from one pass to the next:
+        self.backing_files = self._load_index()
         self._reset_state()
 
     def _reset_state(self):
@@ -255,6 +268,30 @@ class ImageCacheManager(imagecache.ImageCacheManager):
         self.removable_base_files = []
         self.unexplained_images = []
 
+        self.checksummed_bytes = 0
+
+    def _load_index(self):
+        """Read the backing files indexed by a previous run."""
+        path = CONF.libvirt.image_cache_index_path
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return jsonutils.load(f)['backing_files']
+        except (IOError, ValueError, KeyError, TypeError) as e:
+            LOG.warning(_('Ignoring image cache index %(path)s: %(error)s'),
+                        {'path': path, 'error': e})
+            return {}
+
+    def _save_index(self):
+        path = CONF.libvirt.image_cache_index_path
+        if not path:
+            return
+        with fileutils.remove_path_on_error(path + '.tmp'):
+            with open(path + '.tmp', 'w') as f:
+                f.write(jsonutils.dumps({'backing_files': self.backing_files}))
+            os.rename(path + '.tmp', path)
+
     def _store_image(self, base_dir, ent, original=False):
         """Store a base image for later examination."""
         entpath = os.path.join(base_dir, ent)
@@ -284,9 +321,20 @@ class ImageCacheManager(imagecache.ImageCacheManager):
         return {'unexplained_images': self.unexplained_images,
                 'originals': self.originals}
 
+    def get_cached_images(self):
+        """Return the names of the original images present in _base."""
+        base_dir = os.path.join(CONF.instances_path,
+                                CONF.image_cache_subdirectory_name)
+        if not os.path.exists(base_dir):
+            return []
+        digest_size = hashlib.sha1().digestsize * 2
+        return [ent for ent in os.listdir(base_dir)
+                if len(ent) == digest_size]
+
     def _list_backing_images(self):
         """List the backing images currently in use."""
         inuse_images = []
+        backing_files = dict(self.backing_files)
         for ent in os.listdir(CONF.instances_path):
             if ent in self.instance_names:
                 LOG.debug(_('%s is a valid instance name'), ent)
@@ -294,8 +342,7 @@ class ImageCacheManager(imagecache.ImageCacheManager):
                 if os.path.exists(disk_path):
                     LOG.debug(_('%s has a disk file'), ent)
                     try:
-                        backing_file = virtutils.get_disk_backing_file(
-                            disk_path)
+                        backing_file = self._get_backing_file(disk_path)
                     except processutils.ProcessExecutionError:
                         # (for bug 1261442)
                         if not os.path.exists(disk_path):
@@ -325,8 +372,38 @@ class ImageCacheManager(imagecache.ImageCacheManager):
                                         {'instance': ent,
                                          'backing': backing_file})
                             self.unexplained_images.remove(backing_path)
+
+        disk_paths = set(os.path.join(CONF.instances_path, ent, 'disk')
+                         for ent in self.instance_names)
+        for disk_path in self.backing_files.keys():
+            if disk_path not in disk_paths:
+                del self.backing_files[disk_path]
+        if self.backing_files != backing_files:
+            self._save_index()
         return inuse_images
 
+    def _get_backing_file(self, disk_path):
+        """Return the backing file of an instance disk.
+
+        qemu-img is only run on the disks that were not indexed by a previous
+        pass, or that were replaced since.  The disk of an instance is only
+        replaced along with a change to its directory, such as a rebuild, so
+        a changed directory mtime or disk inode tells the index is stale.
+        """
+        try:
+            key = [os.path.getmtime(os.path.dirname(disk_path)),
+                   os.stat(disk_path).st_ino]
+        except OSError:
+            key = None
+        indexed = self.backing_files.get(disk_path)
+        if key is not None and indexed and indexed[:2] == key:
+            return indexed[2]
+
+        backing_file = virtutils.get_disk_backing_file(disk_path)
+        if key is not None:
+            self.backing_files[disk_path] = key + [backing_file]
+        return backing_file
+
     def _find_base_file(self, base_dir, fingerprint):
         """Find the base file matching this fingerprint.
 
@@ -382,6 +459,9 @@ class ImageCacheManager(imagecache.ImageCacheManager):
                         CONF.libvirt.checksum_interval_seconds):
                     return True
 
+                if not self._take_checksum_budget(base_file):
+                    return None
+
                 # NOTE(mikal): If there is no timestamp, then the checksum was
                 # performed by a previous version of the code.
                 if not stored_timestamp:
@@ -409,7 +489,8 @@ class ImageCacheManager(imagecache.ImageCacheManager):
                 # NOTE(mikal): If the checksum file is missing, then we should
                 # create one. We don't create checksums when we download images
                 # from glance because that would delay VM startup.
-                if CONF.libvirt.checksum_base_images and create_if_missing:
+                if (CONF.libvirt.checksum_base_images and create_if_missing
+                        and self._take_checksum_budget(base_file)):
                     LOG.info(_('%(id)s (%(base_file)s): generating checksum'),
                              {'id': img_id,
                               'base_file': base_file})
@@ -419,6 +500,23 @@ class ImageCacheManager(imagecache.ImageCacheManager):
 
         return inner_verify_checksum()
 
+    def _take_checksum_budget(self, base_file):
+        """Return whether this pass may still checksum base_file, counting
+        its size against checksum_bytes_per_pass if so.
+
+        The first image of a pass is always checksummed, so that images
+        larger than the budget are checksummed too.
+        """
+        budget = CONF.libvirt.checksum_bytes_per_pass
+        if budget <= 0:
+            return True
+        size = os.path.getsize(base_file)
+        if self.checksummed_bytes and self.checksummed_bytes + size > budget:
+            LOG.debug(_('%s: checksum deferred to a later pass'), base_file)
+            return False
+        self.checksummed_bytes += size
+        return True
+
     def _remove_base_file(self, base_file):
         """Remove a single base file if it is old enough.
 
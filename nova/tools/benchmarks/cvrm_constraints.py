@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Micro-benchmark for the compiled CVRM constraint engine.
+
+Compiles a synthetic project with N attributes (each with a handful of
+scope values) and times a batch of volume-attach decisions against it.
+"""
+
+from __future__ import print_function
+
+import optparse
+import random
+import time
+
+from nova.compute import cvrm
+
+
+def _make_project(num_attributes, num_values):
+    attributes = {}
+    scopes = {}
+    for i in range(num_attributes):
+        name = 'attr-%d' % i
+        attributes[name] = {'name': name}
+        scopes[name] = dict(('value-%d' % v, {}) for v in range(num_values))
+    return attributes, scopes
+
+
+def _make_metadata(rand, num_attributes, num_values, per_resource):
+    names = rand.sample(range(num_attributes), per_resource)
+    return dict(('attr-%d' % n, 'value-%d' % rand.randrange(num_values))
+                for n in names)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--attributes', type='int', default=1000)
+    parser.add_option('--values', type='int', default=5)
+    parser.add_option('--decisions', type='int', default=10000)
+    parser.add_option('--per-resource', type='int', default=3,
+                      help='attribute values carried by each VM/volume')
+    parser.add_option('--seed', type='int', default=0)
+    options, args = parser.parse_args()
+
+    rand = random.Random(options.seed)
+    attributes, scopes = _make_project(options.attributes, options.values)
+
+    start = time.time()
+    policy = cvrm.ProjectPolicy('bench-project', attributes, scopes)
+    compile_time = time.time() - start
+
+    pairs = []
+    for i in range(options.decisions):
+        instance_meta = _make_metadata(rand, options.attributes,
+                                       options.values, options.per_resource)
+        if rand.random() < 0.5:
+            volume_meta = dict(instance_meta)
+        else:
+            volume_meta = _make_metadata(rand, options.attributes,
+                                         options.values,
+                                         options.per_resource)
+        pairs.append((instance_meta, volume_meta))
+
+    start = time.time()
+    permitted = 0
+    for instance_meta, volume_meta in pairs:
+        if policy.permits(instance_meta, volume_meta):
+            permitted += 1
+    decide_time = time.time() - start
+
+    print('compiled %d attributes x %d values in %.2f ms' %
+          (options.attributes, options.values, compile_time * 1000))
+    print('%d decisions (%d permitted) in %.2f ms, %.2f us/decision' %
+          (options.decisions, permitted, decide_time * 1000,
+           decide_time * 1e6 / max(options.decisions, 1)))
+
+
+if __name__ == '__main__':
+    main()
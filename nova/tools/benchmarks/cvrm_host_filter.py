@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark for CvrmAttributeFilter over a synthetic host fleet.
+
+Builds a HostAttributeIndex from synthetic aggregates, then times full
+filter passes over every host for a batch of random instance requests.
+"""
+
+from __future__ import print_function
+
+import optparse
+import random
+import time
+
+from nova.scheduler.filters import cvrm_attribute_filter
+from nova.scheduler import host_attribute_index
+from nova.scheduler import host_manager
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--hosts', type='int', default=5000)
+    parser.add_option('--aggregates', type='int', default=50)
+    parser.add_option('--attributes', type='int', default=20)
+    parser.add_option('--values', type='int', default=4)
+    parser.add_option('--requests', type='int', default=100)
+    parser.add_option('--seed', type='int', default=0)
+    options, args = parser.parse_args()
+
+    rand = random.Random(options.seed)
+    hosts = ['host%d' % i for i in range(options.hosts)]
+    aggregates = []
+    for i in range(options.aggregates):
+        name = 'attr-%d' % rand.randrange(options.attributes)
+        value = 'value-%d' % rand.randrange(options.values)
+        aggregates.append({
+            'hosts': rand.sample(hosts, options.hosts // options.aggregates),
+            'metadetails': {host_attribute_index.KEY_PREFIX + name: value}})
+
+    start = time.time()
+    index = host_attribute_index.HostAttributeIndex.from_aggregates(
+        aggregates)
+    build_time = time.time() - start
+
+    host_states = []
+    for host in hosts:
+        host_state = host_manager.HostState(host, host)
+        host_state.attribute_index = index
+        host_states.append(host_state)
+
+    requests = []
+    for i in range(options.requests):
+        metadata = dict(('attr-%d' % rand.randrange(options.attributes),
+                         'value-%d' % rand.randrange(options.values))
+                        for j in range(2))
+        requests.append({'request_spec': {
+            'instance_properties': {'metadata': metadata}}})
+
+    start = time.time()
+    passed = 0
+    for filter_properties in requests:
+        filt = cvrm_attribute_filter.CvrmAttributeFilter()
+        passed += len(list(filt.filter_all(host_states, filter_properties)))
+    filter_time = time.time() - start
+
+    checks = options.hosts * options.requests
+    print('index over %d hosts built in %.2f ms' %
+          (options.hosts, build_time * 1000))
+    print('%d requests x %d hosts: %.2f ms per request, %.3f us per host, '
+          '%.1f%% of hosts passed' %
+          (options.requests, options.hosts,
+           filter_time * 1000 / max(options.requests, 1),
+           filter_time * 1e6 / max(checks, 1),
+           100.0 * passed / max(checks, 1)))
+
+
+if __name__ == '__main__':
+    main()
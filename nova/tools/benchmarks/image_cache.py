@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the size and accuracy of the cached images digest.
+
+For each number of cached images, encodes the cache names of that many
+random image ids as a list and as Bloom filters of several sizes, as
+compute hosts report them in their stats.  Reports the size of each digest
+in bytes, its false positive rate when testing images that are not cached,
+and the time the scheduler takes to decode it and test one image.
+"""
+
+from __future__ import print_function
+
+import optparse
+import sys
+import time
+import uuid
+
+from nova.compute import cached_images
+
+
+def random_names(count):
+    return [cached_images.cache_name(uuid.uuid4()) for i in range(count)]
+
+
+def measure(names, others, bits, lookups):
+    value = cached_images.encode(names, bits)
+    digest = cached_images.decode(value)
+    missing = [name for name in names if name not in digest]
+    assert not missing, 'cached images not found in the digest'
+    false_positives = len([name for name in others if name in digest])
+
+    start = time.time()
+    for i in range(lookups):
+        others[i % len(others)] in cached_images.decode(value)
+    seconds = time.time() - start
+    return {'images': len(names),
+            'digest': 'list' if not bits else 'bloom %d' % bits,
+            'bytes': len(value),
+            'fp_rate': float(false_positives) / len(others),
+            'lookup_us': seconds * 1000000 / lookups}
+
+
+def report(result):
+    print('%(images)6d images  %(digest)-12s %(bytes)8d bytes  '
+          'false positives %(fp_rate)7.3f%%  decode+lookup '
+          '%(lookup_us)8.1fus' %
+          dict(result, fp_rate=result['fp_rate'] * 100))
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--images', type='int', action='append',
+                      help='number of cached images, may be repeated')
+    parser.add_option('--bits', type='int', action='append',
+                      help='size of a Bloom filter, may be repeated')
+    parser.add_option('--others', type='int', default=100000,
+                      help='uncached images tested for false positives')
+    parser.add_option('--lookups', type='int', default=1000,
+                      help='decode and lookup operations timed')
+    options, args = parser.parse_args()
+
+    others = random_names(options.others)
+    for count in options.images or [10, 100, 1000]:
+        names = random_names(count)
+        for bits in [0] + (options.bits or [256, 1024, 4096, 16384]):
+            report(measure(names, others, bits, options.lookups))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
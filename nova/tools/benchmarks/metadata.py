@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the metadata API with and without its document cache.
+
+Sends the requests cloud-init makes on boot to a MetadataRequestHandler for
+a number of instances, each from its own fixed address, and reports the
+requests per second and the number of times the metadata of an instance had
+to be collected.  Collecting the metadata of an instance, which takes
+several database and network API calls, is simulated by a fixed delay.
+
+Each configuration runs with its own in-process cache.  With several API
+workers sharing a memcached the cached run is the best case, as every
+worker finds the documents the others cached.
+"""
+
+from __future__ import print_function
+
+import optparse
+import sys
+import time
+
+from oslo.config import cfg
+import webob
+
+from nova.api.metadata import base
+from nova.api.metadata import handler
+from nova import config
+from nova import metadata_cache
+from nova.openstack.common import memorycache
+
+CONF = cfg.CONF
+
+# Requests of cloud-init for the EC2 and OpenStack metadata.
+PATHS = ['/',
+         '/2009-04-04/meta-data/',
+         '/2009-04-04/meta-data/instance-id',
+         '/2009-04-04/meta-data/hostname',
+         '/2009-04-04/meta-data/local-ipv4',
+         '/2009-04-04/meta-data/public-keys/',
+         '/2009-04-04/meta-data/public-keys/0/openssh-key',
+         '/2009-04-04/meta-data/placement/availability-zone',
+         '/2009-04-04/user-data',
+         '/openstack/',
+         '/openstack/latest/meta_data.json',
+         '/openstack/latest/vendor_data.json',
+         '/openstack/latest/user_data']
+
+
+def fake_document(index):
+    uuid = '00000000-0000-0000-0000-%012d' % index
+    meta_data = {'ami-id': 'ami-00000001',
+                 'ami-launch-index': 0,
+                 'ami-manifest-path': 'FIXME',
+                 'instance-id': 'i-%08x' % index,
+                 'hostname': 'bench-%d' % index,
+                 'local-hostname': 'bench-%d' % index,
+                 'public-hostname': 'bench-%d' % index,
+                 'local-ipv4': address(index),
+                 'public-ipv4': '',
+                 'reservation-id': 'r-00000001',
+                 'security-groups': ['default'],
+                 'public-keys': {'0': {'_name': '0=bench',
+                                       'openssh-key': 'ssh-rsa AAAA bench'}},
+                 'instance-type': 'm1.small',
+                 'block-device-mapping': {'ami': 'vda', 'root': '/dev/vda'},
+                 'placement': {'availability-zone': 'nova'},
+                 'instance-action': 'none'}
+    return {'uuid': uuid,
+            'project_id': 'bench',
+            'password': '',
+            'userdata_raw': '#cloud-config\n',
+            'content': {},
+            'ec2': dict((version, meta_data) for version in base.VERSIONS),
+            'metadata': {'uuid': uuid,
+                         'hostname': 'bench-%d' % index,
+                         'name': 'bench-%d' % index,
+                         'launch_index': 0,
+                         'availability_zone': 'nova',
+                         'public_keys': {'bench': 'ssh-rsa AAAA bench'}},
+            'vendor_data': {}}
+
+
+def address(index):
+    return '10.%d.%d.%d' % (index >> 16 & 255, index >> 8 & 255,
+                            index & 255)
+
+
+class FakeMetadata(base.InstanceMetadataDocument):
+    """Metadata as collected by base.get_metadata_by_address()."""
+
+    def get_document(self):
+        return self.document
+
+
+def run(instances, requests, build_ms):
+    documents = dict((address(i), fake_document(i))
+                     for i in range(instances))
+    builds = [0]
+
+    def get_metadata_by_address(conductor_api, remote_address):
+        builds[0] += 1
+        time.sleep(build_ms / 1000.0)
+        return FakeMetadata(documents[remote_address], remote_address)
+
+    base.get_metadata_by_address = get_metadata_by_address
+    metadata_cache._CLIENT = memorycache.Client()
+    app = handler.MetadataRequestHandler()
+
+    count = 0
+    start = time.time()
+    for i in range(requests):
+        for path in PATHS:
+            request = webob.Request.blank(path)
+            request.remote_addr = address(i % instances)
+            response = request.get_response(app)
+            assert response.status_int == 200, response.status
+            count += 1
+    seconds = time.time() - start
+    return {'requests': count,
+            'rps': count / seconds,
+            'builds': builds[0]}
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--instances', type='int', default=100,
+                      help='instances booting at the same time')
+    parser.add_option('--boots', type='int', default=5,
+                      help='cloud-init runs per instance')
+    parser.add_option('--build-ms', type='float', default=20.0,
+                      help='time to collect the metadata of an instance')
+    options, args = parser.parse_args()
+
+    config.parse_args(sys.argv[:1])
+    CONF.set_override('use_local', True, group='conductor')
+
+    for expiration in (0, 15):
+        CONF.set_override('metadata_cache_expiration', expiration)
+        result = run(options.instances,
+                     options.instances * options.boots, options.build_ms)
+        print('%-9s %6d requests  %8.1f requests/s  %6d metadata builds' %
+              ('uncached' if not expiration else 'cached',
+               result['requests'], result['rps'], result['builds']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark building and serializing large InstanceLists.
+
+Seeds an in-memory SQLite database with instances on one host, each with an
+info cache, metadata and system metadata, then reports the time and memory
+spent on:
+
+  * InstanceList.get_by_host(), as done on the conductor side
+  * obj_to_primitive() of the resulting list, as done to send it over RPC
+  * obj_from_primitive() of that primitive, as done on the receiving side
+  * reading the info cache of every received instance
+  * obj_to_primitive() of the received list, as done to send it on
+
+Memory is reported as the growth of the process' maximum resident set size
+and of the number of objects tracked by the garbage collector.
+
+With --compare, the (de)serialization steps are run again with the generic
+field-by-field conversion that the per-class codecs replace.
+"""
+
+from __future__ import print_function
+
+import contextlib
+import gc
+import optparse
+import resource
+import sys
+import time
+
+from oslo.config import cfg
+
+from nova import config
+from nova import context
+from nova.db.sqlalchemy import api as sqlalchemy_api
+from nova.db.sqlalchemy import models
+from nova.objects import base as obj_base
+from nova.objects import fields
+from nova.objects import instance as instance_obj
+from nova.openstack.common import jsonutils
+from nova.openstack.common import timeutils
+
+CONF = cfg.CONF
+
+HOST = 'bench-host'
+
+NETWORK_INFO = jsonutils.dumps([{
+    'id': 'port-id', 'address': 'fa:16:3e:00:00:01',
+    'network': {'id': 'net-id', 'label': 'private', 'bridge': 'br100',
+                'subnets': [{'cidr': '10.0.0.0/24',
+                             'ips': [{'address': '10.0.0.2',
+                                      'type': 'fixed',
+                                      'floating_ips': []}]}]},
+}])
+
+
+def seed_database(instances, metadata):
+    engine = sqlalchemy_api.get_engine()
+    models.BASE.metadata.create_all(engine)
+    now = timeutils.utcnow()
+
+    rows = []
+    caches = []
+    meta = []
+    sys_meta = []
+    for i in range(instances):
+        uuid = '00000000-0000-0000-0000-%012d' % i
+        rows.append({'id': i + 1, 'uuid': uuid, 'host': HOST, 'node': HOST,
+                     'project_id': 'bench', 'user_id': 'bench',
+                     'display_name': 'bench-%d' % i,
+                     'hostname': 'bench-%d' % i,
+                     'vm_state': 'active', 'power_state': 1,
+                     'memory_mb': 2048, 'vcpus': 1, 'root_gb': 20,
+                     'ephemeral_gb': 0, 'instance_type_id': 1,
+                     'created_at': now, 'launched_at': now, 'deleted': 0})
+        caches.append({'instance_uuid': uuid, 'network_info': NETWORK_INFO,
+                       'created_at': now, 'deleted': 0})
+        for n in range(metadata):
+            meta.append({'instance_uuid': uuid, 'key': 'key%d' % n,
+                         'value': 'value%d' % n, 'created_at': now,
+                         'deleted': 0})
+            sys_meta.append({'instance_uuid': uuid,
+                             'key': 'instance_type_key%d' % n,
+                             'value': 'value%d' % n, 'created_at': now,
+                             'deleted': 0})
+
+    with engine.begin() as conn:
+        conn.execute(models.Instance.__table__.insert(), rows)
+        conn.execute(models.InstanceInfoCache.__table__.insert(), caches)
+        if metadata:
+            conn.execute(models.InstanceMetadata.__table__.insert(), meta)
+            conn.execute(models.InstanceSystemMetadata.__table__.insert(),
+                         sys_meta)
+
+
+def generic_obj_to_primitive(self, target_version=None):
+    """NovaObject.obj_to_primitive() calling to_primitive() per field."""
+    primitive = dict()
+    for name, field in self.fields.items():
+        if self.obj_attr_is_set(name):
+            value = getattr(self, obj_base.get_attrname(name))
+            if value.__class__ is obj_base._LazyObjectPrimitive:
+                primitive[name] = value.to_primitive()
+            else:
+                primitive[name] = field.to_primitive(self, name, value)
+    if target_version:
+        self.obj_make_compatible(primitive, target_version)
+    obj = {'nova_object.name': self.obj_name(),
+           'nova_object.namespace': 'nova',
+           'nova_object.version': target_version or self.VERSION,
+           'nova_object.data': primitive}
+    if self.obj_what_changed():
+        obj['nova_object.changes'] = list(self.obj_what_changed())
+    return obj
+
+
+def generic_obj_from_primitive(cls, context, objver, primitive):
+    """NovaObject._obj_from_primitive() setting each field's property."""
+    self = cls()
+    self._context = context
+    if objver != cls.VERSION:
+        self.VERSION = objver
+    objdata = primitive['nova_object.data']
+    changes = primitive.get('nova_object.changes', [])
+    for name, field in self.fields.items():
+        if name in objdata:
+            value = objdata[name]
+            if (value is not None and
+                    isinstance(field, fields.ObjectField)):
+                setattr(self, obj_base.get_attrname(name),
+                        obj_base._LazyObjectPrimitive(value))
+            else:
+                setattr(self, name, field.from_primitive(self, name, value))
+    self._changed_fields = (set([x for x in changes if x in self.fields])
+                            or obj_base._NO_CHANGES)
+    return self
+
+
+@contextlib.contextmanager
+def generic_serialization():
+    """Use the generic conversion instead of the per-class codecs."""
+    novaobject = obj_base.NovaObject
+    to_primitive = novaobject.__dict__['obj_to_primitive']
+    from_primitive = novaobject.__dict__['_obj_from_primitive']
+    novaobject.obj_to_primitive = generic_obj_to_primitive
+    novaobject._obj_from_primitive = classmethod(generic_obj_from_primitive)
+    try:
+        yield
+    finally:
+        novaobject.obj_to_primitive = to_primitive
+        novaobject._obj_from_primitive = from_primitive
+
+
+def max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Step(object):
+    """Time and memory growth of one step of the benchmark."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        gc.collect()
+        self.objects = len(gc.get_objects())
+        self.rss = max_rss_kb()
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.time() - self.start
+        gc.collect()
+        self.objects = len(gc.get_objects()) - self.objects
+        self.rss = max_rss_kb() - self.rss
+
+    def report(self, count):
+        print('%-20s %8.1fms  %7.2fus/instance  rss +%6.1fMB  '
+              'gc objects +%d' %
+              (self.name, self.seconds * 1000,
+               self.seconds * 1000000 / count, self.rss / 1024.0,
+               self.objects))
+
+
+def run(options):
+    seed_database(options.instances, options.metadata)
+    ctxt = context.get_admin_context()
+    expected_attrs = ['info_cache', 'metadata', 'system_metadata',
+                      'security_groups']
+    steps = []
+
+    with Step('get_by_host') as step:
+        instances = instance_obj.InstanceList.get_by_host(
+            ctxt, HOST, expected_attrs=expected_attrs)
+    steps.append(step)
+
+    with Step('obj_to_primitive') as step:
+        primitive = instances.obj_to_primitive()
+    steps.append(step)
+
+    del instances
+    with Step('obj_from_primitive') as step:
+        received = obj_base.NovaObject.obj_from_primitive(primitive, ctxt)
+    steps.append(step)
+
+    with Step('read info_cache') as step:
+        for instance in received:
+            instance.info_cache.network_info
+    steps.append(step)
+
+    with Step('resend') as step:
+        received.obj_to_primitive()
+    steps.append(step)
+
+    if options.compare:
+        del received
+        with generic_serialization():
+            instances = instance_obj.InstanceList.get_by_host(
+                ctxt, HOST, expected_attrs=expected_attrs)
+            with Step('generic to_prim') as step:
+                primitive = instances.obj_to_primitive()
+            steps.append(step)
+
+            del instances
+            with Step('generic from_prim') as step:
+                obj_base.NovaObject.obj_from_primitive(primitive, ctxt)
+            steps.append(step)
+
+    return steps
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--instances', type='int', default=10000)
+    parser.add_option('--metadata', type='int', default=5,
+                      help='metadata and system metadata items per instance')
+    parser.add_option('--compare', action='store_true', default=False,
+                      help='also time the generic field-by-field '
+                           'serialization')
+    options, args = parser.parse_args()
+
+    config.parse_args(sys.argv[:1])
+    CONF.set_override('connection', 'sqlite://', group='database')
+    CONF.set_override('sqlite_synchronous', False, group='database')
+
+    print('%d instances with %d metadata items each' %
+          (options.instances, options.metadata))
+    for step in run(options):
+        step.report(options.instances)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark FilterScheduler.select_destinations over a synthetic fleet.
+
+Seeds an in-memory SQLite database with compute services and compute nodes
+of random sizes, then runs select_destinations for a number of requests with
+the configured filter and weigher stacks.  Reports p50/p99 latency per
+request and the time spent loading host states, filtering and weighing.
+
+Results can be saved as JSON with --save and compared against a saved run
+with --baseline, in which case the exit status is 1 if the p50 or p99
+latency regressed by more than --tolerance percent.
+"""
+
+from __future__ import print_function
+
+import collections
+import json
+import optparse
+import random
+import sys
+import time
+
+from oslo.config import cfg
+
+from nova import config
+from nova import context
+from nova.db.sqlalchemy import api as sqlalchemy_api
+from nova.db.sqlalchemy import models
+from nova import exception
+from nova.openstack.common import jsonutils
+from nova.openstack.common import timeutils
+from nova.scheduler import filter_scheduler
+
+CONF = cfg.CONF
+
+PHASES = ('load', 'filter', 'weigh')
+
+FLAVORS = [
+    {'memory_mb': 512, 'vcpus': 1, 'root_gb': 1, 'ephemeral_gb': 0},
+    {'memory_mb': 2048, 'vcpus': 1, 'root_gb': 20, 'ephemeral_gb': 0},
+    {'memory_mb': 4096, 'vcpus': 2, 'root_gb': 40, 'ephemeral_gb': 0},
+    {'memory_mb': 8192, 'vcpus': 4, 'root_gb': 80, 'ephemeral_gb': 0},
+]
+
+
+class PhaseTimer(object):
+    """Accumulates the time spent in some methods of an object."""
+
+    def __init__(self):
+        self.totals = collections.defaultdict(float)
+
+    def wrap(self, obj, name, phase):
+        func = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.totals[phase] += time.time() - start
+
+        setattr(obj, name, timed)
+
+    def reset(self):
+        self.totals.clear()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[int(round(fraction * (len(values) - 1)))]
+
+
+def seed_database(rand, hosts, azs):
+    engine = sqlalchemy_api.get_engine()
+    models.BASE.metadata.create_all(engine)
+    now = timeutils.utcnow()
+
+    services = []
+    compute_nodes = []
+    for i in range(hosts):
+        host = 'host%05d' % i
+        services.append({'id': i + 1, 'host': host, 'binary': 'nova-compute',
+                         'topic': CONF.compute_topic, 'report_count': 1,
+                         'disabled': False, 'created_at': now,
+                         'updated_at': now})
+        vcpus = rand.choice([8, 16, 32, 64])
+        memory_mb = rand.choice([32768, 65536, 131072, 262144])
+        local_gb = rand.choice([500, 1000, 2000])
+        vcpus_used = rand.randint(0, vcpus)
+        memory_mb_used = rand.randint(0, memory_mb)
+        local_gb_used = rand.randint(0, local_gb)
+        running_vms = rand.randint(0, 40)
+        compute_nodes.append({
+            'service_id': i + 1, 'hypervisor_hostname': host,
+            'vcpus': vcpus, 'memory_mb': memory_mb, 'local_gb': local_gb,
+            'vcpus_used': vcpus_used, 'memory_mb_used': memory_mb_used,
+            'local_gb_used': local_gb_used,
+            'free_ram_mb': memory_mb - memory_mb_used,
+            'free_disk_gb': local_gb - local_gb_used,
+            'disk_available_least': local_gb - local_gb_used,
+            'hypervisor_type': 'QEMU', 'hypervisor_version': 1002000,
+            'cpu_info': '', 'current_workload': 0,
+            'running_vms': running_vms,
+            'host_ip': '10.%d.%d.%d' % (i >> 16 & 255, i >> 8 & 255, i & 255),
+            'supported_instances': '[["x86_64", "qemu", "hvm"]]',
+            'stats': jsonutils.dumps({'num_instances': running_vms,
+                                      'io_workload': 0}),
+            'created_at': now, 'updated_at': now})
+
+    with engine.begin() as conn:
+        conn.execute(models.Service.__table__.insert(), services)
+        conn.execute(models.ComputeNode.__table__.insert(), compute_nodes)
+        for i in range(azs):
+            conn.execute(models.Aggregate.__table__.insert(),
+                         [{'id': i + 1, 'name': 'az%d' % i,
+                           'created_at': now}])
+            conn.execute(models.AggregateMetadata.__table__.insert(),
+                         [{'aggregate_id': i + 1,
+                           'key': 'availability_zone',
+                           'value': 'az%d' % i, 'created_at': now}])
+            members = [{'aggregate_id': i + 1, 'host': service['host'],
+                        'created_at': now}
+                       for service in services[i::azs]]
+            conn.execute(models.AggregateHost.__table__.insert(), members)
+
+
+def build_request(rand, num_instances):
+    flavor = dict(rand.choice(FLAVORS), swap=0, extra_specs={},
+                  flavorid='bench', name='bench')
+    instance_properties = dict(flavor, project_id='bench', os_type='linux',
+                               vm_state='building', task_state=None)
+    request_spec = {'instance_properties': instance_properties,
+                    'instance_type': flavor,
+                    'image': {'properties': {}},
+                    'num_instances': num_instances,
+                    'instance_uuids': ['fake-uuid-%d' % i
+                                       for i in range(num_instances)]}
+    return request_spec, {}
+
+
+def run(options):
+    rand = random.Random(options.seed)
+    seed_database(rand, options.hosts, options.azs)
+
+    scheduler = filter_scheduler.FilterScheduler()
+    timer = PhaseTimer()
+    timer.wrap(scheduler.host_manager, 'get_all_host_states', 'load')
+    timer.wrap(scheduler.host_manager, 'get_filtered_hosts', 'filter')
+    timer.wrap(scheduler.host_manager, 'get_weighed_hosts', 'weigh')
+
+    ctxt = context.get_admin_context()
+
+    def select(request_spec, filter_properties):
+        try:
+            scheduler.select_destinations(ctxt, request_spec,
+                                          filter_properties)
+            return True
+        except exception.NoValidHost:
+            return False
+
+    for i in range(options.warmup):
+        select(*build_request(rand, options.instances))
+
+    latencies = []
+    phases = dict((phase, []) for phase in PHASES)
+    failures = 0
+    for i in range(options.requests):
+        request_spec, filter_properties = build_request(rand,
+                                                        options.instances)
+        timer.reset()
+        start = time.time()
+        if not select(request_spec, filter_properties):
+            failures += 1
+        latencies.append(time.time() - start)
+        for phase in PHASES:
+            phases[phase].append(timer.totals[phase])
+
+    result = {'p50': percentile(latencies, 0.5),
+              'p99': percentile(latencies, 0.99),
+              'failures': failures,
+              'phases': {}}
+    for phase in PHASES:
+        result['phases'][phase] = {'p50': percentile(phases[phase], 0.5),
+                                   'mean': sum(phases[phase]) /
+                                           len(phases[phase])}
+    return result
+
+
+def report(options, result):
+    print('%d hosts, %d requests of %d instance(s), %d failed' %
+          (options.hosts, options.requests, options.instances,
+           result['failures']))
+    print('filters: %s' % ', '.join(CONF.scheduler_default_filters))
+    print('weighers: %s' % ', '.join(CONF.scheduler_weight_classes))
+    print('latency p50 %.2fms, p99 %.2fms' % (result['p50'] * 1000,
+                                              result['p99'] * 1000))
+    for phase in PHASES:
+        print('  %-6s p50 %.2fms, mean %.2fms' %
+              (phase, result['phases'][phase]['p50'] * 1000,
+               result['phases'][phase]['mean'] * 1000))
+
+
+def compare(result, baseline, tolerance):
+    regressed = False
+    for key in ('p50', 'p99'):
+        limit = baseline[key] * (1 + tolerance / 100.0)
+        if result[key] > limit:
+            print('%s regressed: %.2fms, baseline %.2fms' %
+                  (key, result[key] * 1000, baseline[key] * 1000))
+            regressed = True
+    return regressed
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('--hosts', type='int', default=1000)
+    parser.add_option('--azs', type='int', default=0,
+                      help='spread hosts over this many availability zones')
+    parser.add_option('--requests', type='int', default=100)
+    parser.add_option('--warmup', type='int', default=5)
+    parser.add_option('--instances', type='int', default=1,
+                      help='instances per request')
+    parser.add_option('--filters',
+                      help='comma separated scheduler_default_filters')
+    parser.add_option('--weighers',
+                      help='comma separated scheduler_weight_classes')
+    parser.add_option('--columnar', action='store_true', default=False,
+                      help='enable scheduler_columnar_host_states')
+    parser.add_option('--full-refresh-interval', type='int', default=0,
+                      help='scheduler_host_state_full_refresh_interval')
+    parser.add_option('--seed', type='int', default=0)
+    parser.add_option('--save', help='write the results to this JSON file')
+    parser.add_option('--baseline', help='JSON results to compare against')
+    parser.add_option('--tolerance', type='float', default=10.0,
+                      help='allowed latency regression in percent')
+    options, args = parser.parse_args()
+
+    config.parse_args(sys.argv[:1])
+    CONF.set_override('connection', 'sqlite://', group='database')
+    CONF.set_override('sqlite_synchronous', False, group='database')
+    if options.filters:
+        CONF.set_override('scheduler_default_filters',
+                          options.filters.split(','))
+    if options.weighers:
+        CONF.set_override('scheduler_weight_classes',
+                          options.weighers.split(','))
+    CONF.set_override('scheduler_columnar_host_states', options.columnar)
+    CONF.set_override('scheduler_host_state_full_refresh_interval',
+                      options.full_refresh_interval)
+
+    result = run(options)
+    report(options, result)
+
+    if options.save:
+        with open(options.save, 'w') as f:
+            json.dump(result, f, indent=4)
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, options.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())